@@ -0,0 +1,267 @@
+"""批量任务运行模块
+
+从 JSONL 文件读取调研请求，在全局并发数、启动速率和 token 预算的约束下无人值守地运行多个
+ControllerAgent 任务。主控 Agent 向用户提问（message_ask_user）时按策略自动回复或直接结束，
+每个任务完成后写入结果清单
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from agent.controller import ControllerAgent
+from config import TASKS_DIR
+from agent.events import REPORT_SAVED, STEP_FINISHED
+
+ASK_USER_POLICIES = ('auto', 'skip')
+DEFAULT_AUTO_REPLY = '请按你的判断继续执行，无需再向我确认，直接完成全部调研任务并输出最终报告。'
+
+
+@dataclass
+class BatchRequest:
+    """一条批量调研请求"""
+
+    request_id: str
+    prompt: str
+
+
+@dataclass
+class TaskManifest:
+    """单个任务的运行结果清单"""
+
+    request_id: str
+    task_id: str
+    status: str = 'pending'  # completed / awaiting_user / max_turns / skipped / budget_exhausted / error
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    steps: int = 0
+    tokens: int = 0
+    started_at: Optional[str] = None
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+def load_requests(path: str) -> List[BatchRequest]:
+    """读取 JSONL 格式的请求文件
+
+    每行一个 JSON 对象，请求内容取 prompt / input 字段，或 title 与 body 的组合；
+    请求ID取 request_id / id 字段，缺省时使用行号
+    """
+    requests = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            prompt = item.get('prompt') or item.get('input')
+            if not prompt:
+                prompt = '\n\n'.join(part for part in (item.get('title'), item.get('body')) if part)
+            if not prompt:
+                raise ValueError(f"第 {line_no} 行缺少请求内容")
+            request_id = str(item.get('request_id') or item.get('id') or line_no)
+            requests.append(BatchRequest(request_id=request_id, prompt=prompt))
+    return requests
+
+
+class StartRateLimiter:
+    """限制任务启动速率，相邻两次启动至少间隔 60 / 每分钟任务数 秒"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.interval
+
+
+class BatchRunner:
+    """批量运行调研任务"""
+
+    def __init__(self, concurrency: Optional[int] = None, tasks_per_minute: Optional[float] = None,
+                 max_tokens: Optional[int] = None, ask_user_policy: Optional[str] = None,
+                 max_turns: Optional[int] = None, auto_reply: Optional[str] = None,
+                 output_dir: Optional[str] = None):
+        """初始化批量运行器
+
+        Args:
+            concurrency: 同时运行的任务数，默认读取环境变量 BATCH_CONCURRENCY
+            tasks_per_minute: 每分钟最多启动的任务数，默认读取环境变量 BATCH_TASKS_PER_MINUTE，0 表示不限制
+            max_tokens: 整批任务的 token 预算，默认读取环境变量 BATCH_MAX_TOKENS，0 表示不限制
+            ask_user_policy: 主控 Agent 提问时的处理策略，auto 自动回复、skip 直接结束，默认读取环境变量 BATCH_ASK_USER
+            max_turns: 单个任务最多的对话轮数，默认读取环境变量 BATCH_MAX_TURNS
+            auto_reply: auto 策略下的回复内容，默认读取环境变量 BATCH_AUTO_REPLY
+            output_dir: 批次清单目录，默认 tasks/batches/<批次ID>
+        """
+        self.concurrency = max(1, concurrency or int(os.getenv('BATCH_CONCURRENCY', '4')))
+        per_minute = tasks_per_minute if tasks_per_minute is not None else float(os.getenv('BATCH_TASKS_PER_MINUTE', '0'))
+        self.rate_limiter = StartRateLimiter(per_minute)
+        self.max_tokens = max_tokens if max_tokens is not None else int(os.getenv('BATCH_MAX_TOKENS', '0'))
+        self.ask_user_policy = ask_user_policy or os.getenv('BATCH_ASK_USER', 'auto')
+        if self.ask_user_policy not in ASK_USER_POLICIES:
+            raise ValueError(f"不支持的提问处理策略: {self.ask_user_policy}")
+        self.max_turns = max_turns or int(os.getenv('BATCH_MAX_TURNS', '8'))
+        self.auto_reply = auto_reply or os.getenv('BATCH_AUTO_REPLY', DEFAULT_AUTO_REPLY)
+        self.tasks_dir = TASKS_DIR
+        self.batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_dir = output_dir or os.path.join(self.tasks_dir, 'batches', self.batch_id)
+        self.used_tokens = 0
+        self._manifest_lock = asyncio.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, 'manifest.jsonl')
+
+    def _completed_requests(self) -> Dict[str, str]:
+        """读取批次清单中已完成的请求，用于中断后继续运行"""
+        completed = {}
+        if not os.path.exists(self.manifest_path):
+            return completed
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if item.get('status') == 'completed':
+                    completed[item['request_id']] = item['task_id']
+        return completed
+
+    def _budget_exhausted(self) -> bool:
+        return bool(self.max_tokens) and self.used_tokens >= self.max_tokens
+
+    def _make_task_id(self, request: BatchRequest) -> str:
+        safe_id = re.sub(r'[^\w\-]+', '_', request.request_id).strip('_')[:40] or 'request'
+        return f"batch_{self.batch_id}_{safe_id}"
+
+    async def _write_manifest(self, manifest: TaskManifest):
+        """写入任务目录中的结果清单，并追加到批次清单"""
+        record = asdict(manifest)
+        task_dir = os.path.join(self.tasks_dir, manifest.task_id)
+        if os.path.isdir(task_dir):
+            with open(os.path.join(task_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+        async with self._manifest_lock:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _list_documents(self, task_id: str) -> List[str]:
+        docs_dir = os.path.join(self.tasks_dir, task_id, 'documents')
+        documents = []
+        for root, _, files in os.walk(docs_dir):
+            for name in sorted(files):
+                if not name.endswith('.part'):
+                    documents.append(os.path.relpath(os.path.join(root, name), os.path.join(self.tasks_dir, task_id)))
+        return sorted(documents)
+
+    async def run_request(self, request: BatchRequest) -> TaskManifest:
+        """运行单个请求，直到任务完成、达到最大轮数或预算耗尽"""
+        manifest = TaskManifest(request_id=request.request_id, task_id=self._make_task_id(request))
+        if self._budget_exhausted():
+            manifest.status = 'budget_exhausted'
+            return manifest
+
+        await self.rate_limiter.wait()
+        manifest.started_at = datetime.now().isoformat(timespec='seconds')
+        started = time.monotonic()
+        controller = ControllerAgent(manifest.task_id)
+
+        # 本轮写作代理保存的报告数和主控 Agent 最后一步的动作
+        turn_state = {"reports": 0, "last_action": ''}
+
+        def on_event(event):
+            # 统计所有代理（含搜索、写作代理）的步数和 token 用量
+            if event.type == STEP_FINISHED:
+                manifest.steps += 1
+                manifest.tokens += event.data.get('tokens', 0)
+                self.used_tokens += event.data.get('tokens', 0)
+                if event.agent == 'controller':
+                    turn_state["last_action"] = event.data.get('action', '')
+            elif event.type == REPORT_SAVED and event.agent == 'writing_agent':
+                turn_state["reports"] += 1
+
+        unsubscribe = controller.events.subscribe(on_event)
+        try:
+            await controller._init_task
+            user_input = request.prompt
+            manifest.status = 'max_turns'
+            for _ in range(self.max_turns):
+                turn_state.update(reports=0, last_action='')
+                response = await controller.process_input(user_input)
+                manifest.turns.append({"input": user_input, "response": response})
+                # 本轮写作代理保存了报告，且主控 Agent 随后向用户征询反馈，视为任务已完成
+                if turn_state["reports"] and turn_state["last_action"] == 'message_ask_user':
+                    manifest.status = 'completed'
+                    break
+                if self.ask_user_policy == 'skip':
+                    # 不回答提问，停在第一次提问处
+                    manifest.status = 'awaiting_user'
+                    break
+                if self._budget_exhausted():
+                    manifest.status = 'budget_exhausted'
+                    break
+                user_input = self.auto_reply
+        except Exception as e:
+            manifest.status = 'error'
+            manifest.error = str(e)
+        finally:
+            unsubscribe()
+            controller.close()
+            manifest.duration = round(time.monotonic() - started, 2)
+            manifest.documents = self._list_documents(manifest.task_id)
+        return manifest
+
+    async def run(self, requests: List[BatchRequest], resume: bool = True) -> List[TaskManifest]:
+        """并发运行全部请求
+
+        Args:
+            requests: 请求列表
+            resume: 是否跳过批次清单中已完成的请求
+
+        Returns:
+            List[TaskManifest]: 与 requests 顺序一致的结果清单
+        """
+        completed = self._completed_requests() if resume else {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(request: BatchRequest) -> TaskManifest:
+            if request.request_id in completed:
+                return TaskManifest(request_id=request.request_id, task_id=completed[request.request_id],
+                                    status='skipped')
+            async with semaphore:
+                manifest = await self.run_request(request)
+            await self._write_manifest(manifest)
+            print(f"[批量任务] {manifest.request_id}: {manifest.status}，"
+                  f"{manifest.steps} 步，{manifest.tokens} tokens，耗时 {manifest.duration:.0f} 秒")
+            return manifest
+
+        return await asyncio.gather(*(run_one(request) for request in requests))
+
+
+async def run_batch(path: str, **kwargs) -> List[TaskManifest]:
+    """读取请求文件并批量运行
+
+    Args:
+        path: JSONL 请求文件路径
+        **kwargs: 透传给 BatchRunner 的参数
+    """
+    requests = load_requests(path)
+    runner = BatchRunner(**kwargs)
+    print(f"[批量任务] 共 {len(requests)} 个请求，并发数 {runner.concurrency}，清单目录 {runner.output_dir}")
+    manifests = await runner.run(requests)
+    summary: Dict[str, int] = {}
+    for manifest in manifests:
+        summary[manifest.status] = summary.get(manifest.status, 0) + 1
+    print(f"[批量任务] 完成: {summary}，共消耗 {runner.used_tokens} tokens")
+    return manifests
@@ -0,0 +1,110 @@
+"""上下文管理模块
+
+估算对话历史的 token 数量，超出预算时将较早的工具输出替换为简短引用，
+最近的若干条消息保持原样
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 工具输出消息的前缀，这些消息可以被压缩
+TOOL_OUTPUT_PREFIXES = (
+    "Quick Search Results for",
+    "Webpage Content for",
+    "File Content (",
+    "Document Search Results for",
+    "Knowledge Base Results for",
+    "Search Agent Results:",
+    "Writing Agent Results:",
+)
+
+# 中日韩字符，按约 1 token/字 估算
+CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数：中日韩字符按 1 个计，其余字符按 4 个字符 1 个 token 计"""
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk) // 4 + 1
+
+
+class ContextManager:
+    """对话历史压缩器，只影响发送给模型的消息，不修改原始历史"""
+
+    def __init__(self, token_budget: Optional[int] = None, keep_recent: Optional[int] = None,
+                 summary_chars: Optional[int] = None):
+        """初始化上下文管理器
+
+        Args:
+            token_budget: 对话历史的 token 预算，默认读取环境变量 CONTEXT_TOKEN_BUDGET
+            keep_recent: 始终保持原样的最近消息条数，默认读取环境变量 CONTEXT_KEEP_RECENT_MESSAGES
+            summary_chars: 压缩后保留的工具输出开头字符数，默认读取环境变量 CONTEXT_SUMMARY_CHARS
+        """
+        self.token_budget = token_budget or int(os.getenv('CONTEXT_TOKEN_BUDGET', '120000'))
+        self.keep_recent = keep_recent or int(os.getenv('CONTEXT_KEEP_RECENT_MESSAGES', '6'))
+        self.summary_chars = summary_chars or int(os.getenv('CONTEXT_SUMMARY_CHARS', '300'))
+        # 按消息对象缓存 token 估算结果，历史只追加不修改，避免每轮重复估算
+        self._token_cache: Dict[int, Tuple[Dict, int, int]] = {}
+
+    def message_tokens(self, message: Dict) -> int:
+        """返回单条消息的估算 token 数（带缓存）"""
+        content = message.get("content") or ""
+        cached = self._token_cache.get(id(message))
+        if cached is not None and cached[0] is message and cached[1] == len(content):
+            return cached[2]
+        tokens = estimate_tokens(content) + 4
+        self._token_cache[id(message)] = (message, len(content), tokens)
+        return tokens
+
+    def count_tokens(self, messages: List[Dict]) -> int:
+        """返回消息列表的估算 token 总数"""
+        return sum(self.message_tokens(m) for m in messages)
+
+    def _compact_message(self, message: Dict, tokens: int) -> Dict:
+        """将工具输出替换为标题加开头片段的简短引用"""
+        content = message.get("content") or ""
+        header, _, body = content.partition("\n")
+        preview = body[:self.summary_chars].rstrip()
+        return {
+            "role": message["role"],
+            "content": f"{header}\n{preview}\n...[内容已压缩，原文约 {tokens} tokens，如需完整内容请重新读取或搜索]"
+        }
+
+    def compact(self, messages: List[Dict]) -> List[Dict]:
+        """在超出 token 预算时压缩较早的工具输出
+
+        从最早的消息开始，依次压缩工具输出直到总量回到预算以内；最近 keep_recent 条消息不做改动。
+
+        Args:
+            messages: 完整的对话历史
+
+        Returns:
+            List[Dict]: 用于发送给模型的消息列表，未超预算时返回原列表
+        """
+        total = self.count_tokens(messages)
+        if total <= self.token_budget:
+            return messages
+
+        # 清理已不在历史中的缓存条目
+        live_ids = {id(m) for m in messages}
+        self._token_cache = {k: v for k, v in self._token_cache.items() if k in live_ids}
+
+        result = list(messages)
+        for i in range(max(0, len(messages) - self.keep_recent)):
+            if total <= self.token_budget:
+                break
+            message = result[i]
+            content = message.get("content") or ""
+            if message.get("role") != "user" or not content.startswith(TOOL_OUTPUT_PREFIXES):
+                continue
+            tokens = self.message_tokens(message)
+            compacted = self._compact_message(message, tokens)
+            new_tokens = estimate_tokens(compacted["content"]) + 4
+            if new_tokens >= tokens:
+                continue
+            result[i] = compacted
+            total -= tokens - new_tokens
+        return result
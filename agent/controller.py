@@ -3,13 +3,25 @@ import asyncio
 import re
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-from openai import AsyncOpenAI
-from config.prompts.planner_agent_prompt import get_default_prompt
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from tools.llm_client import get_llm_client, prompt_cache_kwargs
+from config import TASKS_DIR
+from config.prompts import get_prompt
 from tools.google_search import GoogleSearch
+from tools.search_executor import SearchExecutor, split_search_queries
+from tools.web_reader import WebReader
+from processors.doc_name_processor import DocNameProcessor
 from processors.text_processor import TextProcessor
 from agent.search_agent import SearchAgent
 from agent.writing_agent import WritingAgent
+from agent.context_manager import ContextManager
+from agent.history_store import ChatHistoryStore
+from processors.document_index import DocumentIndex, format_search_results, get_task_document_index
+from agent.step_engine import StepBudget, StepEngine, StepResult, response_tokens
+from agent.streaming import ToolPrefetcher, create_completion
+from agent.events import EventEmitter, ProgressEvent, TOKEN, TOOL_CALLED, RESPONSE
+from tools.tracing import Tracer, get_task_tracer, start_trace
+from agent.task_logging import close_task_loggers, get_task_logger
 
 class ControllerAgent:
     """主控Agent，负责处理用户输入并与模型交互"""
@@ -21,11 +33,24 @@ class ControllerAgent:
         """
         self.client = None
         self.google_search = None
+        self.search_executor = None
+        self.web_reader = None
+        self.doc_name_processor = None
         self.text_processor = None
         self.tasks_dir = None
         self.current_task_id = None
         self.chat_history = []
+        self.history_store = None
+        self.document_index = None
+        self.context_manager = ContextManager()
+        self.step_budget = StepBudget.from_env('CONTROLLER', max_steps=30, max_wall_time=3600, max_tokens=3000000)
+        self.step_records = []
+        # 进度事件发布器，子代理共享同一个发布器
+        self.events = EventEmitter()
         self.logger = None
+        self.tracer: Optional[Tracer] = None
+        # 已写入调试日志的对话历史条数
+        self._logged_messages = 0
         self.search_agent = None
         self.writing_agent = None
         self._init_task = self.async_init(task_id)
@@ -34,56 +59,45 @@ class ControllerAgent:
         """设置日志记录器"""
         if not self.current_task_id:
             return
-            
-        task_dir = self._ensure_task_directory()
-        log_dir = os.path.join(task_dir, 'logs')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # 创建日志文件
-        log_file = os.path.join(log_dir, 'interaction.log')
-        
-        # 配置日志记录器
-        self.logger = logging.getLogger(f'controller_{self.current_task_id}')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # 设置日志格式
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
+        self.logger = get_task_logger('controller', self.current_task_id,
+                                      self._ensure_task_directory(), 'interaction.log')
 
     async def async_init(self, task_id: Optional[str] = None):
         """异步初始化
         Args:
             task_id: 可选的任务ID，如果提供则加载已有任务的历史记录
         """
-        # 初始化OpenAI客户端，配置为使用Gemini API
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+        # 获取共享的OpenAI客户端，配置为使用Gemini API
+        self.client = get_llm_client()
         # 初始化Google搜索工具
         self.google_search = GoogleSearch()
+        # 初始化并发搜索执行器
+        self.search_executor = SearchExecutor(self.google_search)
+        # 初始化子代理共享的网页阅读工具和文档名称处理器
+        self.web_reader = WebReader()
+        self.doc_name_processor = DocNameProcessor()
         # 初始化文本处理器
         self.text_processor = TextProcessor()
         # 创建任务根目录
-        self.tasks_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tasks')
+        self.tasks_dir = TASKS_DIR
         os.makedirs(self.tasks_dir, exist_ok=True)
         # 当前任务ID和聊天历史
         self.current_task_id = task_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.chat_history = []
         
-        # 设置日志记录器
+        # 设置日志记录器和调用链追踪器
         self._setup_logger()
+        self.tracer = get_task_tracer(os.path.join(self.tasks_dir, self.current_task_id))
         
         # 如果提供了任务ID，尝试加载已有的聊天历史
         if task_id:
             await self._load_chat_history()
     
+    def close(self):
+        """关闭任务的日志文件（含子代理），任务结束后释放文件句柄"""
+        if self.current_task_id:
+            close_task_loggers(self.current_task_id)
+
     def extract_xml_tags(self, text: str) -> Dict[str, list]:
         """提取所有XML标签内容，包括带属性的标签"""
         from processors.xml_parser import extract_xml_tags
@@ -105,230 +119,306 @@ class ControllerAgent:
         
         return task_dir
 
+    def _get_history_store(self) -> ChatHistoryStore:
+        """获取当前任务的对话历史存储"""
+        if self.history_store is None:
+            task_dir = self._ensure_task_directory()
+            self.history_store = ChatHistoryStore(os.path.join(task_dir, 'chat_history'))
+        return self.history_store
+
+    def _get_document_index(self) -> DocumentIndex:
+        """获取当前任务的文档索引"""
+        if self.document_index is None:
+            self.document_index = get_task_document_index(self._ensure_task_directory())
+        return self.document_index
+
     def _save_chat_history(self):
-        """保存聊天历史到文件"""
+        """将尚未保存的消息追加写入对话历史日志"""
         if not self.current_task_id:
             return
             
-        task_dir = self._ensure_task_directory()
-        history_file = os.path.join(task_dir, 'chat_history', 'conversation.json')
-        
-        with open(history_file, 'w', encoding='utf-8') as f:
-            import json
-            json.dump(self.chat_history, f, ensure_ascii=False, indent=2)
+        self._get_history_store().save(self.chat_history)
 
     async def _load_chat_history(self):
-        """从文件加载聊天历史"""
+        """从快照和追加日志加载聊天历史"""
         if not self.current_task_id:
             return
             
-        task_dir = self._ensure_task_directory()
-        history_file = os.path.join(task_dir, 'chat_history', 'conversation.json')
-        
-        if not os.path.exists(history_file):
-            return
-            
         try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                import json
-                self.chat_history = json.load(f)
+            self.chat_history = self._get_history_store().load()
         except Exception as e:
             print(f"加载聊天历史时发生错误: {str(e)}")
             self.chat_history = []
     
     async def _process_model_response(self, input_content: Optional[str] = None) -> str:
-        """处理模型响应并执行必要的工具调用
+        """循环处理模型响应并执行必要的工具调用，直到需要用户回复或执行预算耗尽
         Args:
             input_content: 用户输入内容，可选参数
         Returns:
             str: 处理后的响应内容
         """
+        engine = StepEngine(self.step_budget, name='controller', logger=self.logger, events=self.events)
+        self.step_records = engine.records
         try:
-            # 构建消息列表
-            messages = [
-                {"role": "system", "content": get_default_prompt()}
-            ] + self.chat_history
-            
+            return await engine.run(self._run_step, self._on_budget_exhausted)
+        except Exception as e:
             if self.logger:
-                self.logger.debug(f"发送给模型的消息列表: {messages}")
-            
-            # 获取模型响应
-            response = await self.client.chat.completions.create(
+                self.logger.error(f"处理模型响应时发生错误: {str(e)}")
+            self._save_chat_history()  # 发生异常时也要保存对话历史
+            raise  # 重新抛出异常
+
+    def _on_budget_exhausted(self, reason: str) -> str:
+        """执行预算耗尽时保存历史并返回提示信息"""
+        self._save_chat_history()
+        return f"本轮任务执行已暂停（{reason}）。如需继续，请回复“继续”。"
+
+    async def _run_step(self, step_index: int) -> StepResult:
+        """执行一步：调用模型并处理响应中的工具调用
+        Args:
+            step_index: 当前步骤序号
+        Returns:
+            StepResult: 需要继续调用模型时 done 为 False
+        """
+        # 构建消息列表，超出token预算时压缩较早的工具输出
+        context = self.context_manager.compact(self.chat_history)
+        if context is not self.chat_history and self.logger:
+            self.logger.info(
+                f"对话历史超出token预算，已压缩: "
+                f"{self.context_manager.count_tokens(self.chat_history)} -> "
+                f"{self.context_manager.count_tokens(context)} tokens"
+            )
+        messages = [
+            {"role": "system", "content": get_prompt('planner-agent')}
+        ] + context
+        
+        if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+            # 只记录上次调用后新增的消息，避免每步重复写入完整历史
+            self.logger.debug(f"发送给模型的新增消息（共 {len(messages)} 条）: "
+                              f"{self.chat_history[self._logged_messages:]}")
+            self._logged_messages = len(self.chat_history)
+        
+        # 流式获取模型响应，quick_search 标签闭合时立即开始搜索
+        prefetcher = ToolPrefetcher({
+            'quick_search': lambda content: self.search_executor.search_many(split_search_queries([content]))
+        })
+        try:
+            response = await create_completion(
+                self.client,
                 model="gemini-2.0-flash-thinking-exp-01-21",
                 n=1,
-                messages=messages
+                messages=messages,
+                on_tag=prefetcher.dispatch,
+                dispatch_tags=prefetcher.tags,
+                on_text=lambda text: self.events.emit(TOKEN, 'controller', text=text),
+                **prompt_cache_kwargs('planner-agent')
             )
             
-            model_response = response.choices[0].message.content
+            model_response = response.content
+            tokens = response_tokens(response, messages, model_response)
             if self.logger:
                 self.logger.info(f"模型原始响应:\n{model_response}")
-                
+            
             self.chat_history.append({"role": "assistant", "content": model_response})
             self._save_chat_history()  # 保存模型响应后的对话历史
             
             # 提取标签内容
             tags = self.extract_xml_tags(model_response)
-            if self.logger:
+            if self.logger and self.logger.isEnabledFor(logging.DEBUG):
                 self.logger.debug(f"提取的标签内容: {tags}")
             
-            # 处理todo_list标签
-            if 'todo_list' in tags:
-                if self.logger:
-                    self.logger.info("处理todo_list标签")
-                # 由于xml_parser返回的是列表，取第一个元素作为内容
-                todo_content = tags['todo_list'][0] if tags['todo_list'] else ""
-                
-                # 确保任务目录存在
-                task_dir = self._ensure_task_directory()
-                
-                # 使用固定的todo list文件名
-                filepath = os.path.join(task_dir, 'documents', 'todo_list.md')
-                
-                # 保存处理后的todo list
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(todo_content)
-                
-                if self.logger:
-                    self.logger.debug(f"保存todo list到: {filepath}")
+            return await self._handle_tags(tags, tokens, prefetcher)
+        finally:
+            # 取消未被使用的预取任务
+            prefetcher.cancel_pending()
 
-            # 处理file_read标签
-            if 'file_read' in tags:
-                if self.logger:
-                    self.logger.info("执行文件读取工具调用")
-                    
-                file_contents = []
-                for file_paths_str in tags['file_read']:
-                    # 将文件路径按逗号分隔并去除空格
-                    file_paths = [p.strip() for p in file_paths_str.split(',') if p.strip()]
-                    
-                    for file_path in file_paths:
-                        if self.logger:
-                            self.logger.debug(f"读取文件: {file_path}")
-                        # 读取文件内容
-                        task_dir = self._ensure_task_directory()
-                        # 如果传入的是完整路径，直接使用
-                        if os.path.isabs(file_path):
-                            final_path = file_path
-                        # 如果路径中已包含documents目录，只需要拼接task_dir
-                        elif 'documents' in file_path:
-                            final_path = os.path.join(task_dir, file_path)
-                        else:
-                            # 否则按照当前逻辑拼接task_dir和documents目录
-                            final_path = os.path.join(task_dir, 'documents', file_path)
-                        
-                        try:
-                            with open(final_path, 'r', encoding='utf-8') as f:
-                                file_content = f.read()
-                                file_contents.append({"path": file_path, "content": file_content})
-                                
-                                # 将文件内容添加到历史记录
-                                self.chat_history.append({
-                                    "role": "user",
-                                    "content": f"File Content ({file_path}):\n{file_content}"
-                                })
-                                self._save_chat_history()  # 保存文件内容后的对话历史
-                                
-                                if self.logger:
-                                    self.logger.debug(f"Successfully read file: {final_path}")
-                        except Exception as e:
-                            if self.logger:
-                                self.logger.error(f"Error reading file {file_path}: {str(e)}")
-                
-                # 如果有读取到文件内容，递归处理新的响应
-                if file_contents:
+    async def _handle_tags(self, tags: Dict[str, list], tokens: int, prefetcher: ToolPrefetcher) -> StepResult:
+        """处理模型响应中的标签并执行对应的工具调用
+        Args:
+            tags: 提取的标签内容
+            tokens: 本步模型调用的token用量
+            prefetcher: 流式阶段已提前启动的工具调用
+        Returns:
+            StepResult: 需要继续调用模型时 done 为 False
+        """
+        # 处理todo_list标签
+        if 'todo_list' in tags:
+            if self.logger:
+                self.logger.info("处理todo_list标签")
+            # 由于xml_parser返回的是列表，取第一个元素作为内容
+            todo_content = tags['todo_list'][0] if tags['todo_list'] else ""
+        
+            # 确保任务目录存在
+            task_dir = self._ensure_task_directory()
+        
+            # 使用固定的todo list文件名
+            filepath = os.path.join(task_dir, 'documents', 'todo_list.md')
+        
+            # 保存处理后的todo list
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(todo_content)
+        
+            if self.logger:
+                self.logger.debug(f"保存todo list到: {filepath}")
+        
+        # 处理file_read标签
+        if 'file_read' in tags:
+            if self.logger:
+                self.logger.info("执行文件读取工具调用")
+            self.events.emit(TOOL_CALLED, 'controller', tool='file_read', files=tags['file_read'])
+        
+            file_contents = []
+            for file_paths_str in tags['file_read']:
+                # 将文件路径按逗号分隔并去除空格
+                file_paths = [p.strip() for p in file_paths_str.split(',') if p.strip()]
+        
+                for file_path in file_paths:
                     if self.logger:
-                        self.logger.debug(f"文件读取结果: {file_contents}")
-                    return await self._process_model_response()
-
-            # 如果需要执行写作代理调用
-            if 'writing_agent' in tags:
+                        self.logger.debug(f"读取文件: {file_path}")
+                    # 读取文件内容
+                    task_dir = self._ensure_task_directory()
+                    # 如果传入的是完整路径，直接使用
+                    if os.path.isabs(file_path):
+                        final_path = file_path
+                    # 如果路径中已包含documents目录，只需要拼接task_dir
+                    elif 'documents' in file_path:
+                        final_path = os.path.join(task_dir, file_path)
+                    else:
+                        # 否则按照当前逻辑拼接task_dir和documents目录
+                        final_path = os.path.join(task_dir, 'documents', file_path)
+        
+                    try:
+                        with open(final_path, 'r', encoding='utf-8') as f:
+                            file_content = f.read()
+                            file_contents.append({"path": file_path, "content": file_content})
+        
+                            # 将文件内容添加到历史记录
+                            self.chat_history.append({
+                                "role": "user",
+                                "content": f"File Content ({file_path}):\n{file_content}"
+                            })
+                            self._save_chat_history()  # 保存文件内容后的对话历史
+        
+                            if self.logger:
+                                self.logger.debug(f"Successfully read file: {final_path}")
+                    except Exception as e:
+                        if self.logger:
+                            self.logger.error(f"Error reading file {file_path}: {str(e)}")
+        
+            # 如果有读取到文件内容，继续处理新的响应
+            if file_contents:
+                if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"文件读取结果: {file_contents}")
+                return StepResult(done=False, action='file_read', tokens=tokens)
+        
+        # 处理doc_search标签：只将相关段落加入历史记录
+        if 'doc_search' in tags:
+            if self.logger:
+                self.logger.info("执行文档检索工具调用")
+            self.events.emit(TOOL_CALLED, 'controller', tool='doc_search', queries=tags['doc_search'])
+            index = self._get_document_index()
+            for query in tags['doc_search']:
+                results = index.search(query)
                 if self.logger:
-                    self.logger.info("执行写作代理调用")
-                # 获取写作任务描述
-                writing_task = tags.get('writing_agent', [""])[0]
-                # 调用写作代理处理任务
-                writing_agent = WritingAgent(task_id=self.current_task_id)
-                writing_result = await writing_agent.process_writing_task(writing_task)
-                # 显式解除引用
-                writing_agent = None
-                # 将写作结果添加到历史记录
+                    self.logger.debug(f"文档检索 '{query}' 命中 {len(results)} 个段落")
                 self.chat_history.append({
                     "role": "user",
-                    "content": f"Writing Agent Results:\n{str(writing_result)}"
+                    "content": format_search_results(query, results)
                 })
-                self._save_chat_history()  # 保存写作结果后的对话历史
-                # 递归处理新的响应
-                return await self._process_model_response()
-                
-            # 如果需要执行搜索代理调用
-            if 'search_agent' in tags:
+            self._save_chat_history()  # 保存检索结果后的对话历史
+            return StepResult(done=False, action='doc_search', tokens=tokens)
+        
+        # 如果需要执行写作代理调用
+        if 'writing_agent' in tags:
+            if self.logger:
+                self.logger.info("执行写作代理调用")
+            # 获取写作任务描述
+            writing_task = tags.get('writing_agent', [""])[0]
+            self.events.emit(TOOL_CALLED, 'controller', tool='writing_agent', task=writing_task)
+            # 调用写作代理处理任务
+            writing_agent = WritingAgent(task_id=self.current_task_id,
+                                         doc_name_processor=self.doc_name_processor,
+                                         events=self.events)
+            writing_result = await writing_agent.process_writing_task(writing_task)
+            # 显式解除引用
+            writing_agent = None
+            # 将写作结果添加到历史记录
+            self.chat_history.append({
+                "role": "user",
+                "content": f"Writing Agent Results:\n{str(writing_result)}"
+            })
+            self._save_chat_history()  # 保存写作结果后的对话历史
+            # 继续处理新的响应
+            return StepResult(done=False, action='writing_agent', tokens=tokens)
+        
+        # 如果需要执行搜索代理调用
+        if 'search_agent' in tags:
+            if self.logger:
+                self.logger.info("执行搜索代理调用")
+            # 获取搜索任务描述
+            search_agent_tags = tags.get('search_agent', [])
+            if not search_agent_tags:
                 if self.logger:
-                    self.logger.info("执行搜索代理调用")
-                # 获取搜索任务描述
-                search_agent_tags = tags.get('search_agent', [])
-                if not search_agent_tags:
-                    if self.logger:
-                        self.logger.error("搜索代理标签内容为空")
-                    return "搜索代理标签内容为空，请检查输入"
-                    
-                search_task = search_agent_tags[0]
-                if not search_task:
-                    if self.logger:
-                        self.logger.error("搜索任务描述为空")
-                    return "搜索任务描述为空，请检查输入"
-                    
-                # 调用搜索代理处理任务
+                    self.logger.error("搜索代理标签内容为空")
+                return StepResult(done=True, result="搜索代理标签内容为空，请检查输入",
+                                  action='search_agent', tokens=tokens)
+        
+            search_task = search_agent_tags[0]
+            if not search_task:
                 if self.logger:
-                    self.logger.info(f"执行搜索任务: {search_task}")
-                # 每次调用时新建SearchAgent实例
-                search_agent = SearchAgent(task_id=self.current_task_id)
-                search_result = await search_agent.process_search_task(search_task)
+                    self.logger.error("搜索任务描述为空")
+                return StepResult(done=True, result="搜索任务描述为空，请检查输入",
+                                  action='search_agent', tokens=tokens)
+        
+            # 调用搜索代理处理任务
+            if self.logger:
+                self.logger.info(f"执行搜索任务: {search_task}")
+            self.events.emit(TOOL_CALLED, 'controller', tool='search_agent', task=search_task)
+            # 每次调用时新建SearchAgent实例，复用控制器持有的工具和共享客户端
+            search_agent = SearchAgent(task_id=self.current_task_id,
+                                       google_search=self.google_search,
+                                       web_reader=self.web_reader,
+                                       doc_name_processor=self.doc_name_processor,
+                                       events=self.events)
+            search_result = await search_agent.process_search_task(search_task)
+            # 将搜索结果添加到历史记录
+            self.chat_history.append({
+                "role": "user",
+                "content": f"Search Agent Results:\n{str(search_result)}"
+            })
+            self._save_chat_history()  # 保存搜索结果后的对话历史
+            # 继续处理新的响应
+            return StepResult(done=False, action='search_agent', tokens=tokens)
+        
+        # 如果需要执行工具调用
+        if 'quick_search' in tags:
+            if self.logger:
+                self.logger.info("执行快速搜索工具调用")
+            # 并发执行所有搜索（优先复用流式阶段已启动的搜索），结果按原始关键词顺序返回
+            if self.logger:
+                self.logger.debug(f"搜索查询: {split_search_queries(tags['quick_search'])}")
+            self.events.emit(TOOL_CALLED, 'controller', tool='quick_search',
+                             queries=split_search_queries(tags['quick_search']))
+            batches = await asyncio.gather(*(prefetcher.run('quick_search', query_str)
+                                             for query_str in tags['quick_search']))
+            search_results = [item for batch in batches for item in batch]
+        
+            for item in search_results:
                 # 将搜索结果添加到历史记录
                 self.chat_history.append({
                     "role": "user",
-                    "content": f"Search Agent Results:\n{str(search_result)}"
+                    "content": f"Quick Search Results for '{item['query']}':\n{str(item['result'])}"
                 })
-                self._save_chat_history()  # 保存搜索结果后的对话历史
-                # 递归处理新的响应
-                return await self._process_model_response()
-                
-            # 如果需要执行工具调用
-            if 'quick_search' in tags:
-                if self.logger:
-                    self.logger.info("执行快速搜索工具调用")
-                # 执行搜索并收集结果
-                search_results = []
-                for query_str in tags['quick_search']:
-                    # 将搜索关键词按逗号分隔并去除空格
-                    queries = [q.strip() for q in query_str.split(',') if q.strip()]
-                    
-                    for query in queries:
-                        if self.logger:
-                            self.logger.debug(f"搜索查询: {query}")
-                        result = self.google_search.search(query)
-                        search_results.append({"query": query, "result": result})
-                        
-                        # 将搜索结果添加到历史记录
-                        self.chat_history.append({
-                            "role": "user",
-                            "content": f"Quick Search Results for '{query}':\n{str(result)}"
-                        })
-                        self._save_chat_history()  # 保存搜索结果后的对话历史
-                
-                # 如果有搜索结果，递归处理新的响应
-                if search_results:
-                    if self.logger:
-                        self.logger.debug(f"搜索结果: {search_results}")
-                    return await self._process_model_response()
-            
-            # 返回用户消息或空字符串，同样取列表的第一个元素
-            return tags.get("message_ask_user", [""])[0] if "message_ask_user" in tags else ""
-            
-        except Exception as e:
-            if self.logger:
-                self.logger.error(f"处理模型响应时发生错误: {str(e)}")
-            self._save_chat_history()  # 发生异常时也要保存对话历史
-            raise  # 重新抛出异常
+            self._save_chat_history()  # 保存搜索结果后的对话历史
+        
+            # 如果有搜索结果，继续处理新的响应
+            if search_results:
+                if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"搜索结果: {search_results}")
+                return StepResult(done=False, action='quick_search', tokens=tokens)
+        
+        # 返回用户消息或空字符串，同样取列表的第一个元素
+        message = tags.get("message_ask_user", [""])[0] if "message_ask_user" in tags else ""
+        return StepResult(done=True, result=message, action='message_ask_user', tokens=tokens)
 
     async def process_input(self, user_input: str) -> str:
         """处理用户输入并返回响应
@@ -343,8 +433,11 @@ class ControllerAgent:
         # 将用户输入添加到聊天历史
         self.chat_history.append({"role": "user", "content": user_input})
         
-        # 处理用户输入并获取响应
-        response = await self._process_model_response(user_input)
+        # 处理用户输入并获取响应，本轮的全部调用记录为一条调用链
+        with start_trace(self.tracer, 'controller.turn', task_id=self.current_task_id,
+                         input_chars=len(user_input)) as turn:
+            response = await self._process_model_response(user_input)
+            turn.set(response_chars=len(response or ''))
         
         # 保存聊天历史
         self._save_chat_history()
@@ -352,4 +445,34 @@ class ControllerAgent:
         if self.logger:
             self.logger.info(f"返回给用户的响应: {response}")
         
-        return response
\ No newline at end of file
+        return response
+
+    async def stream_input(self, user_input: str) -> AsyncIterator[ProgressEvent]:
+        """处理用户输入，并在处理过程中实时产出进度事件
+        
+        产出步骤开始/结束、工具调用、模型输出片段、报告写入等事件，最后产出 type 为 response 的最终响应。
+        Args:
+            user_input: 用户输入的文本
+        Yields:
+            ProgressEvent: 进度事件
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        unsubscribe = self.events.subscribe(queue.put_nowait)
+        task = asyncio.ensure_future(self.process_input(user_input))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                break
+            while not queue.empty():
+                yield queue.get_nowait()
+            # 处理失败时在此抛出异常
+            yield ProgressEvent(type=RESPONSE, agent='controller', data={"content": task.result()})
+        finally:
+            unsubscribe()
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,70 @@
+"""进度事件模块
+
+代理在执行过程中发布进度事件（步骤开始、工具调用、模型输出片段、报告保存等），
+调用方订阅后即可实时展示进度，而不必等待整个任务结束
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+# 事件类型
+STEP_STARTED = 'step_started'
+STEP_FINISHED = 'step_finished'
+TOOL_CALLED = 'tool_called'
+TOKEN = 'token'
+REPORT_STARTED = 'report_started'
+REPORT_DELTA = 'report_delta'
+REPORT_SAVED = 'report_saved'
+RESPONSE = 'response'
+
+
+@dataclass
+class ProgressEvent:
+    """进度事件
+
+    Attributes:
+        type: 事件类型，如 step_started、tool_called、token
+        agent: 发布事件的代理名称
+        data: 事件数据
+        timestamp: 事件发生时间
+    """
+
+    type: str
+    agent: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.type, "agent": self.agent, "data": self.data, "timestamp": self.timestamp}
+
+
+class EventEmitter:
+    """同步分发进度事件，没有订阅者时发布事件几乎没有开销"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[ProgressEvent], None]] = []
+
+    def subscribe(self, callback: Callable[[ProgressEvent], None]) -> Callable[[], None]:
+        """订阅事件
+
+        Args:
+            callback: 收到事件时调用，不应阻塞
+
+        Returns:
+            Callable: 取消订阅的函数
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def emit(self, type: str, agent: str, **data):
+        """发布事件"""
+        if not self._subscribers:
+            return
+        event = ProgressEvent(type=type, agent=agent, data=data)
+        for callback in list(self._subscribers):
+            callback(event)
@@ -0,0 +1,121 @@
+"""对话历史持久化模块
+
+以“快照 + 追加日志”的方式保存对话历史：
+- 快照 conversation.json：完整的消息列表（与旧版格式相同）
+- 日志 conversation.journal.jsonl：快照之后追加的消息，每行一条
+
+每次保存只追加新消息，日志达到一定行数后合并为新快照
+"""
+
+import os
+import json
+from typing import Dict, List, Optional
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+
+class ChatHistoryStore:
+    """对话历史的追加式存储"""
+
+    def __init__(self, history_dir: str, name: str = 'conversation',
+                 fsync_policy: Optional[str] = None, compact_every: Optional[int] = None):
+        """初始化存储
+
+        Args:
+            history_dir: 对话历史目录
+            name: 文件名前缀
+            fsync_policy: 刷盘策略，always 每条消息刷盘、batch 每次保存刷盘一次、never 不主动刷盘，
+                默认读取环境变量 CHAT_HISTORY_FSYNC
+            compact_every: 日志累计多少条后合并为快照，默认读取环境变量 CHAT_HISTORY_COMPACT_EVERY
+        """
+        os.makedirs(history_dir, exist_ok=True)
+        self.snapshot_path = os.path.join(history_dir, f'{name}.json')
+        self.journal_path = os.path.join(history_dir, f'{name}.journal.jsonl')
+        self.fsync_policy = fsync_policy or os.getenv('CHAT_HISTORY_FSYNC', 'batch')
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"不支持的刷盘策略: {self.fsync_policy}")
+        self.compact_every = compact_every or int(os.getenv('CHAT_HISTORY_COMPACT_EVERY', '200'))
+        # 已持久化的消息条数，以及其中位于日志中的条数
+        self._persisted = 0
+        self._journal_count = 0
+
+    def load(self) -> List[Dict]:
+        """读取快照并重放日志，返回完整的对话历史"""
+        messages: List[Dict] = []
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                messages = json.load(f)
+
+        journal_count = 0
+        if os.path.exists(self.journal_path):
+            # 最后一条完整记录的结束位置
+            good_end = 0
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    # 没有换行符或无法解析的行是进程中断留下的不完整写入
+                    if not line.endswith(b'\n'):
+                        break
+                    if line.strip():
+                        try:
+                            entry = json.loads(line.decode('utf-8'))
+                        except (UnicodeDecodeError, json.JSONDecodeError):
+                            break
+                        # 合并快照后、清空日志前中断时，日志中会残留已写入快照的消息
+                        if entry["seq"] >= len(messages):
+                            messages.append(entry["message"])
+                            journal_count += 1
+                    good_end += len(line)
+            # 截掉不完整的部分，否则后续追加的记录会与其拼接成无法解析的一行
+            if good_end < os.path.getsize(self.journal_path):
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(good_end)
+
+        self._persisted = len(messages)
+        self._journal_count = journal_count
+        return messages
+
+    def _append(self, messages: List[Dict], start_seq: int):
+        """将消息追加写入日志"""
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for offset, message in enumerate(messages):
+                f.write(json.dumps({"seq": start_seq + offset, "message": message}, ensure_ascii=False))
+                f.write('\n')
+                if self.fsync_policy == 'always':
+                    f.flush()
+                    os.fsync(f.fileno())
+            if self.fsync_policy == 'batch':
+                f.flush()
+                os.fsync(f.fileno())
+        self._journal_count += len(messages)
+
+    def save(self, history: List[Dict]):
+        """持久化对话历史中尚未保存的消息
+
+        历史只追加时写入日志；历史被截断或替换时直接重写快照。
+
+        Args:
+            history: 当前完整的对话历史
+        """
+        if len(history) < self._persisted:
+            self.compact(history)
+            return
+        new_messages = history[self._persisted:]
+        if new_messages:
+            self._append(new_messages, self._persisted)
+            self._persisted = len(history)
+        if self._journal_count >= self.compact_every:
+            self.compact(history)
+
+    def compact(self, history: List[Dict]):
+        """将完整历史写入新快照并清空日志"""
+        tmp_path = f'{self.snapshot_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+            if self.fsync_policy != 'never':
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._persisted = len(history)
+        self._journal_count = 0
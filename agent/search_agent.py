@@ -4,71 +4,71 @@
 """
 
 import os
+import asyncio
 import logging
 import json
 from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+from tools.llm_client import get_llm_client, prompt_cache_kwargs
 from processors.xml_parser import extract_xml_tags
-from processors.doc_name_processor import DocNameProcessor
-from config.prompts.search_agent_prompt import get_search_agent_prompt
+from processors.doc_name_processor import DocNameProcessor, resolve_doc_path
+from config.prompts import get_prompt, prompt_version
 from tools.google_search import GoogleSearch
+from tools.search_executor import SearchExecutor, split_search_queries
 from tools.web_reader import WebReader
+from tools.knowledge_base import KIND_PAGE, KIND_REPORT, format_lookup_results, get_knowledge_base
+from agent.step_engine import StepBudget, StepEngine, StepResult, response_tokens
+from agent.streaming import ToolPrefetcher, create_completion
+from agent.task_logging import get_task_logger
+from config import TASKS_DIR
+from agent.events import EventEmitter, TOKEN, TOOL_CALLED, REPORT_SAVED
 
 class SearchAgent:
     """搜索代理，负责执行搜索任务并整合信息"""
     
-    def __init__(self, task_id: Optional[str] = None):
+    def __init__(self, task_id: Optional[str] = None,
+                 google_search: Optional[GoogleSearch] = None,
+                 web_reader: Optional[WebReader] = None,
+                 doc_name_processor: Optional[DocNameProcessor] = None,
+                 events: Optional[EventEmitter] = None):
         """初始化搜索代理
         
         Args:
             task_id: 可选的任务ID，用于保存report等文件
+            google_search: 可选的共享搜索工具，不提供则新建
+            web_reader: 可选的共享网页阅读工具，不提供则新建
+            doc_name_processor: 可选的共享文档名称处理器，不提供则新建
+            events: 可选的进度事件发布器
         """
-        # 初始化OpenAI客户端，配置为使用Gemini API
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
-        self.google_search = GoogleSearch()
-        self.web_reader = WebReader()
-        self.doc_name_processor = DocNameProcessor()
+        # 获取共享的OpenAI客户端，配置为使用Gemini API
+        self.client = get_llm_client()
+        self.google_search = google_search or GoogleSearch()
+        self.search_executor = SearchExecutor(self.google_search)
+        self.web_reader = web_reader or WebReader()
+        self.doc_name_processor = doc_name_processor or DocNameProcessor()
+        self.events = events or EventEmitter()
+        # 跨任务知识库，未启用时为 None
+        self.knowledge_base = get_knowledge_base()
         self.task_id = task_id
         self.chat_history = []
+        self.step_budget = StepBudget.from_env('SEARCH_AGENT', max_steps=25, max_wall_time=1800, max_tokens=2000000)
+        self.step_records = []
         self.logger = None
+        # 已写入调试日志的对话历史条数
+        self._logged_messages = 0
         self._setup_logger()
         
     def _setup_logger(self):
-        """设置日志记录器"""
+        """设置日志记录器，同一任务的多个代理实例共享同一个日志文件处理器"""
         if not self.task_id:
             return
-            
-        task_dir = self._ensure_task_directory()
-        log_dir = os.path.join(task_dir, 'logs')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # 创建日志文件
-        log_file = os.path.join(log_dir, 'search_interaction.log')
-        
-        # 配置日志记录器
-        self.logger = logging.getLogger(f'search_agent_{self.task_id}')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # 设置日志格式
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
+        self.logger = get_task_logger('search_agent', self.task_id, self._ensure_task_directory(), 'search_interaction.log')
         
     def _ensure_task_directory(self) -> str:
         """确保任务目录存在并返回路径"""
         if not self.task_id:
             return ""
             
-        tasks_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tasks')
-        task_dir = os.path.join(tasks_dir, self.task_id)
+        task_dir = os.path.join(TASKS_DIR, self.task_id)
         os.makedirs(os.path.join(task_dir, 'documents'), exist_ok=True)
         os.makedirs(os.path.join(task_dir, 'chat_history'), exist_ok=True)
         return task_dir
@@ -85,7 +85,7 @@ class SearchAgent:
         return await self.doc_name_processor.extract_doc_name(task_description)
     
     async def process_search_task(self, task_description: str) -> Dict[str, str]:
-        """处理搜索任务
+        """处理搜索任务，循环执行工具调用直到产出report或执行预算耗尽
         
         Args:
             task_description: 搜索任务描述
@@ -93,81 +93,158 @@ class SearchAgent:
         Returns:
             Dict[str, str]: 搜索结果，包含处理后的信息
         """
-        # 获取模型响应
-        system_prompt = get_search_agent_prompt()
-        messages_to_send = [{"role": "system", "content": system_prompt}, {"role": "user", "content": task_description}] + self.chat_history
+        engine = StepEngine(self.step_budget, name='search_agent', logger=self.logger, events=self.events)
+        self.step_records = engine.records
+        return await engine.run(lambda step_index: self._run_step(task_description),
+                                self._on_budget_exhausted)
 
-        if self.logger:
-            # Log the messages being sent, including history
-            self.logger.debug(f"发送给模型的消息列表:\nSystem Prompt: {system_prompt}\nTask Description: {task_description}\nChat History: {self.chat_history}")
+    def _on_budget_exhausted(self, reason: str) -> Dict[str, str]:
+        """执行预算耗尽时返回未完成的结果"""
+        return {
+            "status": "error",
+            "task_completed": False,
+            "message": f"搜索任务未完成（{reason}）",
+            "documents": {},
+            "source": "search_agent"
+        }
 
-        # Prepend initial messages to history *only once*
+    async def _run_step(self, task_description: str) -> StepResult:
+        """执行一步：调用模型并处理响应中的工具调用
+        
+        Args:
+            task_description: 搜索任务描述
+            
+        Returns:
+            StepResult: 产出report时 done 为 True
+        """
+        # 系统提示词和任务描述只在对话开头出现一次，之后的对话历史只追加不修改，每一步的请求共享同一前缀
         if not self.chat_history:
-             self.chat_history.append({"role": "system", "content": system_prompt})
-             self.chat_history.append({"role": "user", "content": task_description})
+            self.chat_history.append({"role": "system", "content": get_prompt('search-agent')})
+            self.chat_history.append({"role": "user", "content": task_description})
+        messages_to_send = list(self.chat_history)
 
-        response = await self.client.chat.completions.create(
-            model="gemini-2.0-flash",
-            n=1,
-            messages=messages_to_send # Send the combined list
-        )
-        
-        model_response = response.choices[0].message.content
-        if self.logger:
-            self.logger.info(f"模型原始响应:\n{model_response}")
+        if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+            # 只记录上次调用后新增的消息，避免每步重复写入完整历史
+            new_messages = self.chat_history[max(2, self._logged_messages):]
+            self.logger.debug(f"发送给模型的消息列表:\nSystem Prompt: search-agent {prompt_version('search-agent')}\nTask Description: {task_description}\n新增消息: {new_messages}")
+            self._logged_messages = len(self.chat_history)
+
+        # 流式获取模型响应，quick_search/webpage_read 标签闭合时立即开始执行
+        prefetcher = ToolPrefetcher({
+            'quick_search': lambda content: self.search_executor.search_many(split_search_queries([content])),
+            'webpage_read': self.web_reader.read_page_limited
+        })
+        try:
+            response = await create_completion(
+                self.client,
+                model="gemini-2.0-flash",
+                n=1,
+                messages=messages_to_send,
+                on_tag=prefetcher.dispatch,
+                dispatch_tags=prefetcher.tags,
+                on_text=lambda text: self.events.emit(TOKEN, 'search_agent', text=text),
+                **prompt_cache_kwargs('search-agent')
+            )
             
-        self.chat_history.append({"role": "assistant", "content": model_response})
-        
-        # 提取标签内容
-        tags = extract_xml_tags(model_response)
-        if self.logger:
-            self.logger.debug(f"提取的标签内容: {tags}")
+            model_response = response.content
+            tokens = response_tokens(response, messages_to_send, model_response)
+            if self.logger:
+                self.logger.info(f"模型原始响应:\n{model_response}")
+                
+            self.chat_history.append({"role": "assistant", "content": model_response})
+            
+            # 提取标签内容
+            tags = extract_xml_tags(model_response)
+            if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"提取的标签内容: {tags}")
+            
+            return await self._handle_tags(tags, task_description, tokens, prefetcher)
+        finally:
+            # 取消未被使用的预取任务
+            prefetcher.cancel_pending()
+
+    async def _handle_tags(self, tags: Dict[str, list], task_description: str, tokens: int,
+                           prefetcher: ToolPrefetcher) -> StepResult:
+        """处理模型响应中的标签并执行对应的工具调用
         
+        Args:
+            tags: 提取的标签内容
+            task_description: 搜索任务描述
+            tokens: 本步模型调用的token用量
+            prefetcher: 流式阶段已提前启动的工具调用
+            
+        Returns:
+            StepResult: 产出report时 done 为 True
+        """
+        # 处理knowledge_lookup标签：先查询以往任务积累的资料
+        if 'knowledge_lookup' in tags:
+            if self.logger:
+                self.logger.info("执行知识库检索工具调用")
+            self.events.emit(TOOL_CALLED, 'search_agent', tool='knowledge_lookup', queries=tags['knowledge_lookup'])
+            for query in tags['knowledge_lookup']:
+                results = self.knowledge_base.lookup(query) if self.knowledge_base else []
+                if self.logger:
+                    self.logger.debug(f"知识库检索 '{query}' 命中 {len(results)} 个段落")
+                self.chat_history.append({
+                    "role": "user",
+                    "content": format_lookup_results(query, results)
+                })
+            return StepResult(done=False, action='knowledge_lookup', tokens=tokens)
+
         # 处理quick_search标签
         if 'quick_search' in tags:
             if self.logger:
                 self.logger.info("执行快速搜索工具调用")
                 
-            search_results = []
-            for query_str in tags['quick_search']:
-                # 将搜索关键词按逗号分隔并去除空格
-                queries = [q.strip() for q in query_str.split(',') if q.strip()]
-                
-                for query in queries:
-                    if self.logger:
-                        self.logger.debug(f"搜索查询: {query}")
-                    result = self.google_search.search(query)
-                    search_results.append({"query": query, "result": result})
-                    
-                    # 将搜索结果添加到历史记录
-                    self.chat_history.append({
-                        "role": "user",
-                        "content": f"Quick Search Results for '{query}':\n{str(result)}"
-                    })
+            # 并发执行所有搜索（优先复用流式阶段已启动的搜索），结果按原始关键词顺序返回
+            if self.logger:
+                self.logger.debug(f"搜索查询: {split_search_queries(tags['quick_search'])}")
+            self.events.emit(TOOL_CALLED, 'search_agent', tool='quick_search',
+                             queries=split_search_queries(tags['quick_search']))
+            batches = await asyncio.gather(*(prefetcher.run('quick_search', query_str)
+                                             for query_str in tags['quick_search']))
+            search_results = [item for batch in batches for item in batch]
+            
+            for item in search_results:
+                # 将搜索结果添加到历史记录
+                self.chat_history.append({
+                    "role": "user",
+                    "content": f"Quick Search Results for '{item['query']}':\n{str(item['result'])}"
+                })
+                if self.knowledge_base and isinstance(item['result'], dict):
+                    self.knowledge_base.add_search_results(item['result'], task_id=self.task_id)
             
-            # 如果有搜索结果，递归处理新的响应
+            # 如果有搜索结果，继续处理新的响应
             if search_results:
-                if self.logger:
+                if self.logger and self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug(f"搜索结果: {search_results}")
-                return await self.process_search_task(task_description)
+                return StepResult(done=False, action='quick_search', tokens=tokens)
         
         # 处理webpage_read标签
         if 'webpage_read' in tags:
             if self.logger:
                 self.logger.info("执行网页读取工具调用")
                 
+            if self.logger:
+                self.logger.debug(f"读取网页: {tags['webpage_read']}")
+            self.events.emit(TOOL_CALLED, 'search_agent', tool='webpage_read', urls=tags['webpage_read'])
+            # 并发读取网页内容（复用流式阶段已开始的读取），每读完一个就添加到历史记录
+            prefetched = {}
             for url in tags['webpage_read']:
-                if self.logger:
-                    self.logger.debug(f"读取网页: {url}")
-                # 读取网页内容
-                page_content = await self.web_reader.read_page(url)
-                # 将内容添加到历史记录
+                task = prefetcher.take('webpage_read', url)
+                if task is not None:
+                    prefetched[url] = task
+            async for page_content in self.web_reader.iter_pages(tags['webpage_read'], prefetched=prefetched):
                 self.chat_history.append({
                     "role": "user",
-                    "content": f"Webpage Content for '{url}':\n{str(page_content)}"
+                    "content": f"Webpage Content for '{page_content['url']}':\n{str(page_content)}"
                 })
-            # 递归处理新的响应
-            return await self.process_search_task(task_description)
+                # 读取失败的提示信息较短，会被知识库的最少字符数过滤
+                if self.knowledge_base:
+                    self.knowledge_base.add(KIND_PAGE, page_content['url'], page_content['content'],
+                                            task_id=self.task_id)
+            # 继续处理新的响应
+            return StepResult(done=False, action='webpage_read', tokens=tokens)
         
         # 处理report标签
         if 'report' in tags and self.task_id:
@@ -182,11 +259,15 @@ class SearchAgent:
             if task_dir:
                 # 从任务描述中提取文档名称
                 doc_name = await self.extract_doc_name_from_task(task_description)
-                report_path = os.path.join(task_dir, 'documents', f'{doc_name}')
+                report_path = resolve_doc_path(os.path.join(task_dir, 'documents'), doc_name)
                 if self.logger:
                     self.logger.debug(f"保存report到: {report_path}")
                 with open(report_path, 'w', encoding='utf-8') as f:
                     f.write(report_content)
+                self.events.emit(REPORT_SAVED, 'search_agent', path=report_path, chars=len(report_content))
+                if self.knowledge_base:
+                    self.knowledge_base.add(KIND_REPORT, os.path.relpath(report_path, task_dir), report_content,
+                                            title=doc_name, task_id=self.task_id)
                     
                 # Save chat history after saving the report
                 chat_history_dir = os.path.join(task_dir, 'chat_history')
@@ -209,7 +290,7 @@ class SearchAgent:
                     },
                     "source": "search_agent"
                 }
-                return result
+                return StepResult(done=True, result=result, action='report', tokens=tokens)
         
-        # 如果没有report标签或保存失败，继续递归处理
-        return await self.process_search_task(task_description)
\ No newline at end of file
+        # 如果没有report标签或保存失败，继续处理
+        return StepResult(done=False, action='continue', tokens=tokens)
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""会话管理模块
+
+在同一进程中托管多个 ControllerAgent 会话，按任务ID索引：
+- 同一会话的输入按到达顺序串行处理
+- 输入在后台任务中执行，客户端断开不会中断正在进行的调研
+- 长时间空闲的会话会被回收，需要时从磁盘上的对话历史重新加载
+"""
+
+import os
+import re
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from agent.controller import ControllerAgent
+from agent.events import ProgressEvent
+
+ERROR = 'error'
+# 任务ID同时是任务目录名，只允许字母、数字、下划线和连字符
+TASK_ID_PATTERN = re.compile(r'^[\w\-]{1,64}$')
+
+
+@dataclass
+class Session:
+    """一个任务会话"""
+
+    task_id: str
+    controller: ControllerAgent
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.monotonic)
+    pending: int = 0  # 正在执行或排队中的输入数
+
+    def info(self) -> Dict:
+        return {
+            "task_id": self.task_id,
+            "created_at": self.created_at,
+            "idle_seconds": round(time.monotonic() - self.last_active, 1),
+            "busy": self.pending > 0,
+            "pending": self.pending,
+        }
+
+
+class SessionManager:
+    """ControllerAgent 会话管理器"""
+
+    def __init__(self, idle_timeout: Optional[float] = None, max_sessions: Optional[int] = None,
+                 sweep_interval: float = 60):
+        """初始化会话管理器
+
+        Args:
+            idle_timeout: 会话空闲多久后回收（秒），默认读取环境变量 SESSION_IDLE_TIMEOUT
+            max_sessions: 最多同时保留的会话数，超出时回收最久未活动的空闲会话，默认读取环境变量 SESSION_MAX_SESSIONS
+            sweep_interval: 检查空闲会话的间隔（秒）
+        """
+        self.idle_timeout = idle_timeout or float(os.getenv('SESSION_IDLE_TIMEOUT', '1800'))
+        self.max_sessions = max_sessions or int(os.getenv('SESSION_MAX_SESSIONS', '32'))
+        self.sweep_interval = sweep_interval
+        self.sessions: Dict[str, Session] = {}
+        self._create_lock = asyncio.Lock()
+        self._background: Set[asyncio.Task] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动空闲会话回收任务"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.evict_idle()
+
+    def evict_idle(self, keep: Optional[str] = None) -> List[str]:
+        """回收空闲超时的会话，以及超出会话数上限时最久未活动的空闲会话
+
+        Args:
+            keep: 不回收的任务ID，用于保留刚获取或新建的会话
+        """
+        now = time.monotonic()
+        idle = sorted((s for s in self.sessions.values() if s.pending == 0 and s.task_id != keep),
+                      key=lambda s: s.last_active)
+        evicted = [s.task_id for s in idle if now - s.last_active >= self.idle_timeout]
+        overflow = len(self.sessions) - len(evicted) - self.max_sessions
+        for session in idle:
+            if overflow <= 0:
+                break
+            if session.task_id not in evicted:
+                evicted.append(session.task_id)
+                overflow -= 1
+        for task_id in evicted:
+            self._close(task_id)
+        return evicted
+
+    def _close(self, task_id: str):
+        session = self.sessions.pop(task_id, None)
+        if session:
+            session.controller.close()
+
+    async def get_or_create(self, task_id: Optional[str] = None, reserve: bool = False) -> Session:
+        """获取会话，不存在时新建；提供已有任务ID时从磁盘加载其对话历史
+
+        新建会话超出会话数上限时回收其他空闲会话，返回的会话本身不会被回收
+
+        Args:
+            task_id: 任务ID，为空时新建任务
+            reserve: 是否在返回前将会话的待处理输入数加一，调用方处理完输入后负责减一
+        """
+        if task_id and not TASK_ID_PATTERN.match(task_id):
+            raise ValueError(f"无效的任务ID: {task_id}")
+        async with self._create_lock:
+            if task_id and task_id in self.sessions:
+                session = self.sessions[task_id]
+                session.last_active = time.monotonic()
+                if reserve:
+                    session.pending += 1
+                return session
+            if not task_id:
+                task_id = f'{datetime.now().strftime("%Y%m%d_%H%M%S")}_{uuid.uuid4().hex[:6]}'
+            controller = ControllerAgent(task_id)
+            await controller._init_task
+            session = Session(task_id=task_id, controller=controller)
+            if reserve:
+                session.pending += 1
+            self.sessions[task_id] = session
+            self.evict_idle(keep=task_id)
+        return session
+
+    async def remove(self, task_id: str) -> bool:
+        """关闭会话，会话正在处理输入时等待其完成"""
+        session = self.sessions.get(task_id)
+        if not session:
+            return False
+        async with session.lock:
+            self._close(task_id)
+        return True
+
+    async def submit(self, task_id: Optional[str], content: str) -> asyncio.Queue:
+        """提交一条用户输入
+
+        输入在后台任务中执行，同一会话的输入串行处理。返回的队列依次产出进度事件，
+        最后产出 response 或 error 事件，随后是表示结束的 None。
+
+        Args:
+            task_id: 任务ID，为空时新建任务
+            content: 用户输入
+        """
+        # 在获取会话的同时占用，避免会话在开始执行前被回收
+        session = await self.get_or_create(task_id, reserve=True)
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run():
+            try:
+                async with session.lock:
+                    async for event in session.controller.stream_input(content):
+                        queue.put_nowait(event)
+            except Exception as e:
+                queue.put_nowait(ProgressEvent(type=ERROR, agent='controller', data={"message": str(e)}))
+            finally:
+                session.pending -= 1
+                session.last_active = time.monotonic()
+                queue.put_nowait(None)
+
+        task = asyncio.ensure_future(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return queue
+
+    def list_sessions(self) -> List[Dict]:
+        return [session.info() for session in self.sessions.values()]
+
+    async def close(self):
+        """停止回收任务，等待进行中的输入完成后关闭全部会话"""
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        for task_id in list(self.sessions):
+            self._close(task_id)
@@ -0,0 +1,191 @@
+"""代理步骤引擎模块
+
+以显式循环代替递归驱动代理的“模型响应 -> 工具调用”步骤，
+按步数、运行时长和 token 用量三类预算限制执行，并记录每一步的执行情况。
+运行时长在单步内部同样生效，超时的步骤会被取消
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from agent.context_manager import estimate_tokens
+from agent.events import EventEmitter, STEP_STARTED, STEP_FINISHED
+from tools.tracing import KIND_AGENT, KIND_STEP, span
+
+
+def response_tokens(response: Any, messages: List[Dict], model_response: Optional[str]) -> int:
+    """获取一次模型调用的 token 用量，接口未返回用量时按字符数估算
+
+    Args:
+        response: chat.completions.create 的返回值
+        messages: 发送给模型的消息列表
+        model_response: 模型返回的文本
+    """
+    usage = getattr(response, 'usage', None)
+    if usage and getattr(usage, 'total_tokens', None):
+        return usage.total_tokens
+    return sum(estimate_tokens(m.get("content") or "") for m in messages) + estimate_tokens(model_response or "")
+
+
+@dataclass
+class StepBudget:
+    """单次任务的执行预算"""
+
+    max_steps: int
+    max_wall_time: float
+    max_tokens: int
+
+    @classmethod
+    def from_env(cls, prefix: str, max_steps: int, max_wall_time: float, max_tokens: int) -> 'StepBudget':
+        """从环境变量读取预算，如 CONTROLLER_MAX_STEPS、CONTROLLER_MAX_WALL_TIME、CONTROLLER_MAX_TOKENS
+
+        Args:
+            prefix: 环境变量前缀
+            max_steps: 默认最大步数
+            max_wall_time: 默认最长运行时间（秒）
+            max_tokens: 默认最大 token 用量
+        """
+        return cls(
+            max_steps=int(os.getenv(f'{prefix}_MAX_STEPS', str(max_steps))),
+            max_wall_time=float(os.getenv(f'{prefix}_MAX_WALL_TIME', str(max_wall_time))),
+            max_tokens=int(os.getenv(f'{prefix}_MAX_TOKENS', str(max_tokens))),
+        )
+
+
+@dataclass
+class StepResult:
+    """单步执行结果
+
+    Attributes:
+        done: 是否结束循环
+        result: 结束时返回给调用方的结果
+        action: 本步执行的动作，如 quick_search、file_read、report
+        tokens: 本步消耗的 token 数
+        detail: 附加信息
+    """
+
+    done: bool
+    result: Any = None
+    action: str = ''
+    tokens: int = 0
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class StepRecord:
+    """单步执行记录"""
+
+    index: int
+    action: str
+    started_at: float
+    duration: float
+    tokens: int
+    done: bool
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+class StepEngine:
+    """迭代执行代理步骤，直到步骤函数返回 done 或预算耗尽"""
+
+    def __init__(self, budget: StepBudget, name: str = 'agent', logger: Optional[logging.Logger] = None,
+                 events: Optional[EventEmitter] = None):
+        """初始化步骤引擎
+
+        Args:
+            budget: 执行预算
+            name: 代理名称，用于日志
+            logger: 可选的日志记录器
+            events: 可选的进度事件发布器，每步开始和结束时发布事件
+        """
+        self.budget = budget
+        self.name = name
+        self.logger = logger
+        self.events = events
+        self.records: List[StepRecord] = []
+        self.total_tokens = 0
+        # 每步结束后调用的钩子，参数为该步的执行记录
+        self.step_hooks: List[Callable[[StepRecord], None]] = []
+
+    def _exceeded(self, started: float) -> Optional[str]:
+        """检查预算，超出时返回原因"""
+        if len(self.records) >= self.budget.max_steps:
+            return f"已达到最大步数 {self.budget.max_steps}"
+        if time.monotonic() - started >= self.budget.max_wall_time:
+            return f"已达到最长运行时间 {self.budget.max_wall_time:.0f} 秒"
+        if self.total_tokens >= self.budget.max_tokens:
+            return f"已达到最大token用量 {self.budget.max_tokens}"
+        return None
+
+    async def run(self, step_fn: Callable[[int], Awaitable[StepResult]],
+                  on_exhausted: Callable[[str], Any]) -> Any:
+        """循环执行步骤
+
+        Args:
+            step_fn: 步骤函数，参数为步骤序号，返回 StepResult
+            on_exhausted: 预算耗尽时调用，参数为原因，其返回值作为最终结果
+
+        Returns:
+            步骤函数结束时的 result，或预算耗尽时 on_exhausted 的返回值
+        """
+        with span(self.name, KIND_AGENT) as agent_span:
+            result = await self._run(step_fn, on_exhausted)
+            agent_span.set(steps=len(self.records), tokens=self.total_tokens)
+            return result
+
+    async def _run(self, step_fn: Callable[[int], Awaitable[StepResult]],
+                   on_exhausted: Callable[[str], Any]) -> Any:
+        started = time.monotonic()
+        while True:
+            reason = self._exceeded(started)
+            if reason:
+                if self.logger:
+                    self.logger.warning(f"{self.name} 执行预算耗尽: {reason}")
+                return on_exhausted(reason)
+
+            index = len(self.records)
+            step_started = time.time()
+            step_clock = time.monotonic()
+            if self.events:
+                self.events.emit(STEP_STARTED, self.name, index=index)
+            # 单步（可能包含整个子代理的运行）同样受剩余运行时间限制
+            remaining = self.budget.max_wall_time - (step_clock - started)
+            timed_out = False
+            with span(f'{self.name}.step', KIND_STEP, index=index) as step_span:
+                try:
+                    outcome = await asyncio.wait_for(step_fn(index), remaining)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    outcome = StepResult(done=True, action='timeout')
+                step_span.set(action=outcome.action, tokens=outcome.tokens, done=outcome.done)
+            record = StepRecord(
+                index=index,
+                action=outcome.action,
+                started_at=step_started,
+                duration=time.monotonic() - step_clock,
+                tokens=outcome.tokens,
+                done=outcome.done,
+                detail=outcome.detail,
+            )
+            self.records.append(record)
+            self.total_tokens += outcome.tokens
+            if self.logger:
+                self.logger.info(
+                    f"{self.name} 第 {index + 1} 步完成: action={record.action}, "
+                    f"耗时={record.duration:.2f}s, tokens={record.tokens}"
+                )
+            if self.events:
+                self.events.emit(STEP_FINISHED, self.name, index=index, action=record.action,
+                                 duration=record.duration, tokens=record.tokens)
+            for hook in self.step_hooks:
+                hook(record)
+
+            if timed_out:
+                reason = f"已达到最长运行时间 {self.budget.max_wall_time:.0f} 秒（第 {index + 1} 步执行超时）"
+                if self.logger:
+                    self.logger.warning(f"{self.name} 执行预算耗尽: {reason}")
+                return on_exhausted(reason)
+            if outcome.done:
+                return outcome.result
@@ -0,0 +1,261 @@
+"""流式模型调用模块
+
+以流式方式获取模型输出，在 quick_search、webpage_read 等工具标签闭合时立即启动对应的工具调用，
+使工具耗时与模型剩余内容的生成时间重叠
+"""
+
+import os
+import re
+import time
+import asyncio
+import contextvars
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from processors.xml_parser import IncrementalTagScanner
+from tools.tracing import KIND_LLM, span
+
+REPORT_OPEN_PATTERN = re.compile(r'(?<!`)<report(?:\s[^<>]*)?>')
+REPORT_CLOSE = '</report>'
+
+
+def streaming_enabled() -> bool:
+    """是否启用流式调用，环境变量 LLM_STREAMING=0 时关闭"""
+    return os.getenv('LLM_STREAMING', '1') != '0'
+
+
+@dataclass
+class CompletionResult:
+    """模型调用结果"""
+
+    content: str
+    usage: Any = None
+
+
+class ToolPrefetcher:
+    """在工具标签闭合时提前启动工具调用，并在处理响应时取回结果"""
+
+    def __init__(self, handlers: Dict[str, Callable[[str], Awaitable[Any]]]):
+        """初始化预取器
+
+        Args:
+            handlers: 标签名到工具调用函数的映射，函数参数为标签内容
+        """
+        self.handlers = handlers
+        # 创建时（步骤 span 内）的上下文，预取任务在其中启动，工具 span 挂在步骤 span 下而不是模型调用 span 下
+        self._context = contextvars.copy_context()
+        self._tasks: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @property
+    def tags(self) -> Iterable[str]:
+        return self.handlers.keys()
+
+    def dispatch(self, name: str, content: str):
+        """标签闭合时启动对应的工具调用"""
+        key = (name, content)
+        if name in self.handlers and key not in self._tasks:
+            # create_task 复制当前上下文，在 self._context 中调用时复制的是步骤的上下文
+            self._tasks[key] = self._context.run(asyncio.ensure_future, self.handlers[name](content))
+
+    def take(self, name: str, content: str) -> Optional[asyncio.Future]:
+        """取回已启动的工具调用，未预取时返回 None"""
+        return self._tasks.pop((name, content), None)
+
+    async def run(self, name: str, content: str) -> Any:
+        """返回工具调用结果，已预取时等待预取任务，否则立即调用"""
+        task = self.take(name, content)
+        if task is not None:
+            return await task
+        return await self.handlers[name](content)
+
+    def cancel_pending(self):
+        """取消未被取回的预取任务"""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+
+async def create_completion(client, *, model: str, messages: List[Dict],
+                            on_tag: Optional[Callable[[str, str], None]] = None,
+                            dispatch_tags: Iterable[str] = (),
+                            on_text: Optional[Callable[[str], None]] = None,
+                            **kwargs) -> CompletionResult:
+    """调用模型，启用流式时边接收边扫描工具标签
+
+    Args:
+        client: AsyncOpenAI 客户端
+        model: 模型名称
+        messages: 消息列表
+        on_tag: 标签闭合时的回调，参数为标签名和内容
+        dispatch_tags: 需要在闭合时回调的标签名
+        on_text: 收到新文本片段时的回调
+        **kwargs: 透传给 chat.completions.create 的其他参数
+
+    Returns:
+        CompletionResult: 完整的模型输出和 token 用量
+    """
+    with span('llm.chat', KIND_LLM, messages=len(messages)) as llm_span:
+        result = await _create_completion(client, model=model, messages=messages, on_tag=on_tag,
+                                          dispatch_tags=dispatch_tags, on_text=on_text, llm_span=llm_span, **kwargs)
+        llm_span.record_usage(model, result.usage)
+        llm_span.set(output_chars=len(result.content))
+        return result
+
+
+async def _create_completion(client, *, model: str, messages: List[Dict],
+                             on_tag: Optional[Callable[[str, str], None]],
+                             dispatch_tags: Iterable[str],
+                             on_text: Optional[Callable[[str], None]],
+                             llm_span, **kwargs) -> CompletionResult:
+    if not streaming_enabled():
+        response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        content = response.choices[0].message.content or ''
+        if on_text and content:
+            on_text(content)
+        return CompletionResult(content=content, usage=getattr(response, 'usage', None))
+
+    started = time.monotonic()
+    dispatch_tags = list(dispatch_tags)
+    scanner = IncrementalTagScanner(dispatch_tags) if on_tag and dispatch_tags else None
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs
+    )
+    parts = []
+    usage = None
+    async for chunk in stream:
+        if getattr(chunk, 'usage', None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if not parts:
+            llm_span.set(first_token_seconds=round(time.monotonic() - started, 3))
+        parts.append(delta)
+        if on_text:
+            on_text(delta)
+        if scanner:
+            for name, content in scanner.feed(delta):
+                on_tag(name, content)
+    return CompletionResult(content=''.join(parts), usage=usage)
+
+
+class ReportStreamWriter:
+    """将流式输出中 <report> 标签的内容边生成边写入文件
+
+    报告先写入 <路径>.part，结束时以解析出的完整内容校准后重命名为最终路径。
+    报告路径由调用方提前启动的任务给出，路径确定前到达的内容暂存在内存中。
+    """
+
+    def __init__(self, path_task: asyncio.Future, on_write: Optional[Callable[[str], None]] = None,
+                 on_start: Optional[Callable[[], None]] = None):
+        """初始化写入器
+
+        Args:
+            path_task: 返回报告保存路径的任务
+            on_write: 每写出一段报告内容时的回调
+            on_start: 进入 <report> 标签内容时的回调
+        """
+        self.path_task = path_task
+        self.on_write = on_write
+        self.on_start = on_start
+        self.part_path: Optional[str] = None
+        self._file = None
+        self._buffer = ''
+        self._state = 'before'  # before -> inside -> closed
+        self._pending: List[str] = []
+        self._written: List[str] = []
+
+    def feed(self, chunk: str):
+        """追加一段模型输出"""
+        if self._state == 'closed':
+            return
+        self._buffer += chunk
+        if self._state == 'before':
+            match = REPORT_OPEN_PATTERN.search(self._buffer)
+            if not match:
+                # 只保留可能是开始标签前缀的部分（含前一个字符，用于判断反引号）
+                lt = self._buffer.rfind('<')
+                self._buffer = self._buffer[max(lt - 1, 0):] if lt != -1 else self._buffer[-1:]
+                return
+            self._state = 'inside'
+            self._buffer = self._buffer[match.end():]
+            if self.on_start:
+                self.on_start()
+
+        if not self._written and not self._pending:
+            # 去除报告开头的空白
+            self._buffer = self._buffer.lstrip()
+        close = self._buffer.find(REPORT_CLOSE)
+        if close != -1:
+            self._state = 'closed'
+            self._emit(self._buffer[:close].rstrip())
+            self._buffer = ''
+            return
+        # 保留可能是结束标签前缀的末尾部分
+        safe = len(self._buffer) - (len(REPORT_CLOSE) - 1)
+        if safe > 0:
+            self._emit(self._buffer[:safe])
+            self._buffer = self._buffer[safe:]
+
+    @property
+    def started(self) -> bool:
+        return self._state != 'before'
+
+    def _emit(self, text: str):
+        if not text:
+            return
+        self._pending.append(text)
+        if self.on_write:
+            self.on_write(text)
+        self._flush()
+
+    def _flush(self):
+        """报告路径已确定时，将暂存内容写入文件"""
+        if not self._pending or not self.path_task.done() or self.path_task.cancelled():
+            return
+        if self.path_task.exception() is not None:
+            return
+        if self._file is None:
+            self.part_path = f"{self.path_task.result()}.part"
+            self._file = open(self.part_path, 'w', encoding='utf-8')
+        for text in self._pending:
+            self._file.write(text)
+            self._written.append(text)
+        self._pending.clear()
+        self._file.flush()
+
+    async def finalize(self, content: str) -> str:
+        """写入剩余内容并保存为最终文件
+
+        Args:
+            content: 从完整输出中解析出的报告内容，已写入的内容与之不一致时以它为准
+
+        Returns:
+            str: 报告保存路径
+        """
+        path = await self.path_task
+        self._flush()
+        if self._file is None:
+            self.part_path = f"{path}.part"
+            self._file = open(self.part_path, 'w', encoding='utf-8')
+        if ''.join(self._written) != content:
+            self._file.seek(0)
+            self._file.truncate()
+            self._file.write(content)
+        self._file.close()
+        self._file = None
+        os.replace(self.part_path, path)
+        return path
+
+    def abort(self):
+        """关闭并删除未完成的报告文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.part_path and os.path.exists(self.part_path):
+            os.remove(self.part_path)
@@ -0,0 +1,175 @@
+"""任务日志模块
+
+各代理的日志记录经有界队列交给后台线程写入文件，事件循环线程只做入队，不再直接进行磁盘 I/O：
+
+- 同一任务同一日志文件只有一个按大小轮转的文件处理器，重复创建代理不会重复添加处理器
+- 入队前合并日志参数并截断过长的消息，异常堆栈在入队前格式化
+- 队列已满时丢弃记录并计数，不阻塞事件循环
+- 关闭任务日志时只入队一条关闭标记，由后台线程写完此前的记录后关闭文件，调用方不等待
+- 日志级别由环境变量 LOG_LEVEL 控制，低于该级别的记录在 isEnabledFor 处即被跳过，不做任何格式化
+"""
+
+import os
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional, Set
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def _max_message_chars() -> int:
+    return int(os.getenv('LOG_MAX_MESSAGE_CHARS', '20000'))
+
+
+class _BoundedQueueHandler(QueueHandler):
+    """入队前截断消息，队列满时丢弃记录"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并参数和格式化异常，时间等字段交给后台线程的格式化器处理
+        message = record.getMessage()
+        limit = _max_message_chars()
+        if limit and len(message) > limit:
+            message = f"{message[:limit]}...(已截断 {len(message) - limit} 字符)"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.exc_info = message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FileRouter(logging.Handler):
+    """后台线程中按日志记录器名称把记录分发到对应的文件处理器"""
+
+    def __init__(self):
+        super().__init__()
+        self.handlers: Dict[str, RotatingFileHandler] = {}
+        # 已请求关闭、等待后台线程处理关闭标记的文件处理器
+        self.closing: Dict[str, RotatingFileHandler] = {}
+        self.handlers_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        close_handlers = getattr(record, 'close_handlers', None)
+        with self.handlers_lock:
+            if close_handlers is not None:
+                # 关闭标记之前入队的记录都已写入
+                for name, handler in close_handlers:
+                    handler.close()
+                    if self.closing.get(name) is handler:
+                        del self.closing[name]
+                return
+            handler = self.handlers.get(record.name) or self.closing.get(record.name)
+            if handler is not None:
+                handler.handle(record)
+
+
+class _LogPipeline:
+    """进程共享的日志队列和后台写入线程"""
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+        self.router = _FileRouter()
+        self.queue_handler = _BoundedQueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, self.router)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """写完队列中剩余的记录后停止后台线程"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        with self.router.handlers_lock:
+            for handler in list(self.router.handlers.values()) + list(self.router.closing.values()):
+                handler.close()
+            self.router.handlers.clear()
+            self.router.closing.clear()
+
+
+_pipeline: Optional[_LogPipeline] = None
+_pipeline_lock = threading.Lock()
+# 任务ID -> 该任务的日志记录器名称
+_task_loggers: Dict[str, Set[str]] = {}
+
+
+def _get_pipeline() -> _LogPipeline:
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = _LogPipeline()
+        return _pipeline
+
+
+def get_task_logger(agent: str, task_id: str, task_dir: str, filename: str) -> logging.Logger:
+    """获取写入任务日志文件的日志记录器
+
+    Args:
+        agent: 代理名称，日志记录器名为 <代理名称>_<任务ID>
+        task_id: 任务ID
+        task_dir: 任务目录，日志写入其 logs 子目录
+        filename: 日志文件名
+
+    Returns:
+        logging.Logger: 同名记录器重复获取时复用已有的文件处理器
+    """
+    pipeline = _get_pipeline()
+    name = f'{agent}_{task_id}'
+    logger = logging.getLogger(name)
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    logger.propagate = False
+    with pipeline.router.handlers_lock:
+        if name not in pipeline.router.handlers:
+            log_dir = os.path.join(task_dir, 'logs')
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                os.path.join(log_dir, filename),
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', '3')),
+                encoding='utf-8',
+            )
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            pipeline.router.handlers[name] = file_handler
+            _task_loggers.setdefault(task_id, set()).add(name)
+    if pipeline.queue_handler not in logger.handlers:
+        logger.addHandler(pipeline.queue_handler)
+    return logger
+
+
+def close_task_loggers(task_id: str):
+    """关闭任务的全部日志文件
+
+    只入队一条关闭标记，不等待写入；队列中此前的记录由后台线程写完后再关闭文件。
+    关闭后再次获取同名日志记录器会创建新的文件处理器
+
+    Args:
+        task_id: 任务ID
+    """
+    if _pipeline is None or task_id not in _task_loggers:
+        return
+    close_handlers = []
+    with _pipeline.router.handlers_lock:
+        for name in _task_loggers.pop(task_id, set()):
+            handler = _pipeline.router.handlers.pop(name, None)
+            if handler is not None:
+                _pipeline.router.closing[name] = handler
+                close_handlers.append((name, handler))
+            logging.getLogger(name).removeHandler(_pipeline.queue_handler)
+    if not close_handlers:
+        return
+    marker = logging.makeLogRecord({"close_handlers": close_handlers})
+    try:
+        _pipeline.queue.put_nowait(marker)
+    except queue.Full:
+        # 关闭标记不能丢弃，队列满时由单独的线程等待入队
+        threading.Thread(target=_pipeline.queue.put, args=(marker,), daemon=True).start()
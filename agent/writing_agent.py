@@ -4,86 +4,64 @@
 """
 
 import os
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional
-from openai import AsyncOpenAI
+from typing import Dict, Optional
+from tools.llm_client import get_llm_client, prompt_cache_kwargs
 from processors.xml_parser import extract_xml_tags
-from processors.doc_name_processor import DocNameProcessor
-from config.prompts.writing_agent_prompt import get_writing_agent_prompt
+from processors.doc_name_processor import DocNameProcessor, resolve_doc_path
+from tools.knowledge_base import KIND_REPORT, get_knowledge_base
+from processors.document_index import DocumentIndex, format_search_results, get_task_document_index
+from config.prompts import get_prompt, prompt_version
+from config.prompts.writing_agent_prompt import get_writing_context_message
+from agent.step_engine import StepBudget, StepEngine, StepResult, response_tokens
+from agent.streaming import ReportStreamWriter, create_completion
+from agent.task_logging import get_task_logger
+from config import TASKS_DIR
+from agent.events import EventEmitter, TOKEN, TOOL_CALLED, REPORT_STARTED, REPORT_DELTA, REPORT_SAVED
 
 class WritingAgent:
     """写作代理，负责执行写作任务并生成报告"""
     
-    def __init__(self, task_id: Optional[str] = None):
-        self.file_handler = None  # 用于存储文件处理器引用
+    def __init__(self, task_id: Optional[str] = None,
+                 doc_name_processor: Optional[DocNameProcessor] = None,
+                 events: Optional[EventEmitter] = None):
         """初始化写作代理
         
         Args:
             task_id: 可选的任务ID，用于读取和保存文档
+            doc_name_processor: 可选的共享文档名称处理器，不提供则新建
+            events: 可选的进度事件发布器
         """
-        # 初始化OpenAI客户端，配置为使用Gemini API
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
-        self.doc_name_processor = DocNameProcessor()
+        # 获取共享的OpenAI客户端，配置为使用Gemini API
+        self.client = get_llm_client()
+        self.doc_name_processor = doc_name_processor or DocNameProcessor()
+        self.events = events or EventEmitter()
         self.task_id = task_id
         self.chat_history = []
+        self.step_budget = StepBudget.from_env('WRITING_AGENT', max_steps=20, max_wall_time=1800, max_tokens=2000000)
+        self.step_records = []
+        self.document_index: Optional[DocumentIndex] = None
+        # 报告保存路径的提取任务，在写作开始时启动，与模型生成并行
+        self._report_path_task: Optional[asyncio.Future] = None
         self.logger = None
+        # 已写入调试日志的对话历史条数
+        self._logged_messages = 0
         self._setup_logger()
         
     def _setup_logger(self):
-        """设置日志记录器"""
+        """设置日志记录器，同一任务的多个代理实例共享同一个日志文件处理器"""
         if not self.task_id:
             return
-            
-        task_dir = self._ensure_task_directory()
-        log_dir = os.path.join(task_dir, 'logs')
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # 创建日志文件
-        log_file = os.path.join(log_dir, 'writing_interaction.log')
-        
-        # 配置日志记录器
-        self.logger = logging.getLogger(f'writing_agent_{self.task_id}')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # 设置日志格式
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(file_handler)
-        self.file_handler = file_handler  # 保存处理器引用
-
-    def __del__(self):
-        """析构函数用于资源清理"""
-        try:
-            if self.file_handler:
-                # 关闭并移除文件处理器
-                self.file_handler.close()
-                self.logger.removeHandler(self.file_handler)
-                # 移除日志记录器引用
-                del self.logger
-                del self.file_handler
-        except Exception as e:
-            pass  # 防止析构时出现异常
-        finally:
-            # 确保最终解除引用
-            self.logger = None
-            self.file_handler = None
+        self.logger = get_task_logger('writing_agent', self.task_id, self._ensure_task_directory(), 'writing_interaction.log')
         
     def _ensure_task_directory(self) -> str:
         """确保任务目录存在并返回路径"""
         if not self.task_id:
             return ""
             
-        tasks_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tasks')
-        task_dir = os.path.join(tasks_dir, self.task_id)
+        task_dir = os.path.join(TASKS_DIR, self.task_id)
         os.makedirs(os.path.join(task_dir, 'documents'), exist_ok=True)
         os.makedirs(os.path.join(task_dir, 'chat_history'), exist_ok=True)
         return task_dir
@@ -128,19 +106,16 @@ class WritingAgent:
             print(f"Error reading document {doc_path}: {str(e)}")
             return ""
     
-    def _get_documents_in_task(self) -> List[str]:
-        """获取任务目录下的所有文档路径"""
+    def _get_document_index(self) -> Optional[DocumentIndex]:
+        """获取并刷新任务文档索引"""
         task_dir = self._ensure_task_directory()
         if not task_dir:
-            return []
-            
-        docs_dir = os.path.join(task_dir, 'documents')
-        if not os.path.exists(docs_dir):
-            return []
-            
-        return [os.path.join(docs_dir, f) for f in os.listdir(docs_dir) 
-                if os.path.isfile(os.path.join(docs_dir, f))]
-    
+            return None
+        if self.document_index is None:
+            self.document_index = get_task_document_index(task_dir)
+        self.document_index.refresh()
+        return self.document_index
+
     async def extract_doc_name_from_task(self, task_description: str) -> str:
         """从任务描述中提取合适的文档名称
         
@@ -151,9 +126,14 @@ class WritingAgent:
             str: 提取的文档名称
         """
         return await self.doc_name_processor.extract_doc_name(task_description)
+
+    async def _resolve_report_path(self, task_description: str) -> str:
+        """根据任务描述确定report的保存路径"""
+        doc_name = await self.extract_doc_name_from_task(task_description)
+        return resolve_doc_path(os.path.join(self._ensure_task_directory(), 'documents'), doc_name)
     
     async def process_writing_task(self, task_description: str) -> Dict[str, str]:
-        """处理写作任务
+        """处理写作任务，循环执行文件读取直到产出report或执行预算耗尽
         
         Args:
             task_description: 写作任务描述
@@ -161,70 +141,138 @@ class WritingAgent:
         Returns:
             Dict[str, str]: 写作结果，包含处理后的信息
         """
-        # 获取任务目录下的所有文档
-        documents = self._get_documents_in_task()
-        doc_contents = {}
+        engine = StepEngine(self.step_budget, name='writing_agent', logger=self.logger, events=self.events)
+        self.step_records = engine.records
+        if self.task_id:
+            self._report_path_task = asyncio.ensure_future(self._resolve_report_path(task_description))
+        try:
+            return await engine.run(lambda step_index: self._run_step(task_description),
+                                    self._on_budget_exhausted)
+        finally:
+            if self._report_path_task is not None and not self._report_path_task.done():
+                self._report_path_task.cancel()
+            self._report_path_task = None
+
+    def _on_budget_exhausted(self, reason: str) -> Dict[str, str]:
+        """执行预算耗尽时返回未完成的结果"""
+        return {
+            "status": "error",
+            "task_completed": False,
+            "message": f"写作任务未完成（{reason}）",
+            "documents": {
+                "report_path": None
+            },
+            "source": "writing_agent"
+        }
+
+    async def _run_step(self, task_description: str) -> StepResult:
+        """执行一步：调用模型并处理响应中的文件读取和report
+        
+        Args:
+            task_description: 写作任务描述
+            
+        Returns:
+            StepResult: 需要继续调用模型时 done 为 False
+        """
+        # 从文档索引生成树形文档列表和预览，只重新读取有变化的文档
+        index = self._get_document_index()
+        documents = index.documents() if index else []
         todo_list = ""
         document_list = ""
+        previews = []
         
-        # 获取任务目录
-        task_dir = self._ensure_task_directory()
-        
-        # 读取所有文档内容并生成树形文档列表
-        for doc_path in documents:
-            doc_name = os.path.basename(doc_path)
-            doc_contents[doc_name] = self._read_document(doc_path)
-            # 获取相对于documents目录的路径
-            rel_path = os.path.relpath(doc_path, os.path.join(task_dir, 'documents'))
+        for entry in documents:
+            doc_name = os.path.basename(entry.path)
             # 计算缩进级别
-            indent_level = len(os.path.dirname(rel_path).split(os.sep))
+            indent_level = len(os.path.dirname(entry.path).split(os.sep))
             # 添加缩进的文档条目
             document_list += f"{'  ' * indent_level}- {doc_name}\n"
+            previews.append(f"- {entry.path}: {entry.preview}...")
+            if entry.headings:
+                previews.append("  大纲: " + " / ".join(h.strip() for h in entry.headings))
             
             # 如果是todo_list.md文件，读取其内容
-            if doc_name == "todo_list.md":
-                todo_list = doc_contents[doc_name]
+            if entry.path == "todo_list.md":
+                todo_list = self._read_document(index.full_path(entry.path))
             
         # 生成文档预览信息
-        doc_previews = ""
-        if doc_contents:
-            doc_previews = "\n".join([f"- {name}: {content[:200]}..." 
-                                   for name, content in doc_contents.items()])
+        doc_previews = "\n".join(previews)
         
-        # 获取模型响应
-        system_prompt = get_writing_agent_prompt(todo_list, document_list, doc_previews)
-        messages_to_send = [{"role": "system", "content": system_prompt}, {"role": "user", "content": task_description}] + self.chat_history
+        # 静态系统提示词和任务描述只在对话开头出现一次，之后的对话历史只追加不修改，
+        # 每一步的请求共享同一前缀；随文档变化的任务状态作为最后一条消息发送，不写入对话历史
+        if not self.chat_history:
+            self.chat_history.append({"role": "system", "content": get_prompt('writing-agent')})
+            self.chat_history.append({"role": "user", "content": task_description})
+        context_message = get_writing_context_message(todo_list, document_list, doc_previews)
+        messages_to_send = self.chat_history + [{"role": "user", "content": context_message}]
+
+        if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+            # 只记录上次调用后新增的消息，避免每步重复写入完整历史
+            new_messages = self.chat_history[max(2, self._logged_messages):]
+            self.logger.debug(f"发送给模型的消息列表:\nSystem Prompt: writing-agent {prompt_version('writing-agent')} [Prompt content omitted for brevity]\nTask Description: {task_description}\nTask Context: {context_message}\n新增消息: {new_messages}")
+            self._logged_messages = len(self.chat_history)
+            
+        # 流式获取模型响应，report 内容边生成边写入文件
+        writer = None
+        if self._report_path_task is not None:
+            writer = ReportStreamWriter(
+                self._report_path_task,
+                on_write=lambda text: self.events.emit(REPORT_DELTA, 'writing_agent', text=text),
+                on_start=lambda: self.events.emit(REPORT_STARTED, 'writing_agent')
+            )
 
-        if self.logger:
-            # Log the messages being sent, including history
-            self.logger.debug(f"发送给模型的消息列表:\nSystem Prompt: [Prompt content omitted for brevity]\nTask Description: {task_description}\nChat History: {self.chat_history}")
+        def on_text(text: str):
+            self.events.emit(TOKEN, 'writing_agent', text=text)
+            if writer:
+                writer.feed(text)
 
-        # Prepend initial messages to history *only once*
-        if not self.chat_history:
-             self.chat_history.append({"role": "system", "content": system_prompt})
-             self.chat_history.append({"role": "user", "content": task_description})
+        try:
+            response = await create_completion(
+                self.client,
+                model="gemini-2.0-flash-thinking-exp-01-21",
+                n=1,
+                messages=messages_to_send,
+                on_text=on_text,
+                **prompt_cache_kwargs('writing-agent')
+            )
             
-        response = await self.client.chat.completions.create(
-            model="gemini-2.0-flash-thinking-exp-01-21",
-            n=1,
-            messages=messages_to_send
-        )
-        
-        model_response = response.choices[0].message.content
-        if self.logger:
-            self.logger.info(f"模型原始响应:\n{model_response}")
+            model_response = response.content
+            tokens = response_tokens(response, messages_to_send, model_response)
+            if self.logger:
+                self.logger.info(f"模型原始响应:\n{model_response}")
+                
+            self.chat_history.append({"role": "assistant", "content": model_response})
+            
+            # 提取标签内容
+            tags = extract_xml_tags(model_response)
+            if self.logger and self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"提取的标签内容: {tags}")
             
-        self.chat_history.append({"role": "assistant", "content": model_response})
+            return await self._handle_tags(tags, tokens, writer)
+        finally:
+            # 未保存的报告不留下半成品文件
+            if writer:
+                writer.abort()
+
+    async def _handle_tags(self, tags: Dict[str, list], tokens: int,
+                           writer: Optional[ReportStreamWriter]) -> StepResult:
+        """处理模型响应中的文件读取和report
         
-        # 提取标签内容
-        tags = extract_xml_tags(model_response)
-        if self.logger:
-            self.logger.debug(f"提取的标签内容: {tags}")
+        Args:
+            tags: 提取的标签内容
+            tokens: 本步模型调用的token用量
+            writer: 本步的流式报告写入器，未提供任务ID时为 None
+            
+        Returns:
+            StepResult: 需要继续调用模型时 done 为 False
+        """
+        task_dir = self._ensure_task_directory()
         
         # 处理file_read标签
         if 'file_read' in tags:
             if self.logger:
                 self.logger.info("执行文件读取工具调用")
+            self.events.emit(TOOL_CALLED, 'writing_agent', tool='file_read', files=tags['file_read'])
                 
             file_contents = []
             for file_paths_str in tags['file_read']:
@@ -244,14 +292,32 @@ class WritingAgent:
                         "content": f"File Content ({file_path}):\n{file_content}"
                     })
             
-            # 如果有读取到文件内容，递归处理新的响应
+            # 如果有读取到文件内容，继续处理新的响应
             if file_contents:
-                if self.logger:
+                if self.logger and self.logger.isEnabledFor(logging.DEBUG):
                     self.logger.debug(f"文件读取结果: {file_contents}")
-                return await self.process_writing_task(task_description)
+                return StepResult(done=False, action='file_read', tokens=tokens)
+        
+        # 处理doc_search标签：只将相关段落加入历史记录
+        if 'doc_search' in tags:
+            if self.logger:
+                self.logger.info("执行文档检索工具调用")
+            self.events.emit(TOOL_CALLED, 'writing_agent', tool='doc_search', queries=tags['doc_search'])
+            index = self._get_document_index()
+            if index is not None:
+                for query in tags['doc_search']:
+                    results = index.search(query)
+                    if self.logger:
+                        self.logger.debug(f"文档检索 '{query}' 命中 {len(results)} 个段落")
+                    self.chat_history.append({
+                        "role": "user",
+                        "content": format_search_results(query, results)
+                    })
+                return StepResult(done=False, action='doc_search', tokens=tokens)
         
         # 获取任务目录
         task_dir = self._ensure_task_directory()
+        report_path = None
         
         # 处理report标签
         if 'report' in tags and self.task_id:
@@ -261,15 +327,16 @@ class WritingAgent:
             # 获取report内容
             report_content = tags['report'][0] if tags['report'] else ""
             
-            # 保存report到任务目录
-            if task_dir:
-                # 从任务描述中提取文档名称
-                doc_name = await self.extract_doc_name_from_task(task_description)
-                report_path = os.path.join(task_dir, 'documents', f'{doc_name}')
+            # 保存report到任务目录（流式阶段已写入的内容以完整解析结果校准）
+            if task_dir and writer:
+                report_path = await writer.finalize(report_content)
                 if self.logger:
                     self.logger.debug(f"保存report到: {report_path}")
-                with open(report_path, 'w', encoding='utf-8') as f:
-                    f.write(report_content)
+                self.events.emit(REPORT_SAVED, 'writing_agent', path=report_path, chars=len(report_content))
+                knowledge_base = get_knowledge_base()
+                if knowledge_base:
+                    knowledge_base.add(KIND_REPORT, os.path.relpath(report_path, task_dir), report_content,
+                                       title=os.path.basename(report_path), task_id=self.task_id)
                     
                 # Save chat history after saving the report
                 chat_history_dir = os.path.join(task_dir, 'chat_history')
@@ -288,19 +355,19 @@ class WritingAgent:
                     "status": "success",
                     "task_completed": True,
                     "documents": {
-                        "report_path": report_path if 'report' in tags and task_dir else None
+                        "report_path": report_path
                     },
                     "source": "writing_agent"
                 }
-                return result
+                return StepResult(done=True, result=result, action='report', tokens=tokens)
         
         # 返回最终结果
         result = {
             "status": "success",
             "task_completed": True,
             "documents": {
-                "report_path": report_path if 'report' in tags and task_dir else None
+                "report_path": report_path
             },
             "source": "writing_agent"
         }
-        return result
\ No newline at end of file
+        return StepResult(done=True, result=result, action='finish', tokens=tokens)
\ No newline at end of file
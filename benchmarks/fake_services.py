@@ -0,0 +1,255 @@
+"""本地模拟服务
+
+在一个 aiohttp 应用中模拟基准测试依赖的三个外部接口，延迟和内容大小按可配置的分布随机生成：
+
+- POST /v1/chat/completions      OpenAI 兼容接口（Gemini），按调用方代理和步骤返回剧本中带标签的响应，支持流式输出
+- GET  /customsearch/v1          Google 自定义搜索接口
+- GET  /jina/{url}               Jina Reader 接口，返回生成的 Markdown 正文
+- GET  /stats                    各接口的调用次数
+
+用法: python -m benchmarks.fake_services --port 18080 --llm-latency lognormal:0.8,0.4
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from aiohttp import web
+from benchmarks.scenarios import Scenario, get_scenario
+
+FILLER_WORDS = ('模型', '检索', '推理', '延迟', '吞吐', '缓存', '成本', '数据', '评测', '部署',
+                'latency', 'throughput', 'agent', 'search', 'report', 'benchmark', 'pipeline')
+
+
+class Distribution:
+    """随机分布，格式为 const:值、uniform:下限,上限 或 lognormal:中位数,sigma"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, params = spec.partition(':')
+        values = [float(v) for v in params.split(',') if v]
+        if kind == 'const' and len(values) == 1:
+            self._sample = lambda rng: values[0]
+        elif kind == 'uniform' and len(values) == 2:
+            self._sample = lambda rng: rng.uniform(values[0], values[1])
+        elif kind == 'lognormal' and len(values) == 2:
+            median, sigma = values
+            self._sample = lambda rng: median * rng.lognormvariate(0, sigma)
+        else:
+            raise ValueError(f"无法解析的分布: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self._sample(rng))
+
+
+@dataclass
+class FakeServiceConfig:
+    """模拟服务的延迟和内容大小配置，各项均为 Distribution 格式"""
+
+    scenario: str = 'research'
+    llm_latency: str = 'lognormal:0.6,0.3'  # 首个 token 之前的延迟（秒）
+    llm_tokens_per_second: float = 200.0  # 流式输出速度，0 表示一次性输出
+    search_latency: str = 'lognormal:0.3,0.3'
+    reader_latency: str = 'lognormal:0.8,0.5'
+    page_chars: str = 'lognormal:6000,0.5'
+    report_chars: str = 'uniform:3000,6000'
+    results_per_query: int = 8
+    seed: int = 0
+
+
+def filler_text(rng: random.Random, chars: int, heading: str = '') -> str:
+    """生成指定长度、带小节标题的 Markdown 填充文本"""
+    parts: List[str] = [f"# {heading}\n"] if heading else []
+    length = sum(len(p) for p in parts)
+    section = 0
+    while length < chars:
+        if section % 4 == 0:
+            parts.append(f"\n## 第 {section // 4 + 1} 节\n")
+        sentence = ' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(8, 20))) + '。\n'
+        parts.append(sentence)
+        length += len(sentence)
+        section += 1
+    return ''.join(parts)[:max(chars, 1)]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+class FakeServices:
+    """模拟服务的请求处理"""
+
+    def __init__(self, config: FakeServiceConfig):
+        self.config = config
+        self.scenario: Scenario = get_scenario(config.scenario)
+        self.rng = random.Random(config.seed)
+        self.llm_latency = Distribution(config.llm_latency)
+        self.search_latency = Distribution(config.search_latency)
+        self.reader_latency = Distribution(config.reader_latency)
+        self.page_chars = Distribution(config.page_chars)
+        self.report_chars = Distribution(config.report_chars)
+        self.stats: Dict[str, int] = {}
+
+    def _count(self, name: str):
+        self.stats[name] = self.stats.get(name, 0) + 1
+
+    # ---------- OpenAI 兼容接口 ----------
+
+    def _script_response(self, model: str, messages: List[Dict]) -> str:
+        """按调用方和步骤序号选择剧本中的响应"""
+        system = next((m.get('content') or '' for m in messages if m.get('role') == 'system'), '')
+        if model.endswith('-lite'):
+            if '文档名称提取器' in system:
+                self._count('llm.doc_name')
+                return 'bench_report.md'
+            # 网页正文清理和文本后处理：原样返回输入
+            self._count('llm.lite')
+            return messages[-1].get('content') or ''
+
+        if '搜索Agent (Search Agent)' in system:
+            agent, script = 'search', self.scenario.search
+        elif 'Professional Reporter' in system[:400]:
+            agent, script = 'writing', self.scenario.writing
+        else:
+            agent, script = 'planner', self.scenario.planner
+        self._count(f'llm.{agent}')
+
+        step = sum(1 for m in messages if m.get('role') == 'assistant')
+        template = script[min(step, len(script) - 1)]
+        first_user = next((m.get('content') or '' for m in messages if m.get('role') == 'user'), '')
+        match = re.search(r'\[bench:([\w\-]+)\]', first_user)
+        run = match.group(1) if match else 'run'
+        report = filler_text(self.rng, int(self.report_chars.sample(self.rng)), heading=f'{agent} 报告 {run}')
+        return template.format(run=run, report=report)
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get('model', '')
+        messages = body.get('messages', [])
+        content = self._script_response(model, messages)
+        usage = {
+            "prompt_tokens": sum(_estimate_tokens(m.get('content') or '') for m in messages),
+            "completion_tokens": _estimate_tokens(content),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        await asyncio.sleep(self.llm_latency.sample(self.rng))
+        if not body.get('stream'):
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+
+        async def send(payload: Dict):
+            await response.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+
+        chunk_chars = 60
+        rate = self.config.llm_tokens_per_second
+        for start in range(0, len(content), chunk_chars):
+            piece = content[start:start + chunk_chars]
+            await send({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            if rate > 0:
+                await asyncio.sleep(_estimate_tokens(piece) / rate)
+        await send({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get('stream_options') or {}).get('include_usage'):
+            await send({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [], "usage": usage})
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    # ---------- 搜索与网页读取 ----------
+
+    async def custom_search(self, request: web.Request) -> web.Response:
+        self._count('search')
+        query = request.query.get('q', '')
+        num = min(int(request.query.get('num', '10')), self.config.results_per_query)
+        await asyncio.sleep(self.search_latency.sample(self.rng))
+        digest = hashlib.md5(query.encode('utf-8')).hexdigest()[:8]
+        items = [{
+            "title": f"{query} - 结果 {i + 1}",
+            "link": f"https://bench.example/{digest}/{i}",
+            "snippet": filler_text(self.rng, 160),
+        } for i in range(num)]
+        return web.json_response({"items": items})
+
+    async def reader(self, request: web.Request) -> web.Response:
+        self._count('reader')
+        url = request.match_info['url']
+        await asyncio.sleep(self.reader_latency.sample(self.rng))
+        return web.Response(text=filler_text(self.rng, int(self.page_chars.sample(self.rng)), heading=url),
+                            content_type='text/plain', charset='utf-8')
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok"})
+
+
+def create_app(config: Optional[FakeServiceConfig] = None) -> web.Application:
+    services = FakeServices(config or FakeServiceConfig())
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes([
+        web.post('/v1/chat/completions', services.chat_completions),
+        web.get('/customsearch/v1', services.custom_search),
+        web.get('/jina/{url:.*}', services.reader),
+        web.get('/stats', services.get_stats),
+        web.get('/health', services.health),
+    ])
+    return app
+
+
+def serve(ports: List[int], config: Dict):
+    """在当前进程中运行模拟服务，供基准测试在子进程中启动
+
+    可同时监听多个端口，每个端口都提供全部接口，基准测试为每个外部接口使用一个端口，以便按端口登记限流器
+    """
+    async def run():
+        runner = web.AppRunner(create_app(FakeServiceConfig(**config)))
+        await runner.setup()
+        try:
+            for port in ports:
+                await web.TCPSite(runner, '127.0.0.1', port).start()
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """添加模拟服务配置的命令行参数"""
+    defaults = FakeServiceConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeServiceConfig:
+    return FakeServiceConfig(**{name: getattr(args, name) for name in asdict(FakeServiceConfig())})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="运行本地模拟服务")
+    parser.add_argument('--port', type=int, default=18080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    serve([args.port], asdict(config_from_args(args)))
@@ -0,0 +1,267 @@
+"""离线基准测试
+
+在子进程中启动本地模拟服务（见 benchmarks/fake_services.py），把 Gemini、Google 自定义搜索和 Jina Reader
+的地址指向它，然后以指定并发数运行剧本中的调研任务，不访问任何外部服务。每次运行统计：
+
+- 端到端耗时（输出 p50 / p95 / 平均 / 最大值）
+- 全部代理的步数和 token 数
+- 写入任务目录的字节数（文档、对话历史、日志和追踪数据）
+- 本进程消耗的 CPU 时间（模拟服务运行在子进程中，不计入）
+
+模拟服务为 Gemini、Google 自定义搜索和 Jina Reader 各监听一个端口，并通过 RATE_LIMIT_HOSTS 登记到对应的
+限流器，基准测试包含限流器的开销和等待（RATE_LIMIT_ENABLED=0 时不限流）。
+任务目录和缓存目录默认使用临时目录，运行结束后删除，可用 --keep 保留。
+
+用法: python -m benchmarks.run --runs 20 --concurrency 4 --llm-latency lognormal:0.8,0.4 --json result.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+import aiohttp
+from benchmarks.fake_services import FakeServiceConfig, add_config_arguments, config_from_args, serve
+from benchmarks.scenarios import get_scenario
+
+
+@dataclass
+class RunResult:
+    """单次运行的统计结果"""
+
+    run: str
+    status: str = 'ok'
+    latency: float = 0.0
+    steps: int = 0
+    tokens: int = 0
+    bytes_persisted: int = 0
+    error: Optional[str] = None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """按最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _wait_until_ready(base_url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"模拟服务在 {timeout:.0f} 秒内未就绪: {base_url}")
+            await asyncio.sleep(0.1)
+
+
+async def _fetch_stats(base_url: str) -> Dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/stats") as response:
+            return await response.json()
+
+
+def configure_environment(ports: Dict[str, int], work_dir: str):
+    """把外部服务地址、任务目录和缓存目录指向模拟服务和临时目录，必须在导入代理模块之前调用
+
+    Args:
+        ports: 接口名（gemini / google_cse / jina）到模拟服务端口的映射，各端口登记到同名限流器
+        work_dir: 存放任务目录和缓存目录的临时目录
+    """
+    os.environ.update({
+        'GEMINI_API_KEY': 'bench',
+        'GEMINI_BASE_URL': f"http://127.0.0.1:{ports['gemini']}/v1/",
+        'GOOGLE_API_KEY': 'bench',
+        'GOOGLE_SEARCH_ENGINE_ID': 'bench',
+        'GOOGLE_SEARCH_BASE_URL': f"http://127.0.0.1:{ports['google_cse']}/customsearch/v1",
+        'JINA_READER_BASE_URL': f"http://127.0.0.1:{ports['jina']}/jina/",
+        'RATE_LIMIT_HOSTS': ','.join(f"127.0.0.1:{port}={name}" for name, port in ports.items()),
+        'TASKS_DIR': os.path.join(work_dir, 'tasks'),
+        'CACHE_DIR': os.path.join(work_dir, 'cache'),
+    })
+
+
+async def run_once(run: str, prompt: str) -> RunResult:
+    """运行一次调研任务"""
+    from config import TASKS_DIR
+    from agent.controller import ControllerAgent
+    from agent.events import STEP_FINISHED
+
+    result = RunResult(run=run)
+    controller = ControllerAgent(task_id=f"bench_{run}")
+
+    def on_event(event):
+        if event.type == STEP_FINISHED:
+            result.steps += 1
+            result.tokens += event.data.get('tokens', 0)
+
+    unsubscribe = controller.events.subscribe(on_event)
+    started = time.perf_counter()
+    try:
+        await controller._init_task
+        await controller.process_input(prompt.format(run=run))
+    except Exception as e:
+        result.status = 'error'
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.latency = time.perf_counter() - started
+        unsubscribe()
+        controller.close()
+        result.bytes_persisted = _dir_size(os.path.join(TASKS_DIR, controller.current_task_id or f"bench_{run}"))
+    return result
+
+
+async def run_benchmark(runs: int, concurrency: int, config: FakeServiceConfig,
+                        warmup: int = 1, keep: bool = False) -> Dict[str, Any]:
+    """启动模拟服务并运行基准测试
+
+    Args:
+        runs: 计入统计的运行次数
+        concurrency: 同时运行的任务数
+        config: 模拟服务配置
+        warmup: 预热运行次数，用于完成模块导入和连接建立，不计入统计
+        keep: 是否保留任务目录和缓存目录
+
+    Returns:
+        Dict: 汇总统计和每次运行的结果
+    """
+    scenario = get_scenario(config.scenario)
+    ports = {name: _free_port() for name in ('gemini', 'google_cse', 'jina')}
+    # 调用次数统计等管理接口使用任意一个端口
+    base_url = f"http://127.0.0.1:{ports['gemini']}"
+    work_dir = tempfile.mkdtemp(prefix='deep_research_bench_')
+    configure_environment(ports, work_dir)
+    # 代理模块读取刚设置的环境变量，须在 configure_environment 之后导入
+    from tools.http_client import close_http_session
+    from tools.llm_client import close_llm_clients
+
+    server = multiprocessing.get_context('spawn').Process(target=serve, args=(list(ports.values()), asdict(config)),
+                                                          daemon=True)
+    server.start()
+    try:
+        for port in ports.values():
+            await _wait_until_ready(f"http://127.0.0.1:{port}")
+        prefix = uuid.uuid4().hex[:6]
+        for i in range(warmup):
+            await run_once(f"{prefix}_warmup{i}", scenario.prompt)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(i: int) -> RunResult:
+            async with semaphore:
+                return await run_once(f"{prefix}_{i}", scenario.prompt)
+
+        calls_before = await _fetch_stats(base_url)
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        results = await asyncio.gather(*(run_one(i) for i in range(runs)))
+        wall_time = time.perf_counter() - wall_started
+        cpu_time = time.process_time() - cpu_started
+        # 模拟服务的调用次数不含预热运行
+        service_calls = {name: count - calls_before.get(name, 0)
+                         for name, count in (await _fetch_stats(base_url)).items()}
+    finally:
+        # 先关闭共享的连接池，避免退出时提示未关闭的会话和连接
+        await close_http_session()
+        await close_llm_clients()
+        server.terminate()
+        server.join(5)
+        if keep:
+            print(f"任务目录和缓存目录已保留: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    ok = [r for r in results if r.status == 'ok']
+    latencies = [r.latency for r in ok]
+    summary = {
+        "scenario": scenario.name,
+        "runs": runs,
+        "concurrency": concurrency,
+        "errors": len(results) - len(ok),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_mean": statistics.mean(latencies) if latencies else 0.0,
+        "latency_max": max(latencies, default=0.0),
+        "steps_mean": statistics.mean(r.steps for r in ok) if ok else 0.0,
+        "tokens_mean": statistics.mean(r.tokens for r in ok) if ok else 0.0,
+        "bytes_persisted_mean": statistics.mean(r.bytes_persisted for r in ok) if ok else 0.0,
+        "cpu_seconds": cpu_time,
+        "cpu_seconds_per_run": cpu_time / runs if runs else 0.0,
+        "wall_seconds": wall_time,
+        "throughput_per_minute": runs / wall_time * 60 if wall_time else 0.0,
+        "service_calls": service_calls,
+    }
+    return {"summary": summary, "config": asdict(config), "results": [asdict(r) for r in results]}
+
+
+def print_report(report: Dict[str, Any]):
+    summary = report["summary"]
+    print(f"剧本 {summary['scenario']}，{summary['runs']} 次运行，并发 {summary['concurrency']}，"
+          f"失败 {summary['errors']} 次")
+    print(f"耗时(s)     p50 {summary['latency_p50']:.2f}  p95 {summary['latency_p95']:.2f}  "
+          f"平均 {summary['latency_mean']:.2f}  最大 {summary['latency_max']:.2f}")
+    print(f"每次运行    步数 {summary['steps_mean']:.1f}  tokens {summary['tokens_mean']:.0f}  "
+          f"写入 {summary['bytes_persisted_mean'] / 1024:.1f} KiB  CPU {summary['cpu_seconds_per_run']:.3f} s")
+    print(f"总计        墙钟 {summary['wall_seconds']:.2f} s  CPU {summary['cpu_seconds']:.2f} s  "
+          f"吞吐 {summary['throughput_per_minute']:.1f} 次/分钟")
+    print(f"模拟服务调用 {summary['service_calls']}")
+    for result in report["results"]:
+        if result["status"] != 'ok':
+            print(f"  运行 {result['run']} 失败: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用本地模拟服务运行离线基准测试")
+    parser.add_argument('--runs', type=int, default=10, help="计入统计的运行次数")
+    parser.add_argument('--concurrency', type=int, default=1, help="同时运行的任务数")
+    parser.add_argument('--warmup', type=int, default=1, help="预热运行次数，不计入统计")
+    parser.add_argument('--json', metavar='PATH', help="将完整结果写入 JSON 文件")
+    parser.add_argument('--keep', action='store_true', help="保留任务目录和缓存目录")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.runs, args.concurrency, config_from_args(args),
+                                       warmup=args.warmup, keep=args.keep))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if report["summary"]["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""基准测试剧本
+
+每个剧本为主控、搜索和写作三个 Agent 分别给出逐步的模型响应，模拟服务按请求中 assistant 消息的条数
+选取对应步骤的响应，超出剧本长度时重复最后一步。响应模板中可以使用两个占位符：
+
+- {run}     本次运行的编号，取自用户输入中的 [bench:编号]，用来区分并发运行的查询和文档
+- {report}  按 report_chars 分布生成的报告正文
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class Scenario:
+    """一个基准测试剧本"""
+
+    name: str
+    description: str
+    prompt: str  # 用户输入模板，必须包含 [bench:{run}]
+    planner: List[str]
+    search: List[str]
+    writing: List[str]
+
+
+RESEARCH = Scenario(
+    name='research',
+    description='完整调研流程：快速搜索 -> 搜索代理（搜索 + 读取 4 个网页）-> 写作代理 -> 询问用户',
+    prompt='[bench:{run}] 调研大模型推理服务的延迟优化方法，输出一份对比报告。',
+    planner=[
+        """<planning>先快速了解背景。</planning>
+<quick_search>LLM inference latency {run}, speculative decoding {run}</quick_search>""",
+        """<planning>背景已了解，开始信息收集。</planning>
+<todo_list>
+- [ ] 收集推理延迟优化方法
+- [ ] 撰写对比报告
+</todo_list>
+<message_notify_user>开始收集资料。</message_notify_user>
+<search_agent>[bench:{run}] 收集大模型推理延迟优化方法的资料，请将文档保存为 'bench_{run}_search.md'</search_agent>""",
+        """<planning>资料已收集，开始撰写报告。</planning>
+<message_notify_user>开始撰写报告。</message_notify_user>
+<writing_agent>[bench:{run}] 阅读 bench_{run}_search.md，撰写对比报告，请将文档保存为 'bench_{run}_final.md'</writing_agent>""",
+        """<planning>报告已完成，征询用户反馈。</planning>
+<message_ask_user>报告已保存为 bench_{run}_final.md，请查看是否需要调整。</message_ask_user>""",
+    ],
+    search=[
+        """<planning>搜索相关资料。</planning>
+<quick_search>KV cache optimization {run}, continuous batching {run}</quick_search>""",
+        """<planning>阅读搜索结果中的网页。</planning>
+<webpage_read>https://bench.example/{run}/page-1</webpage_read>
+<webpage_read>https://bench.example/{run}/page-2</webpage_read>
+<webpage_read>https://bench.example/{run}/page-3</webpage_read>
+<webpage_read>https://bench.example/{run}/page-4</webpage_read>""",
+        """<planning>整理搜索结果。</planning>
+<report>
+{report}
+</report>""",
+    ],
+    writing=[
+        """<planning>阅读已有资料。</planning>
+<file_read>bench_{run}_search.md</file_read>""",
+        """<planning>撰写最终报告。</planning>
+<report>
+{report}
+</report>""",
+    ],
+)
+
+QUICK = Scenario(
+    name='quick',
+    description='只有主控 Agent 的短流程：快速搜索 -> 询问用户',
+    prompt='[bench:{run}] 简要介绍大模型推理服务的常见部署方式。',
+    planner=[
+        """<planning>快速搜索。</planning>
+<quick_search>LLM serving frameworks {run}</quick_search>""",
+        """<planning>已了解背景，确认研究计划。</planning>
+<message_ask_user>计划从延迟、吞吐和成本三个方面展开，是否确认？</message_ask_user>""",
+    ],
+    search=["<report>\n{report}\n</report>"],
+    writing=["<report>\n{report}\n</report>"],
+)
+
+SCENARIOS: Dict[str, Scenario] = {scenario.name: scenario for scenario in (RESEARCH, QUICK)}
+
+
+def get_scenario(name: str) -> Scenario:
+    """按名称获取剧本"""
+    scenario = SCENARIOS.get(name)
+    if scenario is None:
+        raise ValueError(f"未知的剧本: {name}，可选: {', '.join(SCENARIOS)}")
+    return scenario
@@ -5,4 +5,7 @@ import os
 ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
 
 # 加载.env文件
-load_dotenv(os.path.join(ROOT_DIR, '.env'))
\ No newline at end of file
+load_dotenv(os.path.join(ROOT_DIR, '.env'))
+
+# 任务目录，可通过环境变量 TASKS_DIR 指定其他位置
+TASKS_DIR = os.getenv('TASKS_DIR') or os.path.join(ROOT_DIR, 'tasks')
\ No newline at end of file
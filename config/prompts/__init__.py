@@ -1,18 +1,62 @@
 """提示词管理模块
 
-负责管理不同智能代理的系统提示词
+负责管理不同智能代理的系统提示词。各提示词模块在首次使用时才导入，
+生成的提示词文本按名称缓存，并提供按版本和内容计算的哈希，用作模型服务端前缀缓存的键
 """
 
-from typing import Dict
+import hashlib
+import importlib
+from functools import lru_cache
+from types import ModuleType
+from typing import Dict, NamedTuple
 
-from .planner_agent_prompt import get_default_prompt
-from .search_agent_prompt import get_search_agent_prompt
-from .writing_agent_prompt import get_writing_agent_prompt
 
-# 导出所有系统提示词
-SYSTEM_PROMPTS: Dict[str, str] = {
-    "planner-agent": get_default_prompt(),
-    "search-agent": get_search_agent_prompt(),
-    "writing-agent": get_writing_agent_prompt(),
-    # 在这里添加更多代理的提示词
-}
\ No newline at end of file
+class PromptSpec(NamedTuple):
+    """提示词所在的模块和获取函数"""
+
+    module: str
+    getter: str
+
+
+# 提示词注册表，在这里添加更多代理的提示词
+PROMPT_REGISTRY: Dict[str, PromptSpec] = {
+    "planner-agent": PromptSpec("planner_agent_prompt", "get_default_prompt"),
+    "search-agent": PromptSpec("search_agent_prompt", "get_search_agent_prompt"),
+    "writing-agent": PromptSpec("writing_agent_prompt", "get_writing_agent_prompt"),
+}
+
+
+def _load_module(name: str) -> ModuleType:
+    spec = PROMPT_REGISTRY.get(name)
+    if spec is None:
+        raise ValueError(f"未知的提示词: {name}")
+    return importlib.import_module(f"{__name__}.{spec.module}")
+
+
+@lru_cache(maxsize=None)
+def get_prompt(name: str) -> str:
+    """获取系统提示词，首次调用时导入对应模块并缓存生成的文本
+
+    Args:
+        name: 注册表中的提示词名称，如 planner-agent
+    """
+    return getattr(_load_module(name), PROMPT_REGISTRY[name].getter)()
+
+
+def prompt_version(name: str) -> str:
+    """获取提示词模块声明的版本号"""
+    return getattr(_load_module(name), 'PROMPT_VERSION', '')
+
+
+@lru_cache(maxsize=None)
+def prompt_hash(name: str) -> str:
+    """按版本号和提示词内容计算的短哈希，提示词修改后自动变化"""
+    content = f"{prompt_version(name)}\n{get_prompt(name)}"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+def __getattr__(attr: str):
+    # 兼容旧的 SYSTEM_PROMPTS 字典，访问时才生成
+    if attr == 'SYSTEM_PROMPTS':
+        return {name: get_prompt(name) for name in PROMPT_REGISTRY}
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
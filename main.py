@@ -1,6 +1,10 @@
 import os
 import asyncio
+import argparse
 from agent.controller import ControllerAgent
+from agent import events
+from tools.http_client import close_http_session
+from tools.llm_client import close_llm_clients
 import config  # 确保环境变量在程序启动时被加载
 
 def list_tasks(tasks_dir):
@@ -17,9 +21,64 @@ def list_tasks(tasks_dir):
         print(f"读取任务列表时发生错误: {str(e)}")
         return []
 
+AGENT_NAMES = {
+    'controller': '主控',
+    'search_agent': '搜索代理',
+    'writing_agent': '写作代理',
+}
+
+
+class ProgressRenderer:
+    """在命令行中实时展示进度事件"""
+
+    def __init__(self):
+        self.generated = {}  # 代理 -> 本步已生成的字符数
+        self.status_line = False  # 当前行是否为可覆盖的状态行
+        self.report_open = False
+
+    def _print(self, text: str):
+        """打印一行，先结束可覆盖的状态行或报告内容"""
+        if self.status_line or self.report_open:
+            print()
+            self.status_line = False
+            self.report_open = False
+        print(text, flush=True)
+
+    def render(self, event: events.ProgressEvent):
+        name = AGENT_NAMES.get(event.agent, event.agent)
+        data = event.data
+        if event.type == events.STEP_STARTED:
+            self.generated[event.agent] = 0
+            self._print(f"[{name}] 第 {data['index'] + 1} 步")
+        elif event.type == events.TOKEN:
+            if self.report_open:
+                return
+            self.generated[event.agent] = self.generated.get(event.agent, 0) + len(data['text'])
+            print(f"\r[{name}] 正在生成… {self.generated[event.agent]} 字", end='', flush=True)
+            self.status_line = True
+        elif event.type == events.TOOL_CALLED:
+            detail = data.get('queries') or data.get('urls') or data.get('files') or data.get('task') or ''
+            if isinstance(detail, list):
+                detail = ', '.join(detail)
+            self._print(f"[{name}] 调用 {data['tool']}: {detail[:120]}")
+        elif event.type == events.REPORT_STARTED:
+            self._print(f"[{name}] 正在写入报告:")
+            self.report_open = True
+        elif event.type == events.REPORT_DELTA:
+            if not self.report_open:
+                # 报告内容中间插入了其他输出时重新打印标题
+                self._print(f"[{name}] 正在写入报告:")
+                self.report_open = True
+            print(data['text'], end='', flush=True)
+        elif event.type == events.REPORT_SAVED:
+            self._print(f"[{name}] 报告已保存: {data['path']}（{data['chars']} 字）")
+        elif event.type == events.RESPONSE:
+            self._print(f"\n助手: {data['content']}")
+
+
 async def main():
     # 获取任务目录
-    tasks_dir = os.path.join(os.path.dirname(__file__), 'tasks')
+    tasks_dir = config.TASKS_DIR
     os.makedirs(tasks_dir, exist_ok=True)
     
     print("欢迎使用对话系统！")
@@ -71,15 +130,52 @@ async def main():
             if not user_input:
                 continue
             
-            # 处理用户输入并获取响应
-            response = await controller.process_input(user_input)
-            print(f"\n助手: {response}")
+            # 处理用户输入，实时展示进度并输出最终响应
+            renderer = ProgressRenderer()
+            async for event in controller.stream_input(user_input):
+                renderer.render(event)
             
         except KeyboardInterrupt:
             print("\n程序被中断，正在退出...")
             break
         except Exception as e:
             print(f"\n发生错误: {str(e)}")
+    
+    # 关闭共享的HTTP连接池
+    await close_http_session()
+    await close_llm_clients()
+
+async def batch_main(args):
+    """无人值守地批量运行请求文件中的调研任务"""
+    from agent.batch_runner import run_batch
+    try:
+        await run_batch(
+            args.batch,
+            concurrency=args.concurrency,
+            tasks_per_minute=args.tasks_per_minute,
+            max_tokens=args.max_tokens,
+            ask_user_policy=args.ask_user,
+            max_turns=args.max_turns,
+            output_dir=args.output_dir,
+        )
+    finally:
+        await close_http_session()
+        await close_llm_clients()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="对话系统")
+    parser.add_argument('--batch', metavar='FILE', help="批量模式：读取 JSONL 请求文件并无人值守地运行全部任务")
+    parser.add_argument('--concurrency', type=int, help="批量模式同时运行的任务数")
+    parser.add_argument('--tasks-per-minute', type=float, help="批量模式每分钟最多启动的任务数")
+    parser.add_argument('--max-tokens', type=int, help="批量模式整批任务的 token 预算")
+    parser.add_argument('--ask-user', choices=['auto', 'skip'], help="主控 Agent 提问时自动回复 (auto) 或停止 (skip)")
+    parser.add_argument('--max-turns', type=int, help="批量模式单个任务最多的对话轮数")
+    parser.add_argument('--output-dir', help="批次清单目录，指定已有目录时跳过其中已完成的请求")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.batch:
+        asyncio.run(batch_main(args))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,204 @@
+"""正文提取器模块，基于文本密度、链接密度和DOM规则在本地提取网页正文
+
+支持两种输入：
+- HTML：移除导航、页脚等非正文节点后，按文本密度选出正文容器
+- Markdown/纯文本（如 r.jina.ai 的返回）：按段落块的链接密度和长度过滤非正文块
+
+提取结果附带质量评分，评分较低时由调用方回退到 LLM 清理
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+# class/id 中出现这些词的节点视为非正文
+BOILERPLATE_ATTR_PATTERN = re.compile(
+    r'nav|menu|footer|header|sidebar|comment|share|social|advert|\bads?\b|banner|cookie|'
+    r'related|recommend|breadcrumb|subscribe|newsletter|popup|modal|login|signup|copyright',
+    re.IGNORECASE
+)
+# 直接移除的标签
+BOILERPLATE_TAGS = ['script', 'style', 'noscript', 'nav', 'footer', 'header', 'aside',
+                    'form', 'iframe', 'svg', 'button', 'select', 'template']
+# 常见的非正文短句关键词
+BOILERPLATE_TEXT_PATTERN = re.compile(
+    r'cookie|copyright|©|all rights reserved|subscribe|sign up|sign in|log in|share this|'
+    r'版权所有|登录|注册|分享到|关注我们|扫码|上一篇|下一篇|相关阅读|猜你喜欢|返回顶部|免责声明',
+    re.IGNORECASE
+)
+# Markdown 链接与图片
+MD_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+MD_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+# 句末标点，用于判断段落是否为完整句子
+SENTENCE_END_PATTERN = re.compile(r'[。！？；.!?;:：]')
+# r.jina.ai 返回内容的头部字段
+JINA_HEADER_PATTERN = re.compile(r'^(Title|URL Source|Published Time|Markdown Content):\s*(.*)$')
+
+
+@dataclass
+class ExtractionResult:
+    """正文提取结果"""
+
+    content: str
+    score: float
+    method: str
+
+
+def _score(blocks: List[str], link_densities: List[float], total_chars: int) -> float:
+    """根据保留内容的长度、段落数和链接密度计算 0~1 的质量评分"""
+    if not blocks or total_chars == 0:
+        return 0.0
+    kept_chars = sum(len(b) for b in blocks)
+    paragraphs = sum(1 for b in blocks if len(b) >= 80 or len(SENTENCE_END_PATTERN.findall(b)) >= 2)
+    length_score = min(1.0, kept_chars / 1000)
+    paragraph_score = min(1.0, paragraphs / 4)
+    density_score = 1.0 - sum(link_densities) / len(link_densities)
+    return round(0.4 * length_score + 0.4 * paragraph_score + 0.2 * density_score, 3)
+
+
+def _is_boilerplate_text(text: str) -> bool:
+    return len(text) < 200 and bool(BOILERPLATE_TEXT_PATTERN.search(text))
+
+
+def _looks_like_html(content: str) -> bool:
+    head = content[:2000].lower()
+    if head.lstrip().startswith(('<!doctype', '<html')):
+        return True
+    return len(re.findall(r'<(?:div|p|body|article|section|span)\b', head)) >= 3
+
+
+def _extract_markdown(content: str) -> ExtractionResult:
+    """按段落块过滤 Markdown/纯文本中的非正文内容"""
+    title = ''
+    body_lines = []
+    for line in content.splitlines():
+        header = JINA_HEADER_PATTERN.match(line)
+        if header:
+            if header.group(1) == 'Title':
+                title = header.group(2).strip()
+            continue
+        body_lines.append(line)
+
+    raw_blocks = [b.strip() for b in re.split(r'\n\s*\n', '\n'.join(body_lines)) if b.strip()]
+    kept: List[str] = []
+    densities: List[float] = []
+    total_chars = 0
+    for block in raw_blocks:
+        without_images = MD_IMAGE_PATTERN.sub('', block)
+        link_chars = sum(len(m) for m in MD_LINK_PATTERN.findall(without_images))
+        plain = MD_LINK_PATTERN.sub(r'\1', without_images).strip()
+        total_chars += len(plain)
+        if not plain:
+            continue
+        density = link_chars / max(len(plain), 1)
+        is_heading = plain.startswith('#')
+        if density > 0.5 or _is_boilerplate_text(plain):
+            continue
+        if not is_heading and len(plain) < 20 and not SENTENCE_END_PATTERN.search(plain):
+            continue
+        kept.append(without_images.strip())
+        densities.append(density)
+
+    # 去掉末尾没有正文跟随的标题
+    while kept and kept[-1].lstrip().startswith('#'):
+        kept.pop()
+        densities.pop()
+
+    text = '\n\n'.join(([f'# {title}'] if title else []) + kept)
+    return ExtractionResult(content=text, score=_score(kept, densities, total_chars), method='markdown')
+
+
+def _node_text(node) -> str:
+    return ' '.join(node.get_text(' ', strip=True).split())
+
+
+def _link_density(node) -> float:
+    text_len = len(_node_text(node))
+    if text_len == 0:
+        return 1.0
+    link_len = sum(len(_node_text(a)) for a in node.find_all('a'))
+    return min(1.0, link_len / text_len)
+
+
+def _extract_html(content: str) -> ExtractionResult:
+    """移除非正文节点后，按文本密度选取正文容器"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'lxml')
+    title = ''
+    if soup.title and soup.title.string:
+        title = soup.title.string.strip()
+
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    for node in soup.find_all(True):
+        if getattr(node, 'decomposed', False) or node.attrs is None:
+            continue
+        attr_text = ' '.join([node.get('id') or ''] + list(node.get('class') or []))
+        if attr_text.strip() and BOILERPLATE_ATTR_PATTERN.search(attr_text) and node.name not in ('body', 'html', 'article', 'main'):
+            node.decompose()
+
+    body = soup.body or soup
+    total_chars = len(_node_text(body))
+
+    # 参考 Readability：段落文本为父节点和祖父节点累计得分
+    scores = {}
+    for para in body.find_all(['p', 'pre', 'td', 'blockquote', 'li']):
+        text = _node_text(para)
+        if len(text) < 25:
+            continue
+        para_score = 1 + text.count(',') + text.count('，') + min(len(text) / 100, 3)
+        for depth, ancestor in enumerate((para.parent, getattr(para.parent, 'parent', None))):
+            if ancestor is None or ancestor.name is None:
+                continue
+            node, value = scores.get(id(ancestor), (ancestor, 0.0))
+            scores[id(ancestor)] = (node, value + para_score / (depth + 1))
+
+    candidates: List[Tuple[float, object]] = [
+        (value * (1 - _link_density(node)), node) for node, value in scores.values()
+    ]
+    container = max(candidates, key=lambda c: c[0])[1] if candidates else body
+
+    kept: List[str] = []
+    densities: List[float] = []
+    for node in container.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'pre', 'li', 'blockquote', 'td']):
+        # 跳过嵌套在已处理块中的节点
+        if node.find_parent(['p', 'pre', 'li', 'blockquote']) is not None:
+            continue
+        text = _node_text(node)
+        if not text or _is_boilerplate_text(text):
+            continue
+        density = _link_density(node)
+        if density > 0.5:
+            continue
+        if node.name.startswith('h'):
+            text = f"{'#' * int(node.name[1])} {text}"
+        elif node.name == 'li':
+            text = f'- {text}'
+        elif node.name == 'blockquote':
+            text = f'> {text}'
+        kept.append(text)
+        densities.append(density)
+
+    text = '\n\n'.join(([f'# {title}'] if title and not (kept and kept[0].startswith('# ')) else []) + kept)
+    return ExtractionResult(content=text, score=_score(kept, densities, total_chars), method='html')
+
+
+def extract_main_content(content: str) -> ExtractionResult:
+    """在本地提取网页正文
+
+    Args:
+        content: 网页原始内容（HTML 或 Markdown/纯文本）
+
+    Returns:
+        ExtractionResult: 提取后的正文、质量评分（0~1）和使用的提取方式
+    """
+    if not content or not content.strip():
+        return ExtractionResult(content='', score=0.0, method='empty')
+    try:
+        if _looks_like_html(content):
+            return _extract_html(content)
+        return _extract_markdown(content)
+    except Exception as e:
+        print(f"本地正文提取失败: {str(e)}")
+        return ExtractionResult(content='', score=0.0, method='error')
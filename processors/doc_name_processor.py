@@ -1,29 +1,158 @@
-"""文档名称处理器模块，负责从任务描述中提取合适的文档名称"""
+"""文档名称处理器模块，负责从任务描述中提取合适的文档名称
+
+优先用规则从 “请将文档保存为 'x/y.md'” 等常见句式中提取文件名，规则未命中时才调用模型
+"""
 
 import os
+import re
+import hashlib
+from collections import OrderedDict
 from typing import Optional
-from openai import AsyncOpenAI
+from tools.llm_client import get_llm_client, traced_completion
+
+# 成对的引号
+QUOTE_PAIRS = {"'": "'", '"': '"', '`': '`', '‘': '’', '“': '”', '「': '」', '『': '』', '《': '》'}
+_OPEN_QUOTES = ''.join(re.escape(q) for q in QUOTE_PAIRS)
+_QUOTED = rf'([{_OPEN_QUOTES}])\s*([^\n\'"`‘’“”「」『』《》]+?)\s*[\'"`’”」』》]'
+
+# 明确指明保存文件名的句式，引号紧跟在句式之后，避免把需要读取的文档当作保存目标
+SAVE_PATTERNS = [
+    # 中文：保存为/保存到/存储为/另存为/命名为/文件名为 'x'
+    re.compile(rf'(?:保存为|保存到|保存至|保存成|存储为|存储到|另存为|命名为|文件名为|文档名为)\s*[：:]?\s*{_QUOTED}'),
+    # 英文：save it as 'x' / save the report to "x"，save 与 as/to 之间最多三个词
+    re.compile(rf'\bsave[ds]?(?:\s+[A-Za-z]+){{0,3}}?\s+(?:as|to|into)\s*:?\s*{_QUOTED}', re.IGNORECASE),
+]
+# 未加引号的路径，如 保存为 documents/x.md
+UNQUOTED_SAVE_PATTERN = re.compile(
+    r'(?:保存为|保存到|存储为|命名为|文件名为|save[ds]?\s+(?:it\s+|the\s+\w+\s+)?(?:as|to))\s*([\w\-./\\]+\.[A-Za-z0-9]{1,8})\b',
+    re.IGNORECASE
+)
+# 文件名中不允许的字符
+INVALID_CHARS_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+MAX_NAME_LENGTH = 120
+
+
+def sanitize_doc_name(name: str, default_ext: str = '.md') -> Optional[str]:
+    """去掉路径部分并清理文件名中的非法字符
+
+    Args:
+        name: 原始文件名，可能包含路径或引号
+        default_ext: 没有扩展名时补充的扩展名
+
+    Returns:
+        Optional[str]: 清理后的文件名，无法得到有效文件名时返回 None
+    """
+    name = name.strip().strip(''.join(QUOTE_PAIRS) + ''.join(QUOTE_PAIRS.values())).strip()
+    name = re.split(r'[/\\]', name)[-1]
+    name = INVALID_CHARS_PATTERN.sub('_', name)
+    name = re.sub(r'\s+', ' ', name).strip(' .')
+    if not name:
+        return None
+    stem, ext = os.path.splitext(name)
+    if not ext or not re.fullmatch(r'\.[A-Za-z0-9]{1,8}', ext):
+        stem, ext = name, default_ext
+    if not stem:
+        return None
+    return stem[:MAX_NAME_LENGTH - len(ext)] + ext
+
+
+def unique_doc_path(directory: str, doc_name: str) -> str:
+    """返回目录中不与已有文件冲突的路径，冲突时在文件名后追加 _1、_2 等序号
+
+    Args:
+        directory: 保存目录
+        doc_name: 文档名称
+
+    Returns:
+        str: 可用的文件路径
+    """
+    path = os.path.join(directory, doc_name)
+    stem, ext = os.path.splitext(doc_name)
+    index = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f'{stem}_{index}{ext}')
+        index += 1
+    return path
+
+
+def resolve_doc_path(directory: str, doc_name: str) -> str:
+    """根据环境变量 DOC_NAME_ON_CONFLICT 决定同名文档的处理方式
+
+    overwrite（默认）直接覆盖同名文档；suffix 追加序号另存
+    """
+    if os.getenv('DOC_NAME_ON_CONFLICT', 'overwrite') == 'suffix':
+        return unique_doc_path(directory, doc_name)
+    return os.path.join(directory, doc_name)
+
+
+def match_doc_name(task_description: str) -> Optional[str]:
+    """用规则从任务描述中提取文档名称
+
+    Args:
+        task_description: 任务描述文本
+
+    Returns:
+        Optional[str]: 清理后的文档名称，规则未命中时返回 None
+    """
+    if not task_description:
+        return None
+    for pattern in SAVE_PATTERNS:
+        # 同一句式出现多次时以最后一次为准
+        # 只接受带扩展名的内容，避免把引号中的普通词语当作文件名
+        for match in reversed(list(pattern.finditer(task_description))):
+            if '.' in match.group(2):
+                name = sanitize_doc_name(match.group(2))
+                if name:
+                    return name
+
+    for match in reversed(list(UNQUOTED_SAVE_PATTERN.finditer(task_description))):
+        name = sanitize_doc_name(match.group(1))
+        if name:
+            return name
+
+    # 没有保存句式时，引号中的文件名可能是需要读取的文档，交给模型判断
+    return None
+
 
 class DocNameProcessor:
-    """基于Gemini模型的文档名称处理器类"""
-    
-    def __init__(self):
-        """初始化文档名称处理器，配置Gemini API客户端"""
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
-    
+    """文档名称处理器类，规则提取未命中时使用Gemini模型"""
+
+    def __init__(self, memo_size: int = 256):
+        """初始化文档名称处理器，使用共享的Gemini API客户端
+
+        Args:
+            memo_size: 按任务描述缓存的提取结果条数
+        """
+        self.client = get_llm_client()
+        self.memo_size = memo_size
+        self._memo: 'OrderedDict[str, str]' = OrderedDict()
+
     async def extract_doc_name(self, task_description: str) -> str:
         """从任务描述中提取合适的文档名称
-        
+
         Args:
             task_description: 任务描述文本
-            
+
         Returns:
             str: 提取的文档名称
         """
-        response = await self.client.chat.completions.create(
+        key = hashlib.sha256(task_description.encode('utf-8')).hexdigest()
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+        doc_name = match_doc_name(task_description)
+        if not doc_name:
+            doc_name = await self._extract_with_llm(task_description)
+
+        self._memo[key] = doc_name
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return doc_name
+
+    async def _extract_with_llm(self, task_description: str) -> str:
+        """使用模型提取文档名称"""
+        response = await traced_completion(self.client, 'llm.doc_name',
             model="gemini-2.0-flash-lite",
             messages=[
                 {"role": "system", "content": """
@@ -54,12 +183,13 @@ class DocNameProcessor:
                     请将文档保存为 'research_data/deep_research_alternatives_list.md'。
 
                     输出：deep_research_alternatives_list.md
-                    ```        
+                    ```
                     请直接返回处理后的文档名称，不需要任何额外的解释或说明。
                     """},
                 {"role": "user", "content": task_description}
             ]
         )
-        
+
         doc_name = response.choices[0].message.content.strip()
-        return doc_name
\ No newline at end of file
+        # 模型输出同样去掉路径和非法字符，无法清理时使用默认名称
+        return sanitize_doc_name(doc_name) or 'report.md'
@@ -0,0 +1,217 @@
+"""任务文档索引模块
+
+为任务的 documents 目录（含子目录）维护一份持久化的文档索引，记录每个文档的
+大小、修改时间、内容哈希、预览和标题大纲。刷新时只重新读取大小或修改时间发生变化的文件，
+内容哈希未变的文件沿用已有的预览和大纲。
+
+索引同时维护一个 BM25 段落检索索引（仅在内存中），按内容哈希增量更新
+"""
+
+import os
+import re
+import json
+import hashlib
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+from processors.text_search import BM25Index, split_passages
+
+INDEX_VERSION = 1
+PREVIEW_CHARS = 200
+MAX_HEADINGS = 20
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+
+
+@dataclass
+class DocumentEntry:
+    """单个文档的索引信息"""
+
+    path: str  # 相对于 documents 目录的路径
+    size: int
+    mtime_ns: int
+    hash: str
+    preview: str
+    headings: List[str] = field(default_factory=list)
+
+
+def _outline(text: str) -> List[str]:
+    """提取 Markdown 标题大纲，按层级缩进"""
+    headings = []
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith('```'):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        match = HEADING_PATTERN.match(line)
+        if match:
+            headings.append(f"{'  ' * (len(match.group(1)) - 1)}{match.group(2)}")
+            if len(headings) >= MAX_HEADINGS:
+                break
+    return headings
+
+
+def _is_indexable(name: str) -> bool:
+    """跳过隐藏文件和正在写入的报告"""
+    return not name.startswith('.') and not name.endswith('.part')
+
+
+class DocumentIndex:
+    """任务文档索引"""
+
+    def __init__(self, documents_dir: str, index_path: str):
+        """初始化文档索引
+
+        Args:
+            documents_dir: 任务的 documents 目录
+            index_path: 索引文件路径，应位于 documents 目录之外
+        """
+        self.documents_dir = documents_dir
+        self.index_path = index_path
+        self.entries: Dict[str, DocumentEntry] = {}
+        # 检索索引及其中各文档对应的内容哈希
+        self._search_index = BM25Index()
+        self._searched_hashes: Dict[str, str] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return
+            self.entries = {item['path']: DocumentEntry(**item) for item in data.get('documents', [])}
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            # 索引损坏时重新建立
+            print(f"读取文档索引失败，将重新建立: {str(e)}")
+            self.entries = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "documents": [asdict(entry) for entry in self.entries.values()]
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """递归列出 documents 目录下的文档"""
+        found = {}
+        if not os.path.isdir(self.documents_dir):
+            return found
+        for root, dirs, files in os.walk(self.documents_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(files):
+                if not _is_indexable(name):
+                    continue
+                full_path = os.path.join(root, name)
+                try:
+                    found[os.path.relpath(full_path, self.documents_dir)] = os.stat(full_path)
+                except OSError:
+                    continue
+        return found
+
+    def refresh(self) -> bool:
+        """按文件大小和修改时间增量更新索引
+
+        Returns:
+            bool: 索引是否发生变化
+        """
+        changed = False
+        found = self._scan()
+        for rel_path in list(self.entries):
+            if rel_path not in found:
+                del self.entries[rel_path]
+                changed = True
+
+        for rel_path, stat in found.items():
+            entry = self.entries.get(rel_path)
+            if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                continue
+            try:
+                with open(os.path.join(self.documents_dir, rel_path), 'rb') as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            if entry and entry.hash == digest:
+                # 内容未变，只更新元数据
+                entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+            else:
+                text = raw.decode('utf-8', errors='replace')
+                self.entries[rel_path] = DocumentEntry(
+                    path=rel_path,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    hash=digest,
+                    preview=text[:PREVIEW_CHARS],
+                    headings=_outline(text),
+                )
+            changed = True
+
+        if changed:
+            self.entries = dict(sorted(self.entries.items()))
+            self._save()
+        return changed
+
+    def documents(self) -> List[DocumentEntry]:
+        """返回按路径排序的文档列表"""
+        return list(self.entries.values())
+
+    def get(self, rel_path: str) -> Optional[DocumentEntry]:
+        return self.entries.get(os.path.normpath(rel_path))
+
+    def full_path(self, rel_path: str) -> str:
+        return os.path.join(self.documents_dir, rel_path)
+
+    def _sync_search_index(self):
+        """让检索索引与文档索引保持一致，只重新切分内容哈希变化的文档"""
+        for rel_path in list(self._searched_hashes):
+            if rel_path not in self.entries:
+                self._search_index.remove_document(rel_path)
+                del self._searched_hashes[rel_path]
+        for rel_path, entry in self.entries.items():
+            if self._searched_hashes.get(rel_path) == entry.hash:
+                continue
+            try:
+                with open(self.full_path(rel_path), 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            self._search_index.add_document(rel_path, split_passages(rel_path, text))
+            self._searched_hashes[rel_path] = entry.hash
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[tuple]:
+        """在任务文档中检索与查询最相关的段落
+
+        Args:
+            query: 查询文本
+            top_k: 返回的段落数，默认读取环境变量 DOC_SEARCH_TOP_K
+
+        Returns:
+            List[tuple]: 按得分从高到低排列的 (得分, 段落) 列表
+        """
+        self.refresh()
+        self._sync_search_index()
+        return self._search_index.search(query, top_k or int(os.getenv('DOC_SEARCH_TOP_K', '5')))
+
+
+def format_search_results(query: str, results: List[tuple]) -> str:
+    """将检索结果格式化为添加到对话历史的文本"""
+    if not results:
+        return f"Document Search Results for '{query}':\n未找到相关段落"
+    lines = [f"Document Search Results for '{query}':"]
+    for rank, (score, passage) in enumerate(results, 1):
+        location = f"documents/{passage.doc}" + (f" > {passage.heading}" if passage.heading else "")
+        lines.append(f"[{rank}] {location} (score={score:.2f})\n{passage.text}")
+    return "\n\n".join(lines)
+
+
+def get_task_document_index(task_dir: str) -> DocumentIndex:
+    """获取任务的文档索引，索引文件保存在任务目录的 index 子目录下"""
+    return DocumentIndex(os.path.join(task_dir, 'documents'),
+                         os.path.join(task_dir, 'index', 'documents.json'))
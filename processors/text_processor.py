@@ -1,18 +1,14 @@
 """文本处理器模块，使用Gemini模型处理各类文本输出"""
 
-import os
 from typing import Optional
-from openai import AsyncOpenAI
+from tools.llm_client import get_llm_client, traced_completion
 
 class TextProcessor:
     """基于Gemini模型的文本处理器类"""
     
     def __init__(self):
-        """初始化文本处理器，配置Gemini API客户端"""
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+        """初始化文本处理器，使用共享的Gemini API客户端"""
+        self.client = get_llm_client()
     
     async def process_russian_text(self, text: str) -> str:
         """使用Gemini模型处理俄语文本
@@ -23,7 +19,7 @@ class TextProcessor:
         Returns:
             str: 处理后的文本
         """
-        response = await self.client.chat.completions.create(
+        response = await traced_completion(self.client, 'llm.text_processor',
             model="gemini-2.0-flash-lite",
             messages=[
                 {"role": "system", "content": """
@@ -0,0 +1,168 @@
+"""本地全文检索模块
+
+将文档切分为段落并建立倒排索引，按 BM25 对段落打分，只返回与查询最相关的若干段落。
+中日韩文本按单字和相邻双字切分，其余文本按单词切分
+"""
+
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+# 中日韩字符连续片段
+CJK_RUN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+')
+# 英文单词和数字，允许 gpt-4o、v1.2 这类内部带连接符的词
+WORD_PATTERN = re.compile(r'[a-z0-9]+(?:[._\-][a-z0-9]+)*')
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$')
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'is', 'are', 'was', 'were',
+    'be', 'by', 'as', 'at', 'it', 'this', 'that', 'from', 'how', 'what', 'which',
+    '的', '了', '和', '与', '是', '在', '及', '或', '等', '对', '中',
+})
+PASSAGE_CHARS = 800
+
+
+def tokenize(text: str) -> List[str]:
+    """将文本切分为检索词：中日韩片段产出单字和相邻双字，其余按单词切分"""
+    text = text.lower()
+    tokens = []
+    for word in WORD_PATTERN.findall(text):
+        if word not in STOPWORDS:
+            tokens.append(word)
+    for run in CJK_RUN_PATTERN.findall(text):
+        tokens.extend(c for c in run if c not in STOPWORDS)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@dataclass
+class Passage:
+    """文档中的一个段落"""
+
+    doc: str  # 文档标识，如相对路径
+    index: int  # 段落在文档中的序号
+    heading: str  # 段落所属的最近一级标题
+    text: str
+    tf: Dict[str, int] = field(default_factory=dict)
+    length: int = 0
+
+
+def split_passages(doc: str, text: str, max_chars: int = PASSAGE_CHARS) -> List[Passage]:
+    """按标题和空行将文档切分为不超过 max_chars 的段落，并统计词频
+
+    Args:
+        doc: 文档标识
+        text: 文档内容
+        max_chars: 单个段落的最大字符数，超长的自然段会被截断为多段
+
+    Returns:
+        List[Passage]: 段落列表
+    """
+    passages: List[Passage] = []
+    heading = ''
+    buffer: List[str] = []
+
+    def flush():
+        if buffer:
+            body = '\n\n'.join(buffer)
+            tokens = tokenize(f'{heading}\n{body}')
+            passages.append(Passage(doc=doc, index=len(passages), heading=heading, text=body,
+                                    tf=dict(Counter(tokens)), length=len(tokens)))
+            buffer.clear()
+
+    for block in re.split(r'\n\s*\n', text):
+        block = block.strip()
+        if not block:
+            continue
+        match = HEADING_PATTERN.match(block.split('\n', 1)[0])
+        if match:
+            flush()
+            heading = match.group(1)
+            block = block.split('\n', 1)[1].strip() if '\n' in block else ''
+            if not block:
+                continue
+        while len(block) > max_chars:
+            flush()
+            buffer.append(block[:max_chars])
+            flush()
+            block = block[max_chars:]
+        if buffer and sum(len(b) for b in buffer) + len(block) > max_chars:
+            flush()
+        buffer.append(block)
+    flush()
+    return passages
+
+
+class BM25Index:
+    """基于 BM25 的段落倒排索引，支持按文档增删"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: Dict[int, Passage] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._doc_passages: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def add_document(self, doc: str, passages: Iterable[Passage]):
+        """加入文档的全部段落，已存在的同名文档先被移除"""
+        self.remove_document(doc)
+        ids = []
+        for passage in passages:
+            pid = self._next_id
+            self._next_id += 1
+            self.passages[pid] = passage
+            self._total_length += passage.length
+            for term, count in passage.tf.items():
+                self.postings.setdefault(term, {})[pid] = count
+            ids.append(pid)
+        self._doc_passages[doc] = ids
+
+    def remove_document(self, doc: str):
+        for pid in self._doc_passages.pop(doc, []):
+            passage = self.passages.pop(pid)
+            self._total_length -= passage.length
+            for term in passage.tf:
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(pid, None)
+                    if not postings:
+                        del self.postings[term]
+
+    def search(self, query: str, top_k: int = 5, docs: Optional[Iterable[str]] = None) -> List[tuple]:
+        """检索与查询最相关的段落
+
+        Args:
+            query: 查询文本
+            top_k: 返回的段落数
+            docs: 只在这些文档中检索，默认检索全部文档
+
+        Returns:
+            List[tuple]: 按得分从高到低排列的 (得分, 段落) 列表
+        """
+        if not self.passages:
+            return []
+        allowed = None
+        if docs is not None:
+            allowed = {pid for doc in docs for pid in self._doc_passages.get(doc, [])}
+        n = len(self.passages)
+        avg_length = self._total_length / n or 1
+        scores: Dict[int, float] = {}
+        for term, query_count in Counter(tokenize(query)).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings.items():
+                if allowed is not None and pid not in allowed:
+                    continue
+                length = self.passages[pid].length
+                norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                scores[pid] = scores.get(pid, 0.0) + idf * norm * query_count
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(score, self.passages[pid]) for pid, score in ranked]
@@ -2,19 +2,47 @@
 
 import os
 from typing import Optional
-from openai import AsyncOpenAI
+from tools.llm_client import get_llm_client, traced_completion
+from tools.page_cache import PageCache, get_page_cache
+from processors.content_extractor import extract_main_content
+
+# 清理提示词版本，修改提示词时需同步更新，使旧的清理结果缓存失效
+PROMPT_VERSION = "v1"
 
 class WebContentProcessor:
     """基于Gemini模型的网页内容处理器类"""
     
-    def __init__(self):
-        """初始化网页内容处理器，配置Gemini API客户端"""
-        self.client = AsyncOpenAI(
-            api_key=os.getenv('GEMINI_API_KEY'),
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
-        )
+    def __init__(self, cache: Optional[PageCache] = None):
+        """初始化网页内容处理器，使用共享的Gemini API客户端
+        
+        Args:
+            cache: 清理结果缓存，不提供则使用进程共享的默认缓存
+        """
+        self.client = get_llm_client()
+        self.cache = cache or get_page_cache()
+        # 本地提取评分不低于该值时直接使用本地结果，否则回退到LLM清理
+        self.min_local_score = float(os.getenv('CONTENT_EXTRACTOR_MIN_SCORE', '0.55'))
+        # 回退到LLM清理时发送的原文最大字符数
+        self.max_llm_input_chars = int(os.getenv('CONTENT_CLEANUP_MAX_CHARS', '60000'))
     
     async def process_web_content(self, content: str) -> str:
+        """处理网页内容，移除非正文部分
+        
+        优先使用本地规则提取正文，提取质量评分较低时再使用Gemini模型清理
+        
+        Args:
+            content: 需要处理的网页内容
+            
+        Returns:
+            str: 处理后的纯正文内容
+        """
+        extraction = extract_main_content(content)
+        if extraction.content and extraction.score >= self.min_local_score:
+            return extraction.content
+        
+        return await self._process_with_llm(content)
+
+    async def _process_with_llm(self, content: str) -> str:
         """使用Gemini模型处理网页内容，移除非正文部分
         
         Args:
@@ -23,7 +51,12 @@ class WebContentProcessor:
         Returns:
             str: 处理后的纯正文内容
         """
-        response = await self.client.chat.completions.create(
+        if self.cache:
+            cached = self.cache.get_cleaned(content, PROMPT_VERSION)
+            if cached is not None:
+                return cached
+        
+        response = await traced_completion(self.client, 'llm.web_content',
             model="gemini-2.0-flash-lite",
             messages=[
                 {"role": "system", "content": """
@@ -67,7 +100,10 @@ class WebContentProcessor:
 
 目标：输出一个干净、结构清晰、只包含核心内容的文本版本。
                     """},
-                {"role": "user", "content": "需要处理的原文如下：\n\n" + content}
+                {"role": "user", "content": "需要处理的原文如下：\n\n" + content[:self.max_llm_input_chars]}
             ]
         )
-        return response.choices[0].message.content
\ No newline at end of file
+        cleaned_content = response.choices[0].message.content
+        if self.cache and cleaned_content:
+            self.cache.set_cleaned(content, PROMPT_VERSION, cleaned_content)
+        return cleaned_content
\ No newline at end of file
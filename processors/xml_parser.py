@@ -1,77 +1,123 @@
-from typing import Dict
-from bs4 import BeautifulSoup
+import re
+from typing import Dict, Iterable, List, Optional
 
-def extract_xml_tags(text: str) -> Dict[str, list]:
+# 代理输出中使用的标签
+KNOWN_TAGS = frozenset({
+    'planning', 'quick_search', 'webpage_read', 'report', 'todo_list', 'file_read',
+    'message_ask_user', 'message_notify_user', 'search_agent', 'writing_agent', 'doc_search',
+    'knowledge_lookup',
+})
+# 内容按原样保留、不再解析内部标签的标签
+OPAQUE_TAGS = frozenset({'report'})
+
+TAG_PATTERN = re.compile(r'<(/?)([A-Za-z][\w\-]*)((?:\s[^<>]*)?)>')
+ATTR_PATTERN = re.compile(r'([\w\-:]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+
+def _normalize_tag_name(name: str) -> str:
+    """统一标签命名为下划线格式，如 quickSearch -> quick_search"""
+    return ''.join(['_' + c.lower() if c.isupper() else c for c in name]).lstrip('_').replace('-', '_')
+
+
+def _parse_attrs(attr_text: str) -> Dict[str, str]:
+    attrs = {}
+    for match in ATTR_PATTERN.finditer(attr_text):
+        key, double_quoted, single_quoted, bare = match.groups()
+        attrs[key] = next(v for v in (double_quoted, single_quoted, bare, '') if v is not None)
+    return attrs
+
+
+def extract_xml_tags(text: str, tags: Optional[Iterable[str]] = None) -> Dict[str, list]:
     """
     提取XML标签内容，支持带属性和嵌套场景
     
+    单次线性扫描识别已知标签，容忍未闭合或错位的标签：
+    - 同名标签再次打开时，前一个未闭合的同名标签在此处结束
+    - 闭合标签会同时结束其内部所有未闭合的标签
+    - 文本结束时仍未闭合的标签，内容截止到其内部第一个子标签或文本末尾
+    - 紧跟在反引号后的标签（如 `<quick_search>`）视为普通文本
+    - report 标签的内容按原样保留，不解析其中的标签
+    
     Args:
         text: 包含XML标签的文本，可能包含Markdown代码块
+        tags: 需要识别的标签名集合，默认使用 KNOWN_TAGS
         
     Returns:
         字典格式的标签名到内容列表的映射，相同标签名的内容会被存储在同一个列表中
     """
-    result = {}
+    vocabulary = frozenset(tags) if tags is not None else KNOWN_TAGS
+    result: Dict[str, list] = {}
     
-    def wrap_with_cdata(text: str) -> str:
-        """将文本包装在CDATA中以保护内部XML标签"""
-        return f'<![CDATA[{text}]]>'
     try:
         # 处理Markdown代码块
+        text = text.strip()
         if text.startswith('```xml'):
             text = text[6:]
         if text.endswith('```'):
             text = text[:-3]
-        text = text.strip()
-        
-        # 预处理XML标签内容，将内容包装在CDATA中
-        import re
-        # 首先处理反引号中的标签引用，将其转义
-        backtick_pattern = r'`<[^`]+>`'
-        def escape_backtick_tags(match):
-            return match.group(0).replace('<', '&lt;').replace('>', '&gt;')
-        text = re.sub(backtick_pattern, escape_backtick_tags, text)
         
-        # 处理真实的XML标签内容
-        pattern = r'(<[^>]+>)([^<]+)(</[^>]+>)'
+        # 打开中的标签：[标签名, 属性文本, 内容起始位置, 标签起始位置, 首个子标签位置]
+        stack: List[list] = []
+        # 已结束的标签：(标签起始位置, 标签名, 内容, 属性文本)
+        elements = []
+        opaque_tag = None
         
-        def replace_content(match):
-            start_tag, content, end_tag = match.groups()
-            return f'{start_tag}{wrap_with_cdata(content)}{end_tag}'
+        def close(entry: list, end: int, closed: bool):
+            name, attr_text, content_start, open_pos, first_child = entry
+            if not closed and first_child is not None:
+                end = first_child
+            elements.append((open_pos, name, text[content_start:end], attr_text))
         
-        text = re.sub(pattern, replace_content, text)
-        soup = BeautifulSoup(f'<root>{text}</root>', 'lxml-xml')
-        print('解析后的XML结构：', soup.prettify())  # 调试输出
+        for match in TAG_PATTERN.finditer(text):
+            is_closing, raw_name, attr_text = match.groups()
+            name = _normalize_tag_name(raw_name)
+            if name not in vocabulary:
+                continue
+            if match.start() > 0 and text[match.start() - 1] == '`':
+                continue
+            
+            if opaque_tag is not None:
+                if is_closing and name == opaque_tag:
+                    close(stack.pop(), match.start(), True)
+                    opaque_tag = None
+                continue
+            
+            if not is_closing:
+                if attr_text.rstrip().endswith('/'):
+                    continue
+                # 同名标签未闭合又再次打开，视为前一个标签在此结束
+                for index in range(len(stack) - 1, -1, -1):
+                    if stack[index][0] == name:
+                        while len(stack) > index:
+                            close(stack.pop(), match.start(), False)
+                        break
+                if stack and stack[-1][4] is None:
+                    stack[-1][4] = match.start()
+                stack.append([name, attr_text, match.end(), match.start(), None])
+                if name in OPAQUE_TAGS:
+                    opaque_tag = name
+                continue
+            
+            # 闭合标签：结束匹配的标签及其内部未闭合的标签，无匹配的闭合标签忽略
+            for index in range(len(stack) - 1, -1, -1):
+                if stack[index][0] == name:
+                    while len(stack) > index + 1:
+                        close(stack.pop(), match.start(), False)
+                    close(stack.pop(), match.start(), True)
+                    break
         
-        # 递归提取所有子标签
-        def extract_nested_tags(element):
-            if hasattr(element, 'children'):
-                for child in element.children:
-                    if child.name:
-                        # 统一标签命名为下划线格式
-                        tag_name = ''.join(['_' + c.lower() if c.isupper() else c for c in child.name]).lstrip('_')
-                        # 提取标签内容，处理CDATA
-                        content = ''.join(str(item) for item in child.contents)
-                        # 移除CDATA标记
-                        content = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', content)
-                        content = content.strip()
-                        # 将内容添加到对应标签的列表中
-                        if content:  # 只有当内容不为空时才添加
-                            if tag_name in result:
-                                result[tag_name].append(content)
-                            else:
-                                result[tag_name] = [content]
-                        # 提取标签属性
-                        if child.attrs:
-                            attr_key = f'{tag_name}.attrs'
-                            if attr_key in result:
-                                result[attr_key].append(str(child.attrs))
-                            else:
-                                result[attr_key] = [str(child.attrs)]
-                        # 递归处理子标签
-                        extract_nested_tags(child)
+        while stack:
+            close(stack.pop(), len(text), False)
         
-        extract_nested_tags(soup.root)
+        # 按标签出现顺序输出
+        for _, name, content, attr_text in sorted(elements, key=lambda e: e[0]):
+            content = content.strip()
+            # 只有当内容不为空时才添加
+            if content:
+                result.setdefault(name, []).append(content)
+            attrs = _parse_attrs(attr_text)
+            if attrs:
+                result.setdefault(f'{name}.attrs', []).append(str(attrs))
                 
     except Exception as e:
         print(f"XML解析错误: {str(e)}")
@@ -79,6 +125,62 @@ def extract_xml_tags(text: str) -> Dict[str, list]:
     return result
 
 
+class IncrementalTagScanner:
+    """增量标签扫描器，用于流式输出时在标签闭合的同时取得其内容"""
+    
+    def __init__(self, tags: Iterable[str]):
+        """初始化扫描器
+        
+        Args:
+            tags: 需要在闭合时产出内容的标签名
+        """
+        self.watched = frozenset(tags)
+        self.buffer = ''
+        self._pos = 0
+        self._open: Dict[str, int] = {}
+        self._opaque_tag: Optional[str] = None
+    
+    def feed(self, chunk: str) -> List[tuple]:
+        """追加一段输出文本
+        
+        Args:
+            chunk: 新到达的文本片段
+            
+        Returns:
+            List[tuple]: 本次新闭合的 (标签名, 内容) 列表，内容已去除首尾空白
+        """
+        self.buffer += chunk
+        end = len(self.buffer)
+        # 末尾未完整到达的标签留到下次扫描
+        last_lt = self.buffer.rfind('<', self._pos)
+        if last_lt != -1 and self.buffer.find('>', last_lt) == -1:
+            end = last_lt
+        
+        completed = []
+        for match in TAG_PATTERN.finditer(self.buffer, self._pos, end):
+            is_closing, raw_name, _ = match.groups()
+            name = _normalize_tag_name(raw_name)
+            if name not in KNOWN_TAGS and name not in self.watched:
+                continue
+            if match.start() > 0 and self.buffer[match.start() - 1] == '`':
+                continue
+            if self._opaque_tag is not None:
+                if is_closing and name == self._opaque_tag:
+                    self._opaque_tag = None
+                continue
+            if not is_closing:
+                if name in OPAQUE_TAGS:
+                    self._opaque_tag = name
+                elif name in self.watched:
+                    self._open[name] = match.end()
+            elif name in self._open:
+                content = self.buffer[self._open.pop(name):match.start()].strip()
+                if content:
+                    completed.append((name, content))
+        self._pos = end
+        return completed
+
+
 def main():
     test_case = '''
     ```xml
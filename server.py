@@ -0,0 +1,157 @@
+"""HTTP 服务入口
+
+在同一进程中为多个用户托管 ControllerAgent 会话：
+
+- POST   /sessions                      新建会话，或以 {"task_id": ...} 加载已有任务
+- GET    /sessions                      列出当前会话
+- DELETE /sessions/{task_id}            关闭会话
+- POST   /sessions/{task_id}/messages   提交输入 {"content": ...}，以 SSE 推送进度事件；?stream=0 时只返回最终响应
+- GET    /sessions/{task_id}/ws         WebSocket，客户端发送 {"content": ...}，服务端推送进度事件
+- GET    /health                        健康检查
+
+用法: python server.py [--host 127.0.0.1] [--port 8080]
+"""
+
+import os
+import json
+import argparse
+from aiohttp import web, WSMsgType
+from agent.session_manager import SessionManager
+from agent.events import RESPONSE
+from tools.http_client import close_http_session
+from tools.llm_client import close_llm_clients
+import config  # 确保环境变量在程序启动时被加载
+
+MANAGER_KEY = web.AppKey('session_manager', SessionManager)
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+async def _read_json(request: web.Request) -> dict:
+    if not request.can_read_body:
+        return {}
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+async def create_session(request: web.Request) -> web.Response:
+    manager = request.app[MANAGER_KEY]
+    body = await _read_json(request)
+    try:
+        session = await manager.get_or_create(body.get('task_id'))
+    except ValueError as e:
+        return _error(400, str(e))
+    return web.json_response(session.info(), status=201)
+
+
+async def list_sessions(request: web.Request) -> web.Response:
+    return web.json_response({"sessions": request.app[MANAGER_KEY].list_sessions()})
+
+
+async def delete_session(request: web.Request) -> web.Response:
+    removed = await request.app[MANAGER_KEY].remove(request.match_info['task_id'])
+    return web.json_response({"removed": removed}, status=200 if removed else 404)
+
+
+async def post_message(request: web.Request) -> web.StreamResponse:
+    manager = request.app[MANAGER_KEY]
+    content = str((await _read_json(request)).get('content') or '').strip()
+    if not content:
+        return _error(400, "content 不能为空")
+    try:
+        queue = await manager.submit(request.match_info['task_id'], content)
+    except ValueError as e:
+        return _error(400, str(e))
+
+    if request.query.get('stream') == '0':
+        final = None
+        while (event := await queue.get()) is not None:
+            if event.type in (RESPONSE, 'error'):
+                final = event
+        status = 200 if final is not None and final.type == RESPONSE else 500
+        return web.json_response(final.to_dict() if final else {}, status=status)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    # 客户端断开后输入仍在后台继续执行，这里只停止推送
+    while (event := await queue.get()) is not None:
+        payload = json.dumps(event.to_dict(), ensure_ascii=False)
+        try:
+            await response.write(f"event: {event.type}\ndata: {payload}\n\n".encode('utf-8'))
+        except ConnectionResetError:
+            break
+    return response
+
+
+async def session_ws(request: web.Request) -> web.WebSocketResponse:
+    manager = request.app[MANAGER_KEY]
+    task_id = request.match_info['task_id']
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    async for message in ws:
+        if message.type != WSMsgType.TEXT:
+            continue
+        try:
+            content = str(json.loads(message.data).get('content') or '').strip()
+        except (json.JSONDecodeError, AttributeError):
+            content = ''
+        if not content:
+            await ws.send_json({"type": "error", "data": {"message": "content 不能为空"}})
+            continue
+        try:
+            queue = await manager.submit(task_id, content)
+        except ValueError as e:
+            await ws.send_json({"type": "error", "data": {"message": str(e)}})
+            continue
+        while (event := await queue.get()) is not None:
+            if not ws.closed:
+                await ws.send_str(json.dumps(event.to_dict(), ensure_ascii=False))
+    return ws
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", "sessions": len(request.app[MANAGER_KEY].sessions)})
+
+
+async def _on_startup(app: web.Application):
+    app[MANAGER_KEY].start()
+
+
+async def _on_cleanup(app: web.Application):
+    await app[MANAGER_KEY].close()
+    await close_http_session()
+    await close_llm_clients()
+
+
+def create_app(manager: SessionManager = None) -> web.Application:
+    """创建 aiohttp 应用"""
+    app = web.Application()
+    app[MANAGER_KEY] = manager or SessionManager()
+    app.add_routes([
+        web.post('/sessions', create_session),
+        web.get('/sessions', list_sessions),
+        web.delete('/sessions/{task_id}', delete_session),
+        web.post('/sessions/{task_id}/messages', post_message),
+        web.get('/sessions/{task_id}/ws', session_ws),
+        web.get('/health', health),
+    ])
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对话系统 HTTP 服务")
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '8080')))
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,32 @@
+"""文档名称规则提取的测试"""
+
+import unittest
+from processors.doc_name_processor import match_doc_name, sanitize_doc_name
+
+
+class MatchDocNameTest(unittest.TestCase):
+
+    def test_explicit_save_phrases(self):
+        self.assertEqual(match_doc_name("请将文档保存为 'documents/report.md'"), 'report.md')
+        self.assertEqual(match_doc_name("完成后保存到：「summary.md」"), 'summary.md')
+        self.assertEqual(match_doc_name("Please save it as 'notes.md'."), 'notes.md')
+        self.assertEqual(match_doc_name('Save the final report to "final.md"'), 'final.md')
+        self.assertEqual(match_doc_name("请将文档保存为 documents/plain.md"), 'plain.md')
+
+    def test_read_target_before_save_target(self):
+        self.assertEqual(match_doc_name("请阅读 'input.md'，并将文档保存为 'output.md'"), 'output.md')
+
+    def test_input_documents_are_not_save_targets(self):
+        self.assertIsNone(match_doc_name("请输出最终报告，参考 'search_notes.md' 中的内容"))
+        self.assertIsNone(match_doc_name("Store the findings, using 'notes.md' as the source"))
+        self.assertIsNone(match_doc_name("Please name the key competitors listed in 'competitors.md'"))
+        self.assertIsNone(match_doc_name("请阅读 'todo_list.md' 然后撰写报告"))
+        self.assertIsNone(match_doc_name("写入报告时请基于 'data.md'"))
+
+    def test_sanitize_doc_name(self):
+        self.assertEqual(sanitize_doc_name('a/b/报告:v1'), '报告_v1.md')
+        self.assertIsNone(sanitize_doc_name('  ..  '))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""对话历史存储的测试"""
+
+import os
+import tempfile
+import unittest
+from agent.history_store import ChatHistoryStore
+
+
+class ChatHistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.history_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _messages(self, start: int, count: int):
+        return [{"role": "user", "content": f"消息 {i}"} for i in range(start, start + count)]
+
+    def test_torn_last_line_is_truncated_before_append(self):
+        store = ChatHistoryStore(self.history_dir, fsync_policy='never')
+        history = self._messages(0, 3)
+        store.save(history)
+        # 模拟进程在写入最后一行时中断
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 3, "mess')
+
+        store = ChatHistoryStore(self.history_dir, fsync_policy='never')
+        history = store.load()
+        self.assertEqual(history, self._messages(0, 3))
+        history.extend(self._messages(3, 3))
+        store.save(history)
+
+        reloaded = ChatHistoryStore(self.history_dir, fsync_policy='never').load()
+        self.assertEqual(reloaded, self._messages(0, 6))
+
+    def test_line_without_newline_is_discarded(self):
+        store = ChatHistoryStore(self.history_dir, fsync_policy='never')
+        store.save(self._messages(0, 2))
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "message": {"role": "user", "content": "消息 2"}}')
+
+        store = ChatHistoryStore(self.history_dir, fsync_policy='never')
+        self.assertEqual(store.load(), self._messages(0, 2))
+        self.assertTrue(open(store.journal_path, 'rb').read().endswith(b'\n'))
+
+    def test_compacted_entries_are_skipped(self):
+        store = ChatHistoryStore(self.history_dir, fsync_policy='never', compact_every=1000)
+        store.save(self._messages(0, 4))
+        store.compact(self._messages(0, 4))
+        self.assertFalse(os.path.exists(store.journal_path))
+        store.save(self._messages(0, 5))
+        self.assertEqual(ChatHistoryStore(self.history_dir).load(), self._messages(0, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""接口限流器的测试"""
+
+import os
+import time
+import asyncio
+import unittest
+from unittest import mock
+from email.utils import formatdate
+from tools.rate_limiter import EndpointLimiter, TokenBucket, limiter_for_url, parse_retry_after
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_up_to_capacity_then_wait(self):
+        bucket = TokenBucket(60)
+        now = bucket.updated
+        for _ in range(60):
+            self.assertEqual(bucket.reserve(1, now), 0.0)
+        # 每秒补充 1 个，透支 1 个需要等待 1 秒
+        self.assertAlmostEqual(bucket.reserve(1, now), 1.0)
+        self.assertAlmostEqual(bucket.reserve(1, now + 0.5), 1.5)
+
+    def test_oversized_request_is_capped_at_capacity(self):
+        bucket = TokenBucket(100)
+        self.assertEqual(bucket.reserve(1000, bucket.updated), 0.0)
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+
+    def test_seconds_and_case_insensitive_header(self):
+        self.assertEqual(parse_retry_after({'Retry-After': '3'}), 3.0)
+        self.assertEqual(parse_retry_after({'retry-after': ' 1.5 '}), 1.5)
+
+    def test_http_date(self):
+        delay = parse_retry_after({'Retry-After': formatdate(time.time() + 30, usegmt=True)})
+        self.assertTrue(25 <= delay <= 31)
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(parse_retry_after({}))
+        self.assertIsNone(parse_retry_after({'Retry-After': 'soon'}))
+
+
+class AimdTest(unittest.TestCase):
+
+    def test_shrink_on_429_and_grow_on_success(self):
+        limiter = EndpointLimiter('test', max_concurrency=8)
+        limiter.record(429)
+        self.assertEqual(limiter.concurrency, 4)
+        limiter.record(503)
+        self.assertEqual(limiter.concurrency, 2)
+        for _ in range(5):
+            limiter.record(429)
+        self.assertEqual(limiter.concurrency, limiter.min_concurrency)
+
+        limiter.record(200)
+        self.assertEqual(limiter.concurrency, 2)
+        # 加性增长：并发为 c 时每次成功增加 1/c
+        limiter.record(200)
+        self.assertAlmostEqual(limiter.concurrency, 2.5)
+        for _ in range(100):
+            limiter.record(200)
+        self.assertEqual(limiter.concurrency, 8)
+
+    def test_client_errors_do_not_change_concurrency(self):
+        limiter = EndpointLimiter('test', max_concurrency=4)
+        limiter.record(404)
+        self.assertEqual(limiter.concurrency, 4)
+
+    def test_unlimited_concurrency_is_not_adjusted(self):
+        limiter = EndpointLimiter('test')
+        limiter.record(429)
+        limiter.record(200)
+        self.assertEqual(limiter.concurrency, 0)
+
+
+class EndpointLimiterAsyncTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrency_cap(self):
+        limiter = EndpointLimiter('test', max_concurrency=2)
+        active = peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with limiter.limit():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(8)))
+        self.assertEqual(peak, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_shrunk_limit_applies_to_new_requests(self):
+        limiter = EndpointLimiter('test', max_concurrency=4)
+        limiter.record(429)
+        limiter.record(429)
+        active = peak = 0
+
+        async def call():
+            nonlocal active, peak
+            async with limiter.limit():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        self.assertEqual(peak, 1)
+
+    async def test_retry_after_blocks_new_requests(self):
+        limiter = EndpointLimiter('test', max_concurrency=4)
+        self.assertEqual(limiter.record(429, {'retry-after': '0.2'}), 0.2)
+        started = time.monotonic()
+        async with limiter.limit():
+            pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+        self.assertEqual(limiter.stats["retry_after"], 1)
+        self.assertEqual(limiter.stats["throttled"], 1)
+
+    async def test_cancelled_waiter_releases_slot(self):
+        limiter = EndpointLimiter('test', max_concurrency=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        self.assertEqual(limiter.in_flight, 0)
+        await asyncio.wait_for(limiter.acquire(), 1)
+        limiter.release()
+
+
+class LimiterForUrlTest(unittest.TestCase):
+
+    def test_registered_and_overridden_hosts(self):
+        env = {'RATE_LIMIT_ENABLED': '1', 'RATE_LIMIT_HOSTS': '127.0.0.1:18081=gemini, localhost=jina'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(limiter_for_url('https://r.jina.ai/https://example.com').name, 'jina')
+            self.assertEqual(limiter_for_url('http://127.0.0.1:18081/v1/chat/completions').name, 'gemini')
+            self.assertEqual(limiter_for_url('http://localhost:9000/x').name, 'jina')
+            self.assertIsNone(limiter_for_url('http://127.0.0.1:18082/'))
+            self.assertIsNone(limiter_for_url('https://example.com/'))
+
+    def test_disabled(self):
+        with mock.patch.dict(os.environ, {'RATE_LIMIT_ENABLED': '0'}):
+            self.assertIsNone(limiter_for_url('https://r.jina.ai/https://example.com'))
+
+
+if __name__ == '__main__':
+    unittest.main()
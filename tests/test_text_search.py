@@ -0,0 +1,103 @@
+"""本地全文检索的测试"""
+
+import unittest
+from processors.text_search import BM25Index, split_passages, tokenize
+
+DOCS = {
+    'latency.md': """# 推理优化
+
+## 推理延迟
+
+KV cache 可以显著降低 LLM 推理延迟，speculative decoding 进一步减少解码步数。
+""",
+    'training.md': """# 训练
+
+## 分布式训练
+
+Large models are trained with data parallelism and 流水线并行。
+""",
+    'serving.md': """# 部署
+
+## 服务框架
+
+vLLM 和 TGI 提供 continuous batching，提升吞吐。
+""",
+}
+
+
+class TokenizeTest(unittest.TestCase):
+
+    def test_cjk_unigrams_bigrams_and_latin_words(self):
+        tokens = tokenize('大模型推理 GPT-4o 的 latency')
+        for token in ('大', '模型', '推理', '理', 'gpt-4o', 'latency'):
+            self.assertIn(token, tokens)
+        # 停用词不产出单字
+        self.assertNotIn('的', tokens)
+
+    def test_stopwords_removed(self):
+        self.assertEqual(tokenize('the cache of a model'), ['cache', 'model'])
+
+
+class SplitPassagesTest(unittest.TestCase):
+
+    def test_headings_and_max_chars(self):
+        text = "# 标题一\n\n第一段。\n\n## 标题二\n\n" + '长' * 50 + "\n\n短段。"
+        passages = split_passages('a.md', text, max_chars=20)
+        self.assertEqual(passages[0].heading, '标题一')
+        self.assertEqual(passages[0].text, '第一段。')
+        self.assertTrue(all(len(p.text) <= 20 for p in passages))
+        self.assertTrue(all(p.heading == '标题二' for p in passages[1:]))
+        self.assertEqual([p.index for p in passages], list(range(len(passages))))
+        self.assertEqual(''.join(p.text for p in passages[1:]).count('长'), 50)
+        self.assertTrue(passages[-1].text.endswith('短段。'))
+
+    def test_short_paragraphs_are_merged(self):
+        passages = split_passages('a.md', "第一段。\n\n第二段。\n\n第三段。", max_chars=10)
+        self.assertEqual([p.text for p in passages], ['第一段。\n\n第二段。', '第三段。'])
+
+    def test_heading_terms_are_indexed(self):
+        passage = split_passages('a.md', "## 推理延迟\n\n正文内容")[0]
+        self.assertIn('延迟', passage.tf)
+
+
+class BM25IndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = BM25Index()
+        for doc, text in DOCS.items():
+            self.index.add_document(doc, split_passages(doc, text))
+
+    def top_doc(self, query: str, **kwargs) -> str:
+        results = self.index.search(query, **kwargs)
+        self.assertTrue(results, query)
+        return results[0][1].doc
+
+    def test_mixed_cjk_and_latin_queries(self):
+        self.assertEqual(self.top_doc('推理延迟 KV cache'), 'latency.md')
+        self.assertEqual(self.top_doc('data parallelism 训练'), 'training.md')
+        self.assertEqual(self.top_doc('continuous batching 吞吐'), 'serving.md')
+
+    def test_scores_are_sorted_and_top_k(self):
+        results = self.index.search('推理 训练 部署', top_k=2)
+        self.assertEqual(len(results), 2)
+        self.assertGreaterEqual(results[0][0], results[1][0])
+
+    def test_doc_filter(self):
+        results = self.index.search('推理延迟', docs=['serving.md', 'training.md'])
+        self.assertTrue(all(p.doc != 'latency.md' for _, p in results))
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('quantum chromodynamics'), [])
+
+    def test_replace_and_remove_document(self):
+        passages = len(self.index)
+        self.index.add_document('latency.md', split_passages('latency.md', DOCS['latency.md']))
+        self.assertEqual(len(self.index), passages)
+
+        self.index.remove_document('latency.md')
+        self.assertNotIn('kv', self.index.postings)
+        self.assertTrue(all(p.doc != 'latency.md' for _, p in self.index.search('推理延迟 KV cache')))
+
+
+if __name__ == '__main__':
+    unittest.main()
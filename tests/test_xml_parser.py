@@ -0,0 +1,50 @@
+"""标签解析的测试"""
+
+import unittest
+from processors.xml_parser import IncrementalTagScanner, extract_xml_tags
+
+
+def feed_all(scanner: IncrementalTagScanner, chunks):
+    """依次输入片段，返回每次输入产出的结果"""
+    return [scanner.feed(chunk) for chunk in chunks]
+
+
+class IncrementalTagScannerTest(unittest.TestCase):
+
+    def test_tag_split_across_chunks(self):
+        scanner = IncrementalTagScanner(['quick_search'])
+        results = feed_all(scanner, ['<planning>搜索</planning>\n<quick_se', 'arch>LLM 延', '迟</quick', '_search', '> 之后'])
+        self.assertEqual(results, [[], [], [], [], [('quick_search', 'LLM 延迟')]])
+
+    def test_every_split_point(self):
+        text = "前言 <webpage_read>https://a.example/1</webpage_read> 中间 <webpage_read>https://a.example/2</webpage_read>"
+        for i in range(1, len(text)):
+            scanner = IncrementalTagScanner(['webpage_read'])
+            found = [item for batch in feed_all(scanner, [text[:i], text[i:]]) for item in batch]
+            self.assertEqual(found, [('webpage_read', 'https://a.example/1'), ('webpage_read', 'https://a.example/2')],
+                             f"split at {i}")
+
+    def test_single_character_chunks_match_full_parse(self):
+        text = "<planning>计划</planning><quick_search>a, b</quick_search><quick_search>c</quick_search>"
+        scanner = IncrementalTagScanner(['quick_search'])
+        found = [item for batch in feed_all(scanner, list(text)) for item in batch]
+        self.assertEqual([content for _, content in found], extract_xml_tags(text)['quick_search'])
+
+    def test_unwatched_and_escaped_tags_are_ignored(self):
+        scanner = IncrementalTagScanner(['quick_search'])
+        found = scanner.feed("<todo_list>x</todo_list> `<quick_search>` 示例 <quick_search>真实查询</quick_search>")
+        self.assertEqual(found, [('quick_search', '真实查询')])
+
+    def test_tags_inside_report_are_ignored(self):
+        scanner = IncrementalTagScanner(['quick_search'])
+        results = feed_all(scanner, ["<report>\n<quick_search>报告中的示例</quick", "_search>\n</report>",
+                                     "<quick_search>报告后</quick_search>"])
+        self.assertEqual(results, [[], [], [('quick_search', '报告后')]])
+
+    def test_empty_content_is_skipped(self):
+        scanner = IncrementalTagScanner(['quick_search'])
+        self.assertEqual(scanner.feed("<quick_search>  </quick_search>"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""本地缓存存储模块
+
+基于 SQLite 的键值缓存，支持过期时间（TTL）、按条目数的 LRU 淘汰和命中统计
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+# 默认缓存目录：项目根目录下的 cache/，可通过环境变量 CACHE_DIR 指定其他位置
+DEFAULT_CACHE_DIR = os.getenv('CACHE_DIR') or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+
+
+class SQLiteCache:
+    """SQLite 键值缓存，多个线程共享同一连接"""
+
+    def __init__(self, path: str, table: str = 'cache', ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        """初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径
+            table: 表名，同一数据库文件可容纳多个缓存
+            ttl: 条目有效期（秒），None 表示永不过期
+            max_entries: 最大条目数，超过时淘汰最久未访问的条目，None 表示不限制
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)')
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str, allow_expired: bool = False) -> Optional[str]:
+        """读取缓存条目
+
+        Args:
+            key: 缓存键
+            allow_expired: 是否返回已过期的条目（用于条件请求的重新验证）
+
+        Returns:
+            Optional[str]: 命中时返回缓存值，未命中或已过期返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT value, created_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (self._is_expired(row[1], now) and not allow_expired):
+                self.misses += 1
+                return None
+            self._conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+
+    def is_fresh(self, key: str) -> bool:
+        """判断条目是否存在且未过期，不计入命中统计"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT created_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+        return row is not None and not self._is_expired(row[0], time.time())
+
+    def set(self, key: str, value: str):
+        """写入缓存条目，并在超出条目上限时淘汰最久未访问的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    f'DELETE FROM {self.table} WHERE key IN ('
+                    f'SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+
+    def touch(self, key: str):
+        """将条目的创建时间刷新为当前时间（重新验证成功后使用）"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE {self.table} SET created_at = ?, accessed_at = ? WHERE key = ?', (now, now, key)
+            )
+
+    def delete(self, key: str):
+        """删除缓存条目"""
+        with self._lock:
+            self._conn.execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def purge_expired(self) -> int:
+        """清理所有过期条目
+
+        Returns:
+            int: 清理的条目数
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                f'DELETE FROM {self.table} WHERE created_at < ?', (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中统计和当前条目数"""
+        with self._lock:
+            size = self._conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
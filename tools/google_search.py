@@ -1,13 +1,22 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
-import requests
 from dotenv import load_dotenv
+from tools.http_client import request, run_sync
+from tools.search_cache import SearchCache, get_search_cache
+from tools.tracing import KIND_TOOL, span
 
 class GoogleSearch:
     """Google搜索工具"""
     
-    def __init__(self, api_key: str | None = None, custom_search_id: str | None = None):
-        """初始化Google搜索工具"""
+    def __init__(self, api_key: str | None = None, custom_search_id: str | None = None,
+                 cache: Optional[SearchCache] = None):
+        """初始化Google搜索工具
+        
+        Args:
+            api_key: Google API 密钥，不提供则从环境变量获取
+            custom_search_id: 自定义搜索引擎ID，不提供则从环境变量获取
+            cache: 搜索结果缓存，不提供则使用进程共享的默认缓存
+        """
         if not api_key or not custom_search_id:
             load_dotenv()
             api_key = os.getenv('GOOGLE_API_KEY')
@@ -18,15 +27,31 @@ class GoogleSearch:
         
         self.api_key: str = api_key  # type: ignore
         self.custom_search_id: str = custom_search_id  # type: ignore
-        self.base_url = "https://www.googleapis.com/customsearch/v1"
+        self.base_url = os.getenv('GOOGLE_SEARCH_BASE_URL', "https://www.googleapis.com/customsearch/v1")
+        self.cache = cache or get_search_cache()
 
-    def search(self, query: str, num_results: int = 10) -> dict:
+    def search(self, query: str, num_results: int = 10, bypass_cache: bool = False) -> dict:
         """
-        执行搜索并返回结果
+        执行搜索并返回结果（同步接口，内部调用 async_search）
         
         Args:
             query: 搜索查询字符串
             num_results: 需要返回的结果数量
+            bypass_cache: 是否跳过缓存直接请求
+            
+        Returns:
+            dict: 包含搜索结果的字典
+        """
+        return run_sync(self.async_search(query, num_results, bypass_cache))
+
+    async def async_search(self, query: str, num_results: int = 10, bypass_cache: bool = False) -> dict:
+        """
+        异步执行搜索并返回结果，优先读取本地缓存
+        
+        Args:
+            query: 搜索查询字符串
+            num_results: 需要返回的结果数量
+            bypass_cache: 是否跳过缓存直接请求（结果仍会写入缓存）
             
         Returns:
             dict: 包含搜索结果的字典
@@ -34,8 +59,23 @@ class GoogleSearch:
         if not query.strip():
             return {"status": "error", "message": "搜索查询不能为空"}
         
+        with span('google_search', KIND_TOOL, query=query) as search_span:
+            if self.cache and not bypass_cache:
+                cached = self.cache.get(query, num_results)
+                if cached is not None:
+                    search_span.set(cache_hit=True, results=len(cached.get("results", [])))
+                    return cached
+            
+            result = await self._search_remote(query, num_results)
+            search_span.set(cache_hit=False, status=result.get("status"), results=len(result.get("results", [])))
+            if self.cache:
+                self.cache.set(query, num_results, result)
+            return result
+
+    async def _search_remote(self, query: str, num_results: int) -> dict:
+        """请求搜索接口并整理结果格式"""
         try:
-            search_results = self._execute_search(query, num_results)
+            search_results = await self._execute_search(query, num_results)
             if not search_results:
                 return {
                     "status": "error",
@@ -66,7 +106,7 @@ class GoogleSearch:
                 "query": query
             }
 
-    def _execute_search(self, query: str, num_results: int = 10) -> List[Dict]:
+    async def _execute_search(self, query: str, num_results: int = 10) -> List[Dict]:
         """执行Google搜索"""
         params = {
             'key': self.api_key,
@@ -76,7 +116,7 @@ class GoogleSearch:
         }
         
         try:
-            response = requests.get(self.base_url, params=params)
+            response = await request('GET', self.base_url, params=params)
             response.raise_for_status()
             results = response.json()
             
@@ -0,0 +1,152 @@
+"""HTTP客户端模块
+
+为各工具提供共享的异步HTTP会话（连接复用、DNS缓存、单站点连接数限制），
+并提供在同步代码中调用异步请求的包装函数。发往已登记接口的请求经过限流器，
+遇到 429/5xx 时按 Retry-After 或指数退避自动重试
+"""
+
+import os
+import json
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, Mapping, Optional, TypeVar
+import aiohttp
+from multidict import CIMultiDict
+from tools.rate_limiter import RETRYABLE_STATUS, limiter_for_url
+
+T = TypeVar('T')
+
+# 每个事件循环对应一个共享会话，aiohttp 会话不能跨事件循环使用
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+
+class HttpError(Exception):
+    """HTTP请求返回错误状态码"""
+
+    def __init__(self, status: int, url: str, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+        self.headers = headers if headers is not None else CIMultiDict()
+
+
+@dataclass
+class HttpResponse:
+    """已读取完整响应体的HTTP响应"""
+
+    status: int
+    url: str
+    text: str
+    # 响应头名称不区分大小写
+    headers: CIMultiDict = field(default_factory=CIMultiDict)
+
+    def json(self) -> Any:
+        """将响应体解析为JSON"""
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """状态码为4xx/5xx时抛出 HttpError"""
+        if self.status >= 400:
+            raise HttpError(self.status, self.url, self.headers)
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """按环境变量配置创建带连接池的会话"""
+    connector = aiohttp.TCPConnector(
+        limit=int(os.getenv('HTTP_MAX_CONNECTIONS', '100')),
+        limit_per_host=int(os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST', '10')),
+        ttl_dns_cache=int(os.getenv('HTTP_DNS_CACHE_TTL', '300')),
+        keepalive_timeout=float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '30')),
+    )
+    timeout = aiohttp.ClientTimeout(total=float(os.getenv('HTTP_TIMEOUT', '60')))
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """获取当前事件循环的共享会话，不存在或已关闭时新建"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = _create_session()
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session():
+    """关闭当前事件循环的共享会话"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+async def request(method: str, url: str, *, params: Optional[Dict] = None,
+                  headers: Optional[Dict[str, str]] = None, json_data: Any = None,
+                  data: Any = None, timeout: Optional[float] = None) -> HttpResponse:
+    """通过共享会话发送请求并读取完整响应体
+
+    Args:
+        method: 请求方法
+        url: 请求地址
+        params: 查询参数
+        headers: 请求头
+        json_data: 以JSON格式发送的请求体
+        data: 原始请求体
+        timeout: 本次请求的总超时时间（秒），不提供则使用会话默认值
+
+    Returns:
+        HttpResponse: 响应状态、响应头和文本内容
+    """
+    session = get_http_session()
+    request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    limiter = limiter_for_url(url)
+    if limiter is None:
+        return await _send(session, method, url, params=params, headers=headers, json_data=json_data,
+                           data=data, timeout=request_timeout)
+
+    max_retries = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))
+    for attempt in range(max_retries + 1):
+        async with limiter.limit():
+            response = await _send(session, method, url, params=params, headers=headers,
+                                   json_data=json_data, data=data, timeout=request_timeout)
+        retry_after = limiter.record(response.status, response.headers)
+        if response.status not in RETRYABLE_STATUS or attempt == max_retries:
+            return response
+        # Retry-After 的等待已由限流器统一执行，这里只补充指数退避
+        if retry_after is None:
+            await asyncio.sleep(min(2 ** attempt, 30))
+    return response
+
+
+async def _send(session: aiohttp.ClientSession, method: str, url: str, *, params, headers,
+                json_data, data, timeout) -> HttpResponse:
+    async with session.request(method, url, params=params, headers=headers, json=json_data,
+                               data=data, timeout=timeout) as resp:
+        text = await resp.text()
+        return HttpResponse(status=resp.status, url=str(resp.url), text=text, headers=CIMultiDict(resp.headers))
+
+
+async def _run_and_close(coro: Awaitable[T]) -> T:
+    try:
+        return await coro
+    finally:
+        await close_http_session()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """在同步代码中运行异步请求，用于保留工具原有的同步接口
+
+    Args:
+        coro: 需要运行的协程
+
+    Returns:
+        协程的返回值
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_run_and_close(coro))
+    # 当前线程已有运行中的事件循环，放到独立线程的新事件循环中执行
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _run_and_close(coro)).result()
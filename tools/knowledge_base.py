@@ -0,0 +1,181 @@
+"""跨任务知识库模块
+
+将各任务产出的报告、读取过的网页正文和搜索结果摘要按内容哈希去重后存入本地 SQLite，
+并在内存中建立 BM25 段落索引，供搜索代理在发起新的搜索和网页读取前查询
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+from tools.cache_store import DEFAULT_CACHE_DIR
+from processors.text_search import BM25Index, Passage, split_passages
+
+# 知识条目类型
+KIND_REPORT = 'report'
+KIND_PAGE = 'page'
+KIND_SNIPPET = 'snippet'
+
+
+def content_hash(content: str) -> str:
+    """按规范化后的内容计算哈希，忽略全半角和空白差异"""
+    normalized = ' '.join(unicodedata.normalize('NFKC', content).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class KnowledgeBase:
+    """跨任务知识库，多个线程共享同一连接"""
+
+    def __init__(self, path: Optional[str] = None, min_chars: Optional[int] = None):
+        """初始化知识库
+
+        Args:
+            path: SQLite 文件路径，默认 cache/knowledge_base.sqlite
+            min_chars: 入库内容的最少字符数，默认读取环境变量 KNOWLEDGE_BASE_MIN_CHARS
+        """
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, 'knowledge_base.sqlite')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.min_chars = min_chars or int(os.getenv('KNOWLEDGE_BASE_MIN_CHARS', '200'))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'hash TEXT PRIMARY KEY, kind TEXT NOT NULL, source TEXT NOT NULL, title TEXT, '
+            'task_id TEXT, created_at REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS passages ('
+            'hash TEXT NOT NULL, idx INTEGER NOT NULL, heading TEXT, text TEXT NOT NULL, '
+            'tf TEXT NOT NULL, length INTEGER NOT NULL, PRIMARY KEY (hash, idx))'
+        )
+        # 检索索引在首次查询时从数据库加载
+        self._index: Optional[BM25Index] = None
+        self._meta: Dict[str, Dict] = {}
+
+    def _load_index(self):
+        index = BM25Index()
+        meta = {}
+        rows = self._conn.execute('SELECT hash, kind, source, title, task_id FROM entries').fetchall()
+        for entry_hash, kind, source, title, task_id in rows:
+            meta[entry_hash] = {"kind": kind, "source": source, "title": title, "task_id": task_id}
+        passages: Dict[str, List[Passage]] = {}
+        for entry_hash, idx, heading, text, tf, length in self._conn.execute(
+                'SELECT hash, idx, heading, text, tf, length FROM passages ORDER BY hash, idx'):
+            passages.setdefault(entry_hash, []).append(
+                Passage(doc=entry_hash, index=idx, heading=heading or '', text=text,
+                        tf=json.loads(tf), length=length))
+        for entry_hash, items in passages.items():
+            index.add_document(entry_hash, items)
+        self._index, self._meta = index, meta
+
+    def add(self, kind: str, source: str, content: str, title: str = '',
+            task_id: Optional[str] = None) -> bool:
+        """加入一条知识，内容相同的条目只保存一次
+
+        Args:
+            kind: 条目类型，report、page 或 snippet
+            source: 来源，如报告路径、网页链接或搜索关键词
+            content: 正文
+            title: 可选的标题
+            task_id: 产生该条目的任务ID
+
+        Returns:
+            bool: 是否为新加入的条目
+        """
+        if not content or len(content.strip()) < self.min_chars:
+            return False
+        entry_hash = content_hash(content)
+        passages = split_passages(entry_hash, content)
+        with self._lock:
+            exists = self._conn.execute('SELECT 1 FROM entries WHERE hash = ?', (entry_hash,)).fetchone()
+            if exists:
+                return False
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.execute(
+                    'INSERT INTO entries (hash, kind, source, title, task_id, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (entry_hash, kind, source, title, task_id, time.time())
+                )
+                self._conn.executemany(
+                    'INSERT INTO passages (hash, idx, heading, text, tf, length) VALUES (?, ?, ?, ?, ?, ?)',
+                    [(entry_hash, p.index, p.heading, p.text, json.dumps(p.tf, ensure_ascii=False), p.length)
+                     for p in passages]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            if self._index is not None:
+                self._index.add_document(entry_hash, passages)
+                self._meta[entry_hash] = {"kind": kind, "source": source, "title": title, "task_id": task_id}
+        return True
+
+    def add_search_results(self, result: Dict, task_id: Optional[str] = None) -> bool:
+        """将一次成功的搜索结果摘要作为一条知识加入"""
+        if result.get("status") != "success" or not result.get("results"):
+            return False
+        lines = [f"- {item.get('title', '')}: {item.get('snippet', '')} ({item.get('link', '')})"
+                 for item in result["results"]]
+        return self.add(KIND_SNIPPET, result.get("query", ""), "\n".join(lines),
+                        title=result.get("query", ""), task_id=task_id)
+
+    def lookup(self, query: str, top_k: Optional[int] = None) -> List[Dict]:
+        """检索与查询最相关的知识段落
+
+        Args:
+            query: 查询文本
+            top_k: 返回的段落数，默认读取环境变量 KNOWLEDGE_BASE_TOP_K
+
+        Returns:
+            List[Dict]: 按得分从高到低排列的段落，包含 score、kind、source、title、task_id、heading 和 text
+        """
+        top_k = top_k or int(os.getenv('KNOWLEDGE_BASE_TOP_K', '5'))
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            ranked = self._index.search(query, top_k)
+            return [dict(self._meta.get(passage.doc, {}), score=score, heading=passage.heading, text=passage.text)
+                    for score, passage in ranked]
+
+    def stats(self) -> Dict[str, int]:
+        """返回各类型条目数"""
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, COUNT(*) FROM entries GROUP BY kind').fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def format_lookup_results(query: str, results: List[Dict]) -> str:
+    """将知识库检索结果格式化为添加到对话历史的文本"""
+    if not results:
+        return f"Knowledge Base Results for '{query}':\n知识库中没有相关内容"
+    lines = [f"Knowledge Base Results for '{query}':"]
+    for rank, item in enumerate(results, 1):
+        location = f"[{item.get('kind')}] {item.get('source')}"
+        if item.get('heading'):
+            location += f" > {item['heading']}"
+        if item.get('task_id'):
+            location += f" (任务 {item['task_id']})"
+        lines.append(f"[{rank}] {location} (score={item['score']:.2f})\n{item['text']}")
+    return "\n\n".join(lines)
+
+
+_default_knowledge_base: Optional[KnowledgeBase] = None
+
+
+def get_knowledge_base() -> Optional[KnowledgeBase]:
+    """获取进程共享的默认知识库，环境变量 KNOWLEDGE_BASE_ENABLED=0 时返回 None"""
+    global _default_knowledge_base
+    if os.getenv('KNOWLEDGE_BASE_ENABLED', '1') == '0':
+        return None
+    if _default_knowledge_base is None:
+        _default_knowledge_base = KnowledgeBase()
+    return _default_knowledge_base
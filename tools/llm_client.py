@@ -0,0 +1,107 @@
+"""LLM客户端注册模块
+
+按 base_url 和 API 密钥在进程内复用 AsyncOpenAI 客户端，
+所有客户端共享同一个 HTTP 连接池，避免每个代理、处理器重复建立连接。
+连接池的传输层接入接口限流器，429/5xx 的重试由 openai 客户端自身完成。
+openai 和 httpx 在首次创建客户端时才导入，避免拖慢不调用模型的代码路径的启动
+"""
+
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from tools.tracing import KIND_LLM, span
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+# Gemini 的 OpenAI 兼容接口地址，可通过环境变量 GEMINI_BASE_URL 覆盖
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+_clients: Dict[Tuple[str, str], "AsyncOpenAI"] = {}
+_http_client: Optional["httpx.AsyncClient"] = None
+
+
+def _get_http_client() -> "httpx.AsyncClient":
+    """获取共享的 HTTP 连接池，连接数和保活时间可通过环境变量配置"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        import httpx
+        from tools.llm_transport import RateLimitedTransport
+
+        limits = httpx.Limits(
+            max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '50')),
+            max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20')),
+            keepalive_expiry=float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60')),
+        )
+        transport = RateLimitedTransport(httpx.AsyncHTTPTransport(limits=limits))
+        _http_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(600.0, connect=10.0))
+    return _http_client
+
+
+def get_llm_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> "AsyncOpenAI":
+    """获取共享的 AsyncOpenAI 客户端
+
+    Args:
+        api_key: API 密钥，不提供则使用环境变量 GEMINI_API_KEY
+        base_url: 接口地址，默认读取环境变量 GEMINI_BASE_URL，未设置时使用 Gemini 的 OpenAI 兼容接口
+
+    Returns:
+        AsyncOpenAI: 相同 base_url 和密钥对应同一个客户端实例
+    """
+    api_key = api_key or os.getenv('GEMINI_API_KEY') or ''
+    base_url = base_url or os.getenv('GEMINI_BASE_URL') or GEMINI_BASE_URL
+    key = (base_url, api_key)
+    client = _clients.get(key)
+    if client is None:
+        from openai import AsyncOpenAI
+
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=_get_http_client(),
+                             max_retries=int(os.getenv('LLM_MAX_RETRIES', '4')))
+        _clients[key] = client
+    return client
+
+
+def prompt_cache_kwargs(prompt_name: str) -> Dict:
+    """显式前缀缓存参数
+
+    环境变量 LLM_PROMPT_CACHE=1 时，以提示词名称和内容哈希作为 prompt_cache_key 发送，
+    让支持该参数的 OpenAI 兼容接口把同一静态提示词的请求路由到同一缓存；
+    不支持该参数的接口（包括 Gemini，其前缀缓存是隐式的）应保持关闭
+
+    Returns:
+        Dict: 透传给 chat.completions.create 的参数
+    """
+    if os.getenv('LLM_PROMPT_CACHE', '0') != '1':
+        return {}
+    from config.prompts import prompt_hash
+
+    return {"extra_body": {"prompt_cache_key": f"{prompt_name}-{prompt_hash(prompt_name)}"}}
+
+
+async def traced_completion(client: "AsyncOpenAI", span_name: str, **kwargs) -> Any:
+    """非流式调用 chat.completions.create，调用过程记录为 llm 类型的 span
+
+    Args:
+        client: AsyncOpenAI 客户端
+        span_name: span 名称，如 llm.web_content
+        **kwargs: 透传给 chat.completions.create 的参数
+
+    Returns:
+        chat.completions.create 的返回值
+    """
+    model = kwargs.get('model', '')
+    with span(span_name, KIND_LLM, messages=len(kwargs.get('messages') or [])) as llm_span:
+        response = await client.chat.completions.create(**kwargs)
+        llm_span.record_usage(model, getattr(response, 'usage', None))
+        if response.choices:
+            llm_span.set(output_chars=len(response.choices[0].message.content or ''))
+        return response
+
+
+async def close_llm_clients():
+    """关闭共享连接池并清空客户端注册表"""
+    global _http_client
+    _clients.clear()
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
@@ -0,0 +1,53 @@
+"""LLM 连接池传输层
+
+在 httpx 传输层接入接口限流器，供 tools.llm_client 在创建共享连接池时使用
+"""
+
+from typing import Callable
+import httpx
+from tools.rate_limiter import estimate_tokens, limiter_for_url
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读取完毕或关闭时归还限流器的并发名额，流式输出期间持续占用名额"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """按请求地址接入限流器的传输层，TPM 按请求体大小估算"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        limiter = limiter_for_url(str(request.url))
+        if limiter is None:
+            return await self._transport.handle_async_request(request)
+        await limiter.acquire(tokens=estimate_tokens(request.content))
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.record(response.status_code, response.headers)
+        return httpx.Response(status_code=response.status_code, headers=response.headers,
+                              stream=_ReleasingStream(response.stream, limiter.release),
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,108 @@
+"""网页缓存模块
+
+两级缓存：
+- 原始页面：以规范化URL为键，保存页面内容和 ETag/Last-Modified，过期后通过条件请求重新验证
+- 清理结果：以原始内容和清理提示词版本的哈希为键，保存 LLM 清理后的正文
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from tools.cache_store import SQLiteCache, DEFAULT_CACHE_DIR
+
+# 规范化URL时移除的跟踪参数前缀
+TRACKING_PARAM_PREFIXES = ('utm_', 'spm', 'fbclid', 'gclid')
+
+
+def canonicalize_url(url: str) -> str:
+    """规范化URL：统一协议和域名大小写，移除默认端口、锚点和跟踪参数，并排序查询参数"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class PageCache:
+    """网页原始内容与清理结果的两级缓存"""
+
+    def __init__(self, path: Optional[str] = None, raw_ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        """初始化网页缓存
+
+        Args:
+            path: SQLite 文件路径，默认 cache/page_cache.sqlite
+            raw_ttl: 原始页面的有效期（秒），过期后需重新验证，默认读取环境变量 PAGE_CACHE_TTL
+            max_entries: 每一级缓存的最大条目数，默认读取环境变量 PAGE_CACHE_MAX_ENTRIES
+        """
+        path = path or os.path.join(DEFAULT_CACHE_DIR, 'page_cache.sqlite')
+        max_entries = max_entries or int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '2000'))
+        self.raw = SQLiteCache(path, table='raw_pages',
+                               ttl=raw_ttl if raw_ttl is not None else float(os.getenv('PAGE_CACHE_TTL', '3600')),
+                               max_entries=max_entries)
+        # 清理结果以内容哈希为键，内容不变即可复用，不设置过期时间
+        self.cleaned = SQLiteCache(path, table='cleaned_pages', max_entries=max_entries)
+
+    def get_raw(self, url: str) -> Optional[Dict]:
+        """读取原始页面缓存
+
+        Returns:
+            Optional[Dict]: 包含 body、etag、last_modified 和 fresh（是否仍在有效期内）的字典，未命中返回 None
+        """
+        key = canonicalize_url(url)
+        fresh = self.raw.is_fresh(key)
+        value = self.raw.get(key, allow_expired=True)
+        if value is None:
+            return None
+        entry = json.loads(value)
+        entry["fresh"] = fresh
+        return entry
+
+    def set_raw(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """写入原始页面缓存"""
+        self.raw.set(canonicalize_url(url), json.dumps(
+            {"body": body, "etag": etag, "last_modified": last_modified}, ensure_ascii=False
+        ))
+
+    def mark_revalidated(self, url: str):
+        """条件请求返回 304 后刷新原始页面的有效期"""
+        self.raw.touch(canonicalize_url(url))
+
+    @staticmethod
+    def _cleaned_key(raw_content: str, prompt_version: str) -> str:
+        return hashlib.sha256(f"{prompt_version}\n{raw_content}".encode('utf-8')).hexdigest()
+
+    def get_cleaned(self, raw_content: str, prompt_version: str) -> Optional[str]:
+        """读取清理结果缓存，未命中返回 None"""
+        return self.cleaned.get(self._cleaned_key(raw_content, prompt_version))
+
+    def set_cleaned(self, raw_content: str, prompt_version: str, cleaned_content: str):
+        """写入清理结果缓存"""
+        self.cleaned.set(self._cleaned_key(raw_content, prompt_version), cleaned_content)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """返回两级缓存的命中统计"""
+        return {"raw": self.raw.stats(), "cleaned": self.cleaned.stats()}
+
+
+_default_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """获取进程共享的默认网页缓存，环境变量 PAGE_CACHE_ENABLED=0 时返回 None"""
+    global _default_cache
+    if os.getenv('PAGE_CACHE_ENABLED', '1') == '0':
+        return None
+    if _default_cache is None:
+        _default_cache = PageCache()
+    return _default_cache
@@ -0,0 +1,280 @@
+"""接口限流模块
+
+为每个外部接口（Gemini、Google 自定义搜索、Jina Reader、Coze、智谱）维护一个进程共享的限流器：
+
+- 令牌桶限制每分钟请求数（RPM），LLM 接口额外按估算的 token 数限制每分钟 token 数（TPM）
+- AIMD 自适应并发：请求成功时并发上限缓慢回升，遇到 429/5xx 时减半
+- 响应带有 Retry-After 时，在指定时间之前暂停该接口的全部新请求
+
+限流器状态用线程锁保护，可同时服务于主事件循环和 run_sync 在独立线程中创建的事件循环。
+各接口的配置读取环境变量 RATE_LIMIT_<接口名>_RPM / _TPM / _CONCURRENCY，0 表示不限制；
+环境变量 RATE_LIMIT_HOSTS 可以把其他主机（如本地模拟服务）登记到已有接口上
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import AsyncIterator, Deque, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+# 接口默认配置: (每分钟请求数, 每分钟 token 数, 最大并发数)
+DEFAULT_LIMITS: Dict[str, Tuple[float, float, int]] = {
+    'gemini': (60, 0, 8),
+    'google_cse': (100, 0, 8),
+    'jina': (20, 0, 4),
+    'coze': (60, 0, 4),
+    'zhipu': (60, 0, 4),
+}
+
+# 请求主机到接口名的映射
+HOST_ENDPOINTS: Dict[str, str] = {
+    'generativelanguage.googleapis.com': 'gemini',
+    'www.googleapis.com': 'google_cse',
+    'r.jina.ai': 'jina',
+    'api.coze.com': 'coze',
+    'open.bigmodel.cn': 'zhipu',
+}
+
+# 触发并发收缩和重试的状态码
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式
+
+    Returns:
+        Optional[float]: 需要等待的秒数，响应头不存在或无法解析时返回 None
+    """
+    value = None
+    for key, item in headers.items():
+        if key.lower() == 'retry-after':
+            value = item.strip()
+            break
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """令牌桶，容量为一分钟的配额，按速率匀速补充"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """预留配额，返回需要等待的秒数；配额可以透支，透支部分由后续请求等待补足"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # 单次请求超过桶容量时按容量计，避免永远无法满足
+        self.tokens -= min(amount, self.capacity)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class EndpointLimiter:
+    """单个接口的限流器"""
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 0,
+                 min_concurrency: int = 1):
+        """初始化限流器
+
+        Args:
+            name: 接口名
+            rpm: 每分钟请求数，0 表示不限制
+            tpm: 每分钟 token 数，0 表示不限制
+            max_concurrency: 最大并发数，0 表示不限制并发且不做自适应调整
+            min_concurrency: 自适应收缩时的最小并发数
+        """
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min(min_concurrency, max_concurrency or 1))
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self.stats = {"requests": 0, "throttled": 0, "retry_after": 0}
+
+    def _has_capacity(self) -> bool:
+        return not self.max_concurrency or self.in_flight < int(self.concurrency)
+
+    def _wake_waiters(self):
+        """在持有锁时调用，按先后顺序把空出的并发名额交给等待者"""
+        while self._waiters and self._has_capacity():
+            # 已取消的等待者也分配名额，由其取消处理逻辑负责归还
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(_resolve, future)
+
+    async def _acquire_slot(self):
+        with self._lock:
+            if self._has_capacity() and not self._waiters:
+                self.in_flight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:
+                    # 名额已分配但等待被取消，归还名额
+                    self.in_flight -= 1
+                    self._wake_waiters()
+            raise
+
+    def _release_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_waiters()
+
+    async def _wait_for_quota(self, tokens: float):
+        """等待 Retry-After 暂停结束，并从令牌桶中预留本次请求的配额"""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._blocked_until - now)
+            if self._requests:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens and tokens:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            self.stats["requests"] += 1
+            if delay > 0:
+                self.stats["throttled"] += 1
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, status: int, headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """根据响应调整并发上限
+
+        Args:
+            status: 响应状态码
+            headers: 响应头
+
+        Returns:
+            Optional[float]: 响应中 Retry-After 指定的等待秒数
+        """
+        retry_after = parse_retry_after(headers or {})
+        with self._lock:
+            if status in RETRYABLE_STATUS:
+                if self.max_concurrency:
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                if retry_after is not None:
+                    self.stats["retry_after"] += 1
+                    self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            elif status < 400 and self.max_concurrency:
+                # 加性增长：每个并发窗口内全部成功约增加 1
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+                self._wake_waiters()
+        return retry_after
+
+    async def acquire(self, tokens: float = 0):
+        """占用一个并发名额并等待配额，完成后必须调用 release()
+
+        Args:
+            tokens: 本次请求估算的 token 数，用于 TPM 限制
+        """
+        await self._acquire_slot()
+        try:
+            await self._wait_for_quota(tokens)
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def release(self):
+        """归还并发名额"""
+        self._release_slot()
+
+    @asynccontextmanager
+    async def limit(self, tokens: float = 0) -> AsyncIterator["EndpointLimiter"]:
+        """在限流约束下执行一次请求"""
+        await self.acquire(tokens)
+        try:
+            yield self
+        finally:
+            self.release()
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+_limiters: Dict[str, EndpointLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limit_enabled() -> bool:
+    """是否启用接口限流，环境变量 RATE_LIMIT_ENABLED=0 时关闭"""
+    return os.getenv('RATE_LIMIT_ENABLED', '1') != '0'
+
+
+def get_limiter(name: str) -> EndpointLimiter:
+    """获取接口的共享限流器，首次获取时按环境变量创建"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rpm, tpm, concurrency = DEFAULT_LIMITS.get(name, (0, 0, 0))
+            prefix = f'RATE_LIMIT_{name.upper()}'
+            limiter = EndpointLimiter(
+                name,
+                rpm=float(os.getenv(f'{prefix}_RPM', str(rpm))),
+                tpm=float(os.getenv(f'{prefix}_TPM', str(tpm))),
+                max_concurrency=int(os.getenv(f'{prefix}_CONCURRENCY', str(concurrency))),
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+@lru_cache(maxsize=8)
+def _parse_host_overrides(value: str) -> Dict[str, str]:
+    overrides = {}
+    for item in value.split(','):
+        host, sep, name = item.partition('=')
+        if sep and host.strip() and name.strip():
+            overrides[host.strip().lower()] = name.strip()
+    return overrides
+
+
+def host_endpoints() -> Dict[str, str]:
+    """主机到接口名的映射
+
+    在 HOST_ENDPOINTS 的基础上合并环境变量 RATE_LIMIT_HOSTS，格式为 主机[:端口]=接口名，多项以逗号分隔，
+    如 127.0.0.1:18081=gemini,127.0.0.1:18082=google_cse
+    """
+    overrides = _parse_host_overrides(os.getenv('RATE_LIMIT_HOSTS', ''))
+    return {**HOST_ENDPOINTS, **overrides} if overrides else HOST_ENDPOINTS
+
+
+def limiter_for_url(url: str) -> Optional[EndpointLimiter]:
+    """按请求地址的主机名（优先匹配 主机:端口）查找限流器，未登记的主机或限流关闭时返回 None"""
+    if not rate_limit_enabled():
+        return None
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    endpoints = host_endpoints()
+    name = (endpoints.get(f'{host}:{parts.port}') if parts.port else None) or endpoints.get(host)
+    return get_limiter(name) if name else None
+
+
+def estimate_tokens(payload: bytes) -> int:
+    """按请求体字节数粗略估算 token 数（中英文混合约 3 字节一个 token）"""
+    return len(payload) // 3
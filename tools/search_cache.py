@@ -0,0 +1,84 @@
+"""搜索结果缓存模块
+
+以规范化查询和结果数量的哈希为键，在本地持久化缓存搜索结果
+"""
+
+import os
+import json
+import hashlib
+import unicodedata
+from typing import Dict, Optional
+from tools.cache_store import SQLiteCache, DEFAULT_CACHE_DIR
+
+
+def normalize_query(query: str) -> str:
+    """规范化搜索查询：统一全半角、大小写，合并多余空白"""
+    query = unicodedata.normalize('NFKC', query)
+    return ' '.join(query.casefold().split())
+
+
+class SearchCache:
+    """搜索结果缓存，只缓存成功的搜索结果"""
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        """初始化搜索结果缓存
+
+        Args:
+            path: SQLite 文件路径，默认 cache/search_cache.sqlite
+            ttl: 缓存有效期（秒），默认读取环境变量 SEARCH_CACHE_TTL
+            max_entries: 最大条目数，默认读取环境变量 SEARCH_CACHE_MAX_ENTRIES
+        """
+        self.store = SQLiteCache(
+            path or os.path.join(DEFAULT_CACHE_DIR, 'search_cache.sqlite'),
+            table='search_results',
+            ttl=ttl if ttl is not None else float(os.getenv('SEARCH_CACHE_TTL', '86400')),
+            max_entries=max_entries or int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', '5000')),
+        )
+
+    @staticmethod
+    def make_key(query: str, num_results: int) -> str:
+        """根据规范化查询和结果数量生成缓存键"""
+        raw = f"{normalize_query(query)}\n{num_results}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, query: str, num_results: int) -> Optional[Dict]:
+        """读取缓存的搜索结果，未命中返回 None"""
+        value = self.store.get(self.make_key(query, num_results))
+        if value is None:
+            return None
+        result = json.loads(value)
+        # 返回调用方本次的原始查询，保持结果格式不变
+        result["query"] = query
+        return result
+
+    def set(self, query: str, num_results: int, result: Dict):
+        """写入搜索结果，仅缓存状态为 success 的结果"""
+        if result.get("status") != "success":
+            return
+        self.store.set(self.make_key(query, num_results), json.dumps(result, ensure_ascii=False))
+
+    @property
+    def hits(self) -> int:
+        return self.store.hits
+
+    @property
+    def misses(self) -> int:
+        return self.store.misses
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中统计和当前条目数"""
+        return self.store.stats()
+
+
+_default_cache: Optional[SearchCache] = None
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """获取进程共享的默认搜索缓存，环境变量 SEARCH_CACHE_ENABLED=0 时返回 None"""
+    global _default_cache
+    if os.getenv('SEARCH_CACHE_ENABLED', '1') == '0':
+        return None
+    if _default_cache is None:
+        _default_cache = SearchCache()
+    return _default_cache
@@ -0,0 +1,81 @@
+"""搜索执行模块
+
+负责将一次模型响应中的多个快速搜索关键词并发分发给搜索工具，
+并按原始关键词顺序返回结果
+"""
+
+import os
+import asyncio
+from typing import Dict, List, Optional
+from tools.google_search import GoogleSearch
+
+
+def split_search_queries(query_strs: List[str]) -> List[str]:
+    """将 quick_search 标签内容按逗号拆分为关键词列表
+
+    Args:
+        query_strs: quick_search 标签内容列表
+
+    Returns:
+        List[str]: 去除空白后的关键词列表，保持原始顺序
+    """
+    queries = []
+    for query_str in query_strs:
+        # 将搜索关键词按逗号分隔并去除空格
+        queries.extend(q.strip() for q in query_str.split(',') if q.strip())
+    return queries
+
+
+class SearchExecutor:
+    """异步搜索执行器，限制并发数量并为每个查询设置超时"""
+
+    def __init__(self, google_search: Optional[GoogleSearch] = None,
+                 max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """初始化搜索执行器
+
+        Args:
+            google_search: 搜索工具实例，不提供则新建
+            max_concurrency: 最大并发查询数，默认读取环境变量 QUICK_SEARCH_CONCURRENCY
+            timeout: 单个查询的超时时间（秒），默认读取环境变量 QUICK_SEARCH_TIMEOUT
+        """
+        self.google_search = google_search or GoogleSearch()
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('QUICK_SEARCH_CONCURRENCY', '8')))
+        self.timeout = timeout or float(os.getenv('QUICK_SEARCH_TIMEOUT', '20'))
+        # 同一执行器的所有查询共享并发名额
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def search_many(self, queries: List[str]) -> List[Dict]:
+        """并发执行多个搜索查询
+
+        Args:
+            queries: 搜索关键词列表
+
+        Returns:
+            List[Dict]: 与 queries 顺序一致的结果列表，每项包含 query 和 result
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_one(query: str) -> Dict:
+            async with self._semaphore:
+                try:
+                    result = await asyncio.wait_for(
+                        self.google_search.async_search(query),
+                        timeout=self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    result = {
+                        "status": "error",
+                        "message": f"搜索超时（{self.timeout}秒）",
+                        "query": query
+                    }
+                except Exception as e:
+                    result = {
+                        "status": "error",
+                        "message": str(e),
+                        "query": query
+                    }
+                return {"query": query, "result": result}
+
+        return list(await asyncio.gather(*(run_one(q) for q in queries)))
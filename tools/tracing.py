@@ -0,0 +1,279 @@
+"""调用链追踪模块
+
+以父子关系的 span 记录一次任务中的调用链（主控轮次 -> 代理 -> 步骤 -> 工具调用 / 模型调用），
+每个 span 记录耗时、输入输出 token 数、缓存命中和估算费用，结束时以 JSONL 追加写入
+tasks/<任务ID>/logs/trace.jsonl，并可导出为 OpenTelemetry 的 OTLP/JSON 格式。
+
+当前 span 保存在 contextvars 中，asyncio 任务创建时会继承，因此并发执行的工具调用也能挂到正确的父 span 下；
+没有活动的追踪器时，span() 几乎没有开销。
+
+用法: python -m tools.tracing tasks/<任务ID>/logs/trace.jsonl [--otlp 输出文件]
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+# span 类型
+KIND_TURN = 'turn'
+KIND_AGENT = 'agent'
+KIND_STEP = 'step'
+KIND_TOOL = 'tool'
+KIND_LLM = 'llm'
+
+# 模型单价（美元 / 百万 token）: (输入, 缓存命中的输入, 输出)，仅用于估算费用
+MODEL_PRICES: Dict[str, tuple] = {
+    'gemini-2.0-flash': (0.10, 0.025, 0.40),
+    'gemini-2.0-flash-thinking-exp-01-21': (0.10, 0.025, 0.40),
+    'gemini-2.0-flash-lite': (0.075, 0.01875, 0.30),
+}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """按单价表估算一次模型调用的费用（美元），未登记的模型返回 0"""
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class Span:
+    """一次被追踪的调用"""
+
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    duration: float = 0.0
+    status: str = 'ok'
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        """设置属性，值为 None 的属性忽略"""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def record_usage(self, model: str, usage: Any):
+        """记录模型调用返回的 token 用量、缓存命中数和估算费用
+
+        Args:
+            model: 模型名称
+            usage: 接口返回的 usage 对象，可为 None
+        """
+        self.set(model=model)
+        if usage is None:
+            return
+        input_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+        output_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (getattr(details, 'cached_tokens', 0) or 0) if details else 0
+        self.set(input_tokens=input_tokens, output_tokens=output_tokens, cached_tokens=cached_tokens,
+                 cost_usd=round(estimate_cost(model, input_tokens, output_tokens, cached_tokens), 8))
+
+
+class _NoopSpan:
+    """没有活动的追踪器时返回的空 span"""
+
+    def set(self, **attributes):
+        pass
+
+    def record_usage(self, model: str, usage: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current: ContextVar[Optional[tuple]] = ContextVar('trace_current', default=None)
+
+
+class Tracer:
+    """单个任务的追踪器，span 结束时追加写入 JSONL 文件"""
+
+    def __init__(self, path: str):
+        """初始化追踪器
+
+        Args:
+            path: JSONL 文件路径，首次写入时创建所在目录
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _write(self, span: Span):
+        line = json.dumps(asdict(span), ensure_ascii=False, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    @contextmanager
+    def start_span(self, name: str, kind: str = KIND_TURN, **attributes) -> Iterator[Span]:
+        """开始一条新调用链的根 span，其中的 span() 调用都记录到该追踪器"""
+        root = Span(name=name, kind=kind, trace_id=uuid.uuid4().hex, span_id=uuid.uuid4().hex[:16])
+        root.set(**attributes)
+        with _activate(self, root):
+            yield root
+
+
+@contextmanager
+def _activate(tracer: Tracer, span: Span) -> Iterator[Span]:
+    token = _current.set((tracer, span))
+    clock = time.monotonic()
+    try:
+        yield span
+    except BaseException as e:
+        span.status = 'error'
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        span.duration = round(time.monotonic() - clock, 6)
+        span.end = span.start + span.duration
+        try:
+            tracer._write(span)
+        except OSError:
+            # 追踪数据写入失败不影响任务执行
+            pass
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes) -> Iterator[Any]:
+    """在当前 span 下开始一个子 span；没有活动的追踪器时返回空 span
+
+    Args:
+        name: span 名称，如 search_agent.step、google_search
+        kind: span 类型，turn / agent / step / tool / llm
+        **attributes: 初始属性
+    """
+    current = _current.get()
+    if current is None:
+        yield _NOOP_SPAN
+        return
+    tracer, parent = current
+    child = Span(name=name, kind=kind, trace_id=parent.trace_id, span_id=uuid.uuid4().hex[:16],
+                 parent_id=parent.span_id)
+    child.set(**attributes)
+    with _activate(tracer, child):
+        yield child
+
+
+@contextmanager
+def start_trace(tracer: Optional[Tracer], name: str, kind: str = KIND_TURN, **attributes) -> Iterator[Any]:
+    """以 tracer 开始一条新调用链，tracer 为 None 时返回空 span"""
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    with tracer.start_span(name, kind, **attributes) as root:
+        yield root
+
+
+def tracing_enabled() -> bool:
+    """是否启用追踪，环境变量 TRACING_ENABLED=0 时关闭"""
+    return os.getenv('TRACING_ENABLED', '1') != '0'
+
+
+def get_task_tracer(task_dir: str) -> Optional[Tracer]:
+    """获取任务的追踪器，追踪数据保存在任务目录的 logs/trace.jsonl，追踪关闭时返回 None"""
+    if not tracing_enabled():
+        return None
+    return Tracer(os.path.join(task_dir, 'logs', 'trace.jsonl'))
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """读取 JSONL 追踪文件，跳过损坏的行"""
+    spans = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """按 span 名称汇总调用次数、总耗时、token 数和估算费用"""
+    summary: Dict[str, Dict[str, float]] = {}
+    for item in spans:
+        attributes = item.get('attributes', {})
+        entry = summary.setdefault(item['name'], {
+            "count": 0, "duration": 0.0, "input_tokens": 0, "output_tokens": 0,
+            "cached_tokens": 0, "cost_usd": 0.0, "errors": 0,
+        })
+        entry["count"] += 1
+        entry["duration"] += item.get('duration', 0.0)
+        for key in ("input_tokens", "output_tokens", "cached_tokens", "cost_usd"):
+            entry[key] += attributes.get(key, 0) or 0
+        entry["errors"] += item.get('status') == 'error'
+    return summary
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)}
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str = 'deep-research-agent') -> Dict[str, Any]:
+    """将 span 转换为 OTLP/JSON 格式（ExportTraceServiceRequest），可直接发送给 OTLP/HTTP 收集器"""
+    otlp_spans = []
+    for item in spans:
+        attributes = dict(item.get('attributes', {}), **{"span.kind": item.get('kind', '')})
+        otlp_span = {
+            # OTLP 要求 trace_id 为 16 字节、span_id 为 8 字节的十六进制
+            "traceId": item['trace_id'],
+            "spanId": item['span_id'],
+            "name": item['name'],
+            "kind": 3 if item.get('kind') in (KIND_TOOL, KIND_LLM) else 1,  # CLIENT / INTERNAL
+            "startTimeUnixNano": str(int(item['start'] * 1e9)),
+            "endTimeUnixNano": str(int((item.get('end') or item['start']) * 1e9)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            "status": {"code": 2, "message": item.get('error') or ''} if item.get('status') == 'error' else {"code": 1},
+        }
+        if item.get('parent_id'):
+            otlp_span["parentSpanId"] = item['parent_id']
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": otlp_spans}],
+        }]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="汇总任务的追踪数据，或导出为 OTLP/JSON")
+    parser.add_argument('trace_file', help="tasks/<任务ID>/logs/trace.jsonl")
+    parser.add_argument('--otlp', metavar='PATH', help="导出 OTLP/JSON 到指定文件")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    if args.otlp:
+        with open(args.otlp, 'w', encoding='utf-8') as f:
+            json.dump(to_otlp(spans), f, ensure_ascii=False)
+        print(f"已导出 {len(spans)} 个 span 到 {args.otlp}")
+        return
+
+    print(f"{'名称':<32}{'次数':>6}{'总耗时(s)':>12}{'输入tokens':>12}{'输出tokens':>12}{'缓存tokens':>12}{'费用($)':>10}")
+    for name, entry in sorted(summarize(spans).items(), key=lambda x: -x[1]["duration"]):
+        print(f"{name:<32}{entry['count']:>6}{entry['duration']:>12.2f}{entry['input_tokens']:>12}"
+              f"{entry['output_tokens']:>12}{entry['cached_tokens']:>12}{entry['cost_usd']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+from urllib.parse import urlparse
 import asyncio
-import requests
 import re
-import requests
 from processors.web_content_processor import WebContentProcessor
+from tools.http_client import request
+from tools.page_cache import PageCache, get_page_cache
+from tools.tracing import KIND_TOOL, span
 import os
 from dotenv import load_dotenv
 
@@ -13,28 +15,101 @@ load_dotenv()
 class WebReader:
     """网页内容阅读工具"""
     
-    def __init__(self):
-        """初始化网页阅读工具"""
-        self.jina_base_url = "https://r.jina.ai/"
-        self.content_processor = WebContentProcessor()
+    def __init__(self, max_concurrency: Optional[int] = None,
+                 per_host_limit: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 page_cache: Optional[PageCache] = None):
+        """初始化网页阅读工具
+
+        Args:
+            max_concurrency: 全局并发读取上限，默认读取环境变量 WEBPAGE_READ_CONCURRENCY
+            per_host_limit: 单个站点的并发读取上限，默认读取环境变量 WEBPAGE_READ_PER_HOST
+            deadline: 批量读取的整体截止时间（秒），默认读取环境变量 WEBPAGE_READ_DEADLINE
+            page_cache: 网页缓存，不提供则使用进程共享的默认缓存
+        """
+        self.jina_base_url = os.getenv('JINA_READER_BASE_URL', "https://r.jina.ai/")
+        self.page_cache = page_cache or get_page_cache()
+        self.content_processor = WebContentProcessor(cache=self.page_cache)
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('WEBPAGE_READ_CONCURRENCY', '6')))
+        self.per_host_limit = max(1, per_host_limit or int(os.getenv('WEBPAGE_READ_PER_HOST', '2')))
+        self.deadline = deadline or float(os.getenv('WEBPAGE_READ_DEADLINE', '120'))
+        # 同一实例的所有读取共享并发名额
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
 
     async def read_pages(self, urls: List[str]) -> List[Dict]:
-        """批量读取多个网页的内容"""
-        tasks = [self._get_page_content(url) for url in urls]
-        contents = await asyncio.gather(*tasks)
-        
-        results = []
-        for url, content in zip(urls, contents):
-            results.append({
-                "url": url,
-                "content": content if content else "无法获取内容"
-            })
-        
-        return results
+        """批量读取多个网页的内容，结果按输入顺序返回"""
+        pages = {}
+        async for page in self.iter_pages(urls):
+            pages[page["url"]] = page
+        return [pages[url] for url in urls]
+
+    async def iter_pages(self, urls: List[str], deadline: Optional[float] = None,
+                         prefetched: Optional[Dict[str, asyncio.Future]] = None) -> AsyncIterator[Dict]:
+        """并发读取多个网页，每完成一个就立即产出结果
+
+        使用全局并发上限和单站点并发上限共同约束，超过截止时间仍未完成的读取会被取消，
+        并以超时结果产出。
+
+        Args:
+            urls: 网页链接列表，重复链接只读取一次
+            deadline: 整体截止时间（秒），不提供则使用初始化配置
+            prefetched: 已提前启动的读取任务（url -> read_page_limited 任务），直接复用
+
+        Yields:
+            Dict: 包含 url 和 content 的读取结果，按完成先后顺序产出
+        """
+        deadline = deadline or self.deadline
+        prefetched = prefetched or {}
+
+        tasks = {
+            (prefetched.get(url) or asyncio.ensure_future(self.read_page_limited(url))): url
+            for url in dict.fromkeys(urls)
+        }
+        pending = set(tasks)
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + deadline
+        try:
+            while pending:
+                remaining = end_time - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        yield task.result()
+                    except Exception as e:
+                        print(f"获取页面内容失败: {str(e)}")
+                        yield {"url": tasks[task], "content": "无法获取内容"}
+
+            # 取消超过截止时间的读取
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                yield {"url": tasks[task], "content": f"读取超时（超过{deadline}秒），已取消"}
+            pending = set()
+        finally:
+            # 调用方提前结束迭代时同样取消未完成的读取
+            for task in pending:
+                task.cancel()
+
+    async def read_page_limited(self, url: str) -> Dict:
+        """在全局并发上限和单站点并发上限约束下读取单个网页"""
+        if self._global_semaphore is None:
+            self._global_semaphore = asyncio.Semaphore(self.max_concurrency)
+        host = urlparse(url).netloc.lower()
+        host_semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        # 先获取站点名额，避免等待同站点时占用全局名额
+        async with host_semaphore:
+            async with self._global_semaphore:
+                return await self.read_page(url)
 
     async def read_page(self, url: str) -> Dict:
         """读取单个网页的内容"""
-        content = await self._get_page_content(url)
+        with span('web_reader.read_page', KIND_TOOL, url=url) as read_span:
+            content = await self._get_page_content(url)
+            read_span.set(content_chars=len(content or ''))
         return {
             "url": url,
             "content": content if content else "无法获取内容"
@@ -45,13 +120,11 @@ class WebReader:
         # 检查是否为YouTube链接
         video_id = self._extract_video_id(url)
         if video_id:
-            return self._get_best_transcript(video_id) or ''
+            return await self._get_best_transcript(video_id) or ''
 
         # 非YouTube链接，使用原有的网页内容获取逻辑
         try:
-            response = requests.get(f"{self.jina_base_url}{url}")
-            response.raise_for_status()
-            raw_content = response.text
+            raw_content = await self._fetch_raw_content(url)
             # 使用WebContentProcessor优化网页内容
             processed_content = await self.content_processor.process_web_content(raw_content)
             return processed_content
@@ -59,6 +132,31 @@ class WebReader:
             print(f"获取页面内容失败: {str(e)}")
             return ''
 
+    async def _fetch_raw_content(self, url: str) -> str:
+        """获取网页原始内容，缓存未过期时直接返回，过期后使用条件请求重新验证"""
+        cached = self.page_cache.get_raw(url) if self.page_cache else None
+        if cached and cached["fresh"]:
+            return cached["body"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers['If-None-Match'] = cached["etag"]
+            if cached.get("last_modified"):
+                headers['If-Modified-Since'] = cached["last_modified"]
+
+        response = await request('GET', f"{self.jina_base_url}{url}", headers=headers or None)
+        if response.status == 304 and cached:
+            self.page_cache.mark_revalidated(url)
+            return cached["body"]
+        response.raise_for_status()
+
+        if self.page_cache:
+            self.page_cache.set_raw(url, response.text,
+                                    etag=response.headers.get('ETag'),
+                                    last_modified=response.headers.get('Last-Modified'))
+        return response.text
+
     def _extract_video_id(self, url: str) -> Optional[str]:
         """从YouTube URL中提取视频ID"""
         patterns = [
@@ -72,7 +170,7 @@ class WebReader:
                 return match.group(1)
         return None
 
-    def _get_best_transcript(self, video_id: str) -> Optional[str]:
+    async def _get_best_transcript(self, video_id: str) -> Optional[str]:
         """使用Coze API获取视频字幕"""
         try:
             # 从环境变量获取Coze API配置
@@ -97,7 +195,7 @@ class WebReader:
             }
             
             # 发送请求
-            response = requests.post(url, headers=headers, json=data)
+            response = await request('POST', url, headers=headers, json_data=data)
             response.raise_for_status()
             
             # 解析响应
@@ -115,6 +213,8 @@ class WebReader:
             return None
 
 def test_smry_ai():
+    import requests
+
     # 测试用的原始URL
     original_url = "https://www.example.com"
     
@@ -1,9 +1,9 @@
-import requests
 import uuid
 import json
 import os
 from typing import Optional, Dict, List
 from dotenv import load_dotenv
+from tools.http_client import request, run_sync
 
 class ZhipuSearchTool:
     """智谱AI搜索工具"""
@@ -27,7 +27,7 @@ class ZhipuSearchTool:
 
     def search(self, query: str, limit: int = 3) -> list:
         """
-        使用智谱搜索引擎搜索中文内容
+        使用智谱搜索引擎搜索中文内容（同步接口，内部调用 async_search）
         
         Args:
             query: 搜索查询
@@ -36,7 +36,20 @@ class ZhipuSearchTool:
         Returns:
             List[Dict]: 包含 title, content, link, index 的搜索结果列表
         """
-        response = self._request_search(query)
+        return run_sync(self.async_search(query, limit))
+
+    async def async_search(self, query: str, limit: int = 3) -> list:
+        """
+        异步使用智谱搜索引擎搜索中文内容
+        
+        Args:
+            query: 搜索查询
+            limit: 返回结果数量
+            
+        Returns:
+            List[Dict]: 包含 title, content, link, index 的搜索结果列表
+        """
+        response = await self._request_search(query)
         if not response:
             return []
         
@@ -69,7 +82,7 @@ class ZhipuSearchTool:
             print(f"解析搜索结果出错: {str(e)}")
             return []
 
-    def _request_search(self, query: str) -> Optional[Dict]:
+    async def _request_search(self, query: str) -> Optional[Dict]:
         """执行搜索请求"""
         tool = "web-search-pro"
         request_id = str(uuid.uuid4())
@@ -91,7 +104,8 @@ class ZhipuSearchTool:
         }
 
         try:
-            resp = requests.post(
+            resp = await request(
+                'POST',
                 self.base_url,
                 headers=headers,
                 data=json.dumps(data),
@@ -99,7 +113,7 @@ class ZhipuSearchTool:
             )
             resp.raise_for_status()
             return resp.json()
-        except requests.exceptions.RequestException as e:
+        except Exception as e:
             print(f"请求出错: {e}")
             return None
 